@@ -0,0 +1,20 @@
+"""
+Offline benchmarks for the support agent.
+
+Run everything and save the results:
+    python -m benchmarks --output bench_results.json
+
+Compare against an earlier run and fail if anything got slower than 20%:
+    python -m benchmarks --compare bench_results.json --threshold 0.2
+
+The graph benchmarks use FakeChatModel instead of Ollama and a hashing
+encoder instead of the sentence transformer, so they need no model downloads
+and measure only the agent's own overhead plus the configured fake latency.
+"""
+import os
+import sys
+
+# The application modules import each other as top-level modules (``from state import ...``)
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
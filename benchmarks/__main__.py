@@ -0,0 +1,89 @@
+"""
+Benchmark runner.
+
+Usage:
+    python -m benchmarks [--suite all|graph|rag|quantization|prompts] [--sizes 100,1000,10000]
+                         [--llm-latency 0.005] [--prefill-rate 100] [--output results.json]
+                         [--compare baseline.json] [--threshold 0.2]
+
+Exits with status 1 when --compare finds a regression.
+"""
+import argparse
+import logging
+import sys
+
+from benchmarks.bench_graph import bench_graph
+from benchmarks.bench_prompts import DEFAULT_PREFILL_RATE, bench_prompts
+from benchmarks.bench_quantization import bench_quantization
+from benchmarks.bench_rag import DEFAULT_SIZES, bench_rag
+from benchmarks.harness import compare, load_results, results_document, save_results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the support agent benchmarks")
+    parser.add_argument("--suite", choices=("all", "graph", "rag", "quantization", "prompts"), default="all")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="knowledge base sizes for the rag and quantization suites")
+    parser.add_argument("--llm-latency", type=float, default=0.005, help="seconds per fake LLM call")
+    parser.add_argument("--prefill-rate", type=float, default=DEFAULT_PREFILL_RATE,
+                        help="prompt tokens per second of the LLM, to turn cached prefix tokens into time")
+    parser.add_argument("--repeat", type=int, default=0, help="override the number of timed runs")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown before failing")
+    args = parser.parse_args(argv)
+
+    # Keep per-ticket INFO logs out of the timings and the report
+    logging.basicConfig(level=logging.WARNING)
+
+    results = {}
+    if args.suite in ("all", "rag"):
+        sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+        results.update(bench_rag(sizes, **({"repeat": args.repeat} if args.repeat else {})))
+    if args.suite in ("all", "quantization"):
+        sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+        results.update(bench_quantization(sizes, **({"repeat": args.repeat} if args.repeat else {})))
+    if args.suite in ("all", "prompts"):
+        results.update(bench_prompts(prefill_rate=args.prefill_rate, **({"repeat": args.repeat} if args.repeat else {})))
+    if args.suite in ("all", "graph"):
+        results.update(bench_graph(args.llm_latency, **({"repeat": args.repeat} if args.repeat else {})))
+
+    print(f"{'benchmark':<42} {'p50 ms':>10} {'p95 ms':>10} {'ops/s':>10}")
+    for name, stats in results.items():
+        if "p50_ms" not in stats:
+            continue
+        print(f"{name:<42} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f} {stats['ops_per_sec'] or 0:>10.1f}")
+    quantized = {name: stats for name, stats in results.items() if "memory_bytes" in stats}
+    if quantized:
+        print(f"\n{'index':<42} {'MB':>10} {'build MB':>10} {'saved':>10} {'recall':>10} {'no rescore':>11}")
+        for name, stats in quantized.items():
+            recall = next(v for k, v in stats.items() if k.startswith("recall@") and not k.endswith("no_rescore"))
+            no_rescore = next(v for k, v in stats.items() if k.endswith("no_rescore"))
+            print(f"{name:<42} {stats['memory_bytes'] / 1e6:>10.2f} {stats['build_peak_bytes'] / 1e6:>10.2f} "
+                  f"{stats['memory_saved']:>10.1%} "
+                  f"{recall:>10.3f} {no_rescore:>11.3f}")
+
+    prefixes = {name: stats for name, stats in results.items() if "reused_tokens" in stats}
+    if prefixes:
+        print(f"\n{'prompt cache':<42} {'tokens':>10} {'cached':>10} {'prefill':>10} {'was':>10} {'ms saved':>10}")
+        for name, stats in prefixes.items():
+            print(f"{name:<42} {stats['prompt_tokens']:>10.1f} {stats['reused_tokens']:>10.1f} "
+                  f"{stats['prefill_tokens']:>10.1f} {stats['legacy_prefill_tokens']:>10.1f} {stats['prefill_ms_saved']:>10.1f}")
+
+    document = results_document(results)
+    if args.output:
+        save_results(args.output, document)
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(load_results(args.compare), document, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressions over {args.threshold:.0%}:")
+            for r in regressions:
+                print(f"  {r['benchmark']} {r['stat']}: {r['baseline']} -> {r['current']} ms (+{r['change']:.0%})")
+            return 1
+        print(f"\n✅ No regressions over {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
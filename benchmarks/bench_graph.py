@@ -0,0 +1,80 @@
+"""
+End-to-end benchmarks of the support agent graph against FakeChatModel.
+
+Each scenario fixes how many attempts the fake reviewer rejects, so the same
+code paths run on every revision: approve first time, one retry, escalation.
+"""
+import asyncio
+import contextlib
+import os
+import tempfile
+from itertools import cycle
+from typing import Dict, Iterator
+
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.harness import measure
+from benchmarks.synthetic import TICKETS, HashingEncoder, write_knowledge_base
+
+SCENARIOS = {"approve": 0, "retry": 1, "escalate": 99}
+
+OFFLINE_SETTINGS = {
+    "ANSWER_CACHE_ENABLED": "false",
+    "LLM_CACHE_ENABLED": "false",
+    "CLASSIFIER_CONFIDENCE_THRESHOLD": "1",
+    "TRACE_SAMPLE_RATE": "0",
+    "DRAFT_CANDIDATES": "1",
+}
+
+
+@contextlib.contextmanager
+def offline_agent(llm_latency: float = 0.0, rejections: int = 0, documents: int = 200) -> Iterator[Dict]:
+    """
+    Point the agent at FakeChatModel, a synthetic knowledge base and a
+    temporary escalation log; everything is restored on exit.
+    """
+    import escalation_sink
+    import llm
+    import simple_rag
+    from main import create_async_support_agent, create_support_agent
+
+    saved_env = dict(os.environ)
+    saved = (llm._create_llm, simple_rag._rag_instance, escalation_sink._sink)
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            os.environ.update(OFFLINE_SETTINGS)
+            llm._create_llm = lambda role: FakeChatModel(role=role, latency=llm_latency, rejections=rejections)
+            llm.reset_llm_clients()
+            simple_rag._rag_instance = simple_rag.SimpleRAG(
+                write_knowledge_base(directory, documents), model_name="hashing-384", encoder=HashingEncoder())
+            escalation_sink._sink = escalation_sink.EscalationSink(
+                os.path.join(directory, "escalations.csv"), flush_seconds=0.05)
+            yield {"sync": create_support_agent(), "async": create_async_support_agent()}
+        finally:
+            escalation_sink._sink.close()
+            llm._create_llm, simple_rag._rag_instance, escalation_sink._sink = saved
+            llm.reset_llm_clients()
+            os.environ.clear()
+            os.environ.update(saved_env)
+
+
+def bench_graph(llm_latency: float = 0.005, repeat: int = 24, batch_size: int = 32) -> Dict[str, Dict]:
+    results = {}
+    for scenario, rejections in SCENARIOS.items():
+        with offline_agent(llm_latency, rejections) as agents:
+            tickets = cycle(TICKETS)
+            results[f"graph.sync.{scenario}"] = measure(lambda: agents["sync"].invoke(dict(next(tickets))), repeat=repeat)
+
+            batch = [dict(TICKETS[i % len(TICKETS)]) for i in range(batch_size)]
+
+            def run_batch():
+                asyncio.run(agents["async"].abatch(batch))
+
+            stats = measure(run_batch, repeat=max(3, repeat // 8), warmup=1)
+            stats["tickets_per_sec"] = round(stats["ops_per_sec"] * batch_size, 2)
+            results[f"graph.async.{scenario}.batch{batch_size}"] = stats
+
+    # With zero LLM latency the whole ticket time is the agent's own overhead
+    with offline_agent(0.0, 0) as agents:
+        tickets = cycle(TICKETS)
+        results["graph.sync.overhead"] = measure(lambda: agents["sync"].invoke(dict(next(tickets))), repeat=repeat * 2)
+    return results
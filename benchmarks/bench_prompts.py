@@ -0,0 +1,116 @@
+"""
+Prompt rendering cost and how much of each prompt Ollama can serve from its cache.
+
+Ollama keeps the evaluated prompt of each parallel slot (OLLAMA_NUM_PARALLEL)
+and only prefills the part of a new prompt after the longest prefix it
+shares with a cached one. This replays classify, draft, review and retry calls for the synthetic
+tickets through the nodes' prompt builders, simulates ``slots`` cached
+prompts (the slot with the longest shared prefix is reused, otherwise the
+least recently used one), and converts the tokens left to prefill to time
+at ``prefill_rate`` tokens per second. Measure your own rate with the
+llm_prefill_seconds and llm_prompt_tokens metrics.
+
+The same calls are replayed through the previous per-call f-string
+layouts (benchmarks.legacy_prompts); ``prefill_ms_saved`` is the prefill
+time per call the compiled templates save against them.
+"""
+import os
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from benchmarks.harness import measure
+from benchmarks.synthetic import TICKETS, make_knowledge_base
+
+DEFAULT_SLOTS = (1, 4)
+# Prompt tokens per second of a 7B model on a laptop CPU; a GPU is 10-50x faster
+DEFAULT_PREFILL_RATE = 100.0
+
+
+def prompt_text(messages) -> str:
+    """The messages as one string, in order, the way a chat template lays them out"""
+    return "\n".join(f"{message.type}: {message.content}" for message in messages)
+
+
+def _workload() -> Iterator[Tuple[str, Dict]]:
+    """``(role, state)`` for each LLM call of the synthetic tickets; every other ticket is retried once"""
+    knowledge_base = make_knowledge_base(40)
+    categories = list(knowledge_base)
+    for i, ticket in enumerate(TICKETS):
+        category = categories[i % len(categories)]
+        context = "\n\n".join(knowledge_base[category][i:i + 3])
+        state = {**ticket, "category": category, "context": context, "attempts": 0,
+                 "draft": f"Thanks for reaching out about {ticket['subject'].lower()}. Here is what to do next."}
+        yield "classify", state
+        yield "draft", state
+        yield "review", state
+        if i % 2:
+            retry = {**state, "attempts": 1, "reviewer_feedback": "Give concrete next steps and a timeline."}
+            yield "draft", retry
+            yield "review", retry
+
+
+def _reused_tokens(prompts: List[str], slots: int) -> List[int]:
+    """
+    Cached prefix tokens of each prompt, replayed in order through ``slots`` cached prompts.
+
+    Like Ollama with OLLAMA_MULTIUSER_CACHE, a prompt that extends a cached
+    one continues in its slot; a prompt that diverges from every cached one
+    is written to the least recently used slot, starting from the longest
+    shared prefix, so the other prompts stay cached.
+    """
+    from context_packer import estimate_tokens
+
+    cache: List[str] = []  # least recently used first
+    reused = []
+    for prompt in prompts:
+        shared = [len(os.path.commonprefix([prompt, cached])) for cached in cache]
+        chars = max(shared, default=0)
+        if chars and chars == len(cache[shared.index(chars)]):
+            cache.pop(shared.index(chars))
+        elif len(cache) >= slots:
+            cache.pop(0)
+        cache.append(prompt)
+        reused.append(estimate_tokens(prompt[:chars]))
+    return reused
+
+
+def bench_prompts(slots: Iterable[int] = DEFAULT_SLOTS, prefill_rate: float = DEFAULT_PREFILL_RATE,
+                  repeat: int = 500) -> Dict[str, Dict]:
+    from benchmarks import legacy_prompts
+    from context_packer import estimate_tokens
+    from nodes.classify import _classification_messages
+    from nodes.draft import _draft_messages
+    from nodes.review import _review_messages
+
+    layouts = {
+        "": {"classify": _classification_messages, "draft": _draft_messages, "review": _review_messages},
+        ".legacy": {"classify": legacy_prompts.classification_messages, "draft": legacy_prompts.draft_messages,
+                    "review": legacy_prompts.review_messages},
+    }
+    calls = list(_workload())
+
+    results = {}
+    for suffix, builders in layouts.items():
+        for role, build in builders.items():
+            states = [state for call_role, state in calls if call_role == role]
+            states_iter = iter(states * (repeat // len(states) + 4))
+            results[f"prompt_render.{role}{suffix}"] = measure(lambda: build(next(states_iter)), repeat=repeat)
+
+    prompts = {suffix: [prompt_text(builders[role](state)) for role, state in calls] for suffix, builders in layouts.items()}
+    for count in slots:
+        per_call = {}
+        for suffix, layout_prompts in prompts.items():
+            tokens = sum(estimate_tokens(prompt) for prompt in layout_prompts)
+            reused = sum(_reused_tokens(layout_prompts, count))
+            per_call[suffix] = (tokens / len(calls), reused / len(calls), (tokens - reused) / len(calls))
+        (tokens, reused, prefill), legacy = per_call[""], per_call[".legacy"]
+        results[f"prompt_prefix.slots{count}"] = {
+            "calls": len(calls),
+            "prompt_tokens": round(tokens, 1),
+            "reused_tokens": round(reused, 1),
+            "prefill_tokens": round(prefill, 1),
+            "reuse": round(reused / tokens, 4),
+            "legacy_prompt_tokens": round(legacy[0], 1),
+            "legacy_prefill_tokens": round(legacy[2], 1),
+            "prefill_ms_saved": round((legacy[2] - prefill) / prefill_rate * 1000, 1),
+        }
+    return results
@@ -0,0 +1,65 @@
+"""
+Memory and recall of the quantized document matrix.
+
+For each knowledge base size and precision this reports the in-memory
+size of the vector data, the peak memory allocated while building the
+index, the saving against float32, recall@k against
+exact float32 search (with the default rescoring and without it) and the
+search latency. The full-precision rows come from the memory-mapped
+EmbeddingStore file, as they do in SimpleRAG.
+"""
+import tempfile
+from itertools import cycle
+from typing import Dict, Iterable
+
+import numpy as np
+
+from benchmarks.harness import measure, peak_memory
+from benchmarks.synthetic import HashingEncoder, write_knowledge_base
+
+DEFAULT_SIZES = (1000, 10000)
+
+
+def _recall(index, exact_index, queries: np.ndarray, top_k: int) -> float:
+    hits = 0
+    for query in queries:
+        expected = {row for row, _ in exact_index.search(query, None, top_k, min_score=-1.0)}
+        hits += len(expected & {row for row, _ in index.search(query, None, top_k, min_score=-1.0)})
+    return round(hits / (len(queries) * top_k), 4)
+
+
+def bench_quantization(sizes: Iterable[int] = DEFAULT_SIZES, repeat: int = 200, top_k: int = 5,
+                       n_queries: int = 200, noise: float = 0.05) -> Dict[str, Dict]:
+    from simple_rag import SimpleRAG
+    from vector_index import VectorIndex
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            rag = SimpleRAG(write_knowledge_base(directory, size), model_name="hashing-384",
+                            encoder=HashingEncoder(), retrieval_mode="dense")
+            embeddings, documents = rag.document_embeddings, rag.documents_list
+            exact = VectorIndex(embeddings, documents)
+
+            # Queries near real documents, like tickets paraphrasing a known answer
+            rng = np.random.default_rng(0)
+            sampled = exact.matrix[rng.choice(len(exact), min(n_queries, len(exact)), replace=False)]
+            queries = sampled + rng.normal(0, noise, sampled.shape).astype(np.float32)
+
+            for precision in ("float32", "float16", "int8"):
+                # float32 is built as an in-memory copy (SimpleRAG maps it from the store), the baseline for memory_saved
+                normalized = precision != "float32"
+                index, build_peak = peak_memory(
+                    lambda: VectorIndex(embeddings, documents, precision=precision, normalized=normalized))
+                no_rescore = VectorIndex(embeddings, documents, precision=precision, rescore_factor=1, normalized=normalized)
+                next_query = cycle(queries).__next__
+                stats = measure(lambda: index.search(next_query(), None, top_k), repeat=repeat)
+                stats.update({
+                    "memory_bytes": index.nbytes,
+                    "build_peak_bytes": build_peak,
+                    "memory_saved": round(1 - index.nbytes / exact.nbytes, 4),
+                    f"recall@{top_k}": _recall(index, exact, queries, top_k),
+                    f"recall@{top_k}_no_rescore": _recall(no_rescore, exact, queries, top_k),
+                })
+                results[f"vector_search.{precision}.{size}"] = stats
+    return results
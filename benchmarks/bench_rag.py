@@ -0,0 +1,78 @@
+"""
+Microbenchmarks of the retrieval engine at several knowledge base sizes.
+
+Uses the hashing encoder, so "cold" embedding load measures the store's
+encode-and-write path and "warm" load measures reading the memory-mapped
+index, not the sentence transformer.
+"""
+import os
+import tempfile
+from itertools import cycle
+from typing import Dict, Iterable
+
+from benchmarks.harness import measure
+from benchmarks.synthetic import TICKETS, HashingEncoder, write_knowledge_base
+
+DEFAULT_SIZES = (100, 1000, 10000)
+
+QUERIES = [f"{t['subject']} {t['description']}" for t in TICKETS]
+
+
+def _remove_index(rag) -> None:
+    for path in (rag.embedding_store.matrix_path, rag.embedding_store.manifest_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def bench_rag(sizes: Iterable[int] = DEFAULT_SIZES, repeat: int = 200) -> Dict[str, Dict]:
+    from context_packer import context_budget, estimate_tokens
+    from simple_rag import SimpleRAG
+
+    encoder = HashingEncoder()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            kb_path = write_knowledge_base(directory, size)
+
+            def load():
+                return SimpleRAG(kb_path, model_name="hashing-384", encoder=encoder)
+
+            rag = load()
+            load_repeat = 3 if size >= 10000 else 10
+
+            def cold_load():
+                _remove_index(rag)
+                load()
+
+            results[f"embedding_load.cold.{size}"] = measure(cold_load, repeat=load_repeat, warmup=0)
+            results[f"embedding_load.warm.{size}"] = measure(load, repeat=load_repeat, warmup=1)
+
+            queries = cycle(QUERIES)
+            results[f"retrieve_documents.category.{size}"] = measure(
+                lambda: rag.retrieve_documents(next(queries), "billing", top_k=3), repeat=repeat)
+            results[f"retrieve_documents.all.{size}"] = measure(
+                lambda: rag.retrieve_documents(next(queries), None, top_k=3), repeat=repeat)
+
+            results[f"lexical_search.{size}"] = measure(
+                lambda: rag.lexical_index.search(next(queries), None, top_k=3), repeat=repeat)
+            dense_rag = SimpleRAG(kb_path, model_name="hashing-384", encoder=encoder, retrieval_mode="dense")
+            results[f"retrieve_documents.dense.{size}"] = measure(
+                lambda: dense_rag.retrieve_documents(next(queries), None, top_k=3), repeat=repeat)
+
+            # Unique queries miss the recent-query cache, so this includes encoding
+            counter = iter(range(10 ** 9))
+            results[f"retrieve_documents.uncached.{size}"] = measure(
+                lambda: rag.retrieve_documents(f"{next(queries)} {next(counter)}", None, top_k=3), repeat=repeat)
+
+            docs = rag.retrieve_documents(QUERIES[0], None, top_k=3)
+            results[f"format_context.{size}"] = measure(lambda: rag.format_context(docs, QUERIES[0]), repeat=repeat)
+
+            # Long documents, as ingested manuals produce, packed into the default drafting budget
+            long_docs = [{**doc, "content": " ".join([doc["content"]] * 40)}
+                         for doc in rag.retrieve_documents(QUERIES[0], None, top_k=5)]
+            stats = measure(lambda: rag.format_context(long_docs, QUERIES[0], max_tokens=context_budget("draft"),
+                                                       max_passages=3), repeat=repeat)
+            stats["tokens"] = estimate_tokens(rag.format_context(long_docs, QUERIES[0], context_budget("draft"), 3))
+            stats["tokens_unpacked"] = estimate_tokens(rag.format_context(long_docs, QUERIES[0]))
+            results[f"format_context.packed.{size}"] = stats
+    return results
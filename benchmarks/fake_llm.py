@@ -0,0 +1,85 @@
+"""
+Deterministic chat model standing in for Ollama.
+
+One instance serves one role. Latency is simulated with sleep so concurrency
+limits and async overlap behave as they would against a real server. The
+reviewer rejects the first ``rejections`` attempts of every ticket and then
+approves, which makes the happy path, the retry loop and escalation all
+reproducible.
+"""
+import asyncio
+import re
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+CATEGORY_KEYWORDS = {
+    "billing": ("refund", "payment", "charge", "invoice", "billing", "subscription", "card"),
+    "security": ("password", "hack", "2fa", "login", "breach", "suspicious", "locked"),
+    "technical": ("error", "crash", "bug", "slow", "install", "api", "sync"),
+}
+
+RETRY_PATTERN = re.compile(r"retry attempt #(\d+)")
+DRAFT_ATTEMPT_PATTERN = re.compile(r"\(draft attempt (\d+)\)")
+
+
+class FakeChatModel(BaseChatModel):
+    """Answers classify, draft and review prompts like a well-behaved model"""
+
+    role: str = "default"
+    latency: float = 0.0
+    rejections: int = 0
+    temperature: float = 0.0
+    model: str = "fake"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-support-model"
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        if self.role == "classify":
+            text = messages[-1].content.lower() if messages else ""
+            for category, keywords in CATEGORY_KEYWORDS.items():
+                if any(keyword in text for keyword in keywords):
+                    return category
+            return "general"
+        if self.role == "review":
+            match = DRAFT_ATTEMPT_PATTERN.search(prompt)
+            attempt = int(match.group(1)) if match else 1
+            if attempt <= self.rejections:
+                return "RESULT: REJECTED\nFEEDBACK: Give the customer concrete numbered steps."
+            return "RESULT: APPROVED\nFEEDBACK: Clear, accurate and actionable."
+        match = RETRY_PATTERN.search(prompt)
+        attempt = int(match.group(1)) if match else 1
+        return (
+            "Thank you for reaching out, and sorry for the trouble. "
+            "Please follow the steps in the help center article for this issue, "
+            "and reply to this message if the problem continues so we can look into it further. "
+            f"(draft attempt {attempt})"
+        )
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        content = self._respond(messages)
+        prompt_chars = sum(len(str(message.content)) for message in messages)
+        message = AIMessage(content=content, response_metadata={
+            # Roughly four characters per token, like the real metadata Ollama reports
+            "prompt_eval_count": prompt_chars // 4,
+            "eval_count": max(1, len(content) // 4),
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._result(messages)
@@ -0,0 +1,106 @@
+"""
+Timing, result files and regression comparison for the benchmarks.
+"""
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Compared between runs; the other fields are informational
+COMPARED_STATS = ("p50_ms", "p95_ms")
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    values = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "n": int(values.size),
+        "mean_ms": round(float(values.mean()), 4),
+        "p50_ms": round(float(np.percentile(values, 50)), 4),
+        "p95_ms": round(float(np.percentile(values, 95)), 4),
+        "min_ms": round(float(values.min()), 4),
+        "ops_per_sec": round(1000.0 / float(values.mean()), 2) if values.mean() > 0 else None,
+    }
+
+
+def measure(fn: Callable[[], object], repeat: int = 50, warmup: int = 3) -> Dict[str, float]:
+    """Call ``fn`` ``warmup`` times untimed, then ``repeat`` times timed"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+def peak_memory(fn: Callable[[], object]) -> Tuple[object, int]:
+    """
+    Call ``fn`` once; returns its result and the peak bytes allocated during the call.
+
+    numpy reports its buffers to tracemalloc, so this is the resident memory
+    the call needed on top of what was already allocated; pages of
+    memory-mapped files are not counted.
+    """
+    tracemalloc.start()
+    try:
+        result = fn()
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def results_document(results: Dict[str, Dict]) -> Dict:
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def save_results(path: str, document: Dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+
+
+def load_results(path: str) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.2, min_delta_ms: float = 0.05) -> List[Dict]:
+    """
+    Benchmarks whose p50 or p95 grew by more than ``threshold`` relative to the baseline.
+
+    Differences under ``min_delta_ms`` are ignored so microsecond-level noise in
+    very fast benchmarks never counts as a regression.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        for stat in COMPARED_STATS:
+            old, new = before.get(stat), result.get(stat)
+            if old is None or new is None or old <= 0:
+                continue
+            if new > old * (1 + threshold) and new - old >= min_delta_ms:
+                regressions.append({"benchmark": name, "stat": stat, "baseline": old, "current": new,
+                                    "change": round(new / old - 1, 3)})
+    return regressions
@@ -0,0 +1,166 @@
+"""
+The prompt layouts the nodes used before their templates were compiled once.
+
+Each call built its ChatPromptTemplate from f-strings with the ticket
+already substituted and the source indentation kept, and retries moved the
+feedback into the system message. bench_prompts replays the same calls
+through these builders as the baseline for the prompt cache report.
+"""
+from langchain_core.prompts import ChatPromptTemplate
+
+from context_packer import context_budget, fit_context
+from nodes.classify import CATEGORIES
+from state import AgentState
+
+
+def classification_messages(state: AgentState) -> list:
+    """Build the classification prompt for a ticket"""
+    subject = state.get("subject", "")
+    description = state.get("description", "")
+    categories = CATEGORIES
+    
+    classification_prompt = ChatPromptTemplate.from_messages([
+        ("system", f"""You are an expert support ticket classifier. Your task is to accurately categorize customer support tickets into one of the following predefined categories:
+        {', '.join(categories)}
+        
+        Carefully analyze the subject and description of the ticket. Choose the SINGLE BEST category that most accurately reflects the customer's primary issue.
+        
+        CRITICAL: Respond ONLY with the chosen category name. Do NOT include any other text, explanations, or punctuation. Your response must be one of the exact category names from the list above.
+        """),
+        ("human", f"""
+        Customer Ticket:
+        Subject: {subject}
+        Description: {description}
+        
+        Which category does this ticket belong to?
+        """)
+    ])
+    
+    return classification_prompt.format_messages(
+        subject=subject,
+        description=description
+    )
+
+
+def draft_messages(state: AgentState) -> list:
+    """Build the drafting prompt, using the feedback-aware variant on retries"""
+    attempts = state.get("attempts", 0)
+    feedback = state.get("reviewer_feedback", "")
+    subject = state.get("subject", "")
+    description = state.get("description", "")
+    category = state.get("category", "")
+    context = state.get("context", "")
+
+    if attempts > 0 and feedback:
+        # This is a retry - use enhanced prompt with feedback
+        draft_prompt = ChatPromptTemplate.from_messages([
+            ("system", f"""You are a customer support agent working on retry attempt #{attempts + 1}.
+            
+            Your previous response was rejected with this feedback:
+            ---
+            REVIEWER FEEDBACK: {feedback}
+            ---
+
+            Create an improved response that directly addresses this feedback while being:
+            - Professional and empathetic
+            - Accurate and genuinely helpful
+            - Clear and actionable
+            - Directly addressing the customer's specific issue
+            
+            Focus on resolving the issues mentioned in the feedback."""),
+            
+            ("human", f"""
+            Customer Ticket:
+            Subject: {subject}
+            Description: {description}
+            Category: {category}
+
+            Available Context:
+            {context}
+
+            Previous Rejection Reason: {feedback}
+
+            Generate an improved response that addresses the feedback:
+            """)
+        ])
+    else:
+        # First attempt - standard prompt
+        draft_prompt = ChatPromptTemplate.from_messages([
+            ("system", """You are a professional customer support agent.
+            Generate a helpful, empathetic response to the customer's issue.
+            
+            Your response should:
+            - Be professional and courteous
+            - Directly address the customer's concern
+            - Provide clear, actionable guidance or next steps
+            - Resolve the issue when possible
+            - Show understanding of their situation"""),
+            
+            ("human", f"""
+            Customer Ticket:
+            Subject: {subject}
+            Description: {description}
+            Category: {category}
+
+            Available Context:
+            {context}
+
+            Generate a helpful response:
+            """)
+        ])
+
+    return draft_prompt.format_messages(
+        subject=subject,
+        description=description,
+        category=category,
+        context=context
+    )
+
+
+def review_messages(state: AgentState) -> list:
+    """Build the review prompt for the current draft"""
+    subject = state.get("subject", "")
+    description = state.get("description", "")
+    category = state.get("category", "")
+    context, _ = fit_context(state.get("context") or "", context_budget("review"))
+    draft = state.get("draft", "")
+    
+    review_prompt = ChatPromptTemplate.from_messages([
+        ("system", """You are a quality assurance reviewer for customer support responses.
+        
+        Evaluate the draft response against these criteria:
+        1. ACCURACY: Does it correctly address the customer's issue?
+        2. COMPLETENESS: Does it fully answer their question?
+        3. PROFESSIONALISM: Is the tone appropriate and helpful?
+        4. ACTIONABILITY: Does it provide clear next steps?
+        5. CONTEXT USAGE: Does it properly use the available knowledge base information?
+        
+        Respond with EXACTLY this format:
+        RESULT: [APPROVED or REJECTED]
+        FEEDBACK: [Specific feedback explaining your decision]
+        
+        Be strict but fair. Only approve responses that meet all criteria."""),
+        
+        ("human", f"""
+        Customer Issue:
+        Subject: {subject}
+        Description: {description}
+        Category: {category}
+        
+        Available Context:
+        {context}
+        
+        Draft Response to Review:
+        {draft}
+        
+        Please review this response:
+        """)
+    ])
+    
+    return review_prompt.format_messages(
+        subject=subject,
+        description=description,
+        category=category,
+        context=context,
+        draft=draft
+    )
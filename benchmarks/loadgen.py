@@ -0,0 +1,203 @@
+"""
+Open-loop load generator for the async support agent.
+
+Tickets arrive at a fixed rate whether or not earlier tickets have finished,
+the way real traffic does, so queueing in front of Ollama shows up as growing
+latency instead of silently slowing the generator down. Latency is measured
+from each ticket's scheduled arrival time.
+
+Usage:
+    python -m benchmarks.loadgen --rates 0.5,1,2,4 --duration 60
+    python -m benchmarks.loadgen --stub --llm-latency 0.2 --rates 5,10,20,40
+    python -m benchmarks.loadgen --source escalation_log.csv --slo 30
+
+Each rate step reports end-to-end and per-node p50/p95/p99, tickets in
+flight, LLM calls waiting for a slot, and the error rate. The highest rate
+that stayed under --slo at p95 without errors is reported as sustainable.
+"""
+import argparse
+import asyncio
+import contextlib
+import csv
+import json
+import logging
+import random
+import sys
+import time
+from itertools import cycle
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.synthetic import TICKETS
+
+
+def load_source(path: Optional[str]) -> List[Dict[str, str]]:
+    """Tickets from a JSONL/JSON file, the subjects in an escalation log CSV, or the built-in samples"""
+    if not path:
+        return [dict(t) for t in TICKETS]
+    if path.endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            tickets = [{"subject": row.get("subject", ""), "description": row.get("description", "")}
+                       for row in csv.DictReader(f)]
+    else:
+        from batch import load_tickets
+        tickets = [t for t in load_tickets(path) if isinstance(t, dict) and (t.get("subject") or t.get("description"))]
+    if not tickets:
+        raise SystemExit(f"No tickets found in {path}")
+    return tickets
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    array = np.asarray(values)
+    return {f"p{q}": round(float(np.percentile(array, q)), 4) for q in (50, 95, 99)}
+
+
+async def run_step(agent, tickets: List[Dict[str, str]], rate: float, duration: float,
+                   timeout: float = 300.0, poisson: bool = False, seed: int = 0) -> Dict[str, Any]:
+    """Fire tickets at ``rate`` per second for ``duration`` seconds and wait for them to finish"""
+    import metrics
+    from llm import llm_queue_depth
+
+    metrics.registry.reset()
+    rng = random.Random(seed)
+    source = cycle(tickets)
+    latencies: List[float] = []
+    errors: List[str] = []
+    in_flight = 0
+    depth_samples: List[int] = []
+    llm_waiting_samples: List[int] = []
+
+    async def one(ticket: Dict[str, str], scheduled: float):
+        nonlocal in_flight
+        in_flight += 1
+        try:
+            await asyncio.wait_for(agent.ainvoke(ticket), timeout)
+            latencies.append(time.perf_counter() - scheduled)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        finally:
+            in_flight -= 1
+
+    async def sample():
+        while True:
+            depth_samples.append(in_flight)
+            llm_waiting_samples.append(llm_queue_depth())
+            await asyncio.sleep(0.05)
+
+    sampler = asyncio.create_task(sample())
+    tasks = []
+    started = time.perf_counter()
+    next_arrival = started
+    arrivals = 0
+    while next_arrival < started + duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(dict(next(source)), next_arrival)))
+        arrivals += 1
+        # Fixed-rate arrivals are computed from the start so float error cannot add one
+        next_arrival = next_arrival + rng.expovariate(rate) if poisson else started + arrivals / rate
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await sampler
+
+    nodes = {
+        h["labels"]["node"]: {"count": h["count"], "p50": h["p50"], "p95": h["p95"], "p99": h["p99"]}
+        for h in metrics.registry.snapshot()["histograms"].get("node_seconds", [])
+    }
+    return {
+        "rate": rate,
+        "tickets": len(tasks),
+        "completed": len(latencies),
+        "errors": len(errors),
+        "error_rate": round(len(errors) / len(tasks), 4) if tasks else 0.0,
+        "sample_errors": sorted(set(errors))[:3],
+        "throughput": round(len(latencies) / elapsed, 3) if elapsed > 0 else 0.0,
+        "elapsed_seconds": round(elapsed, 3),
+        "latency_seconds": _percentiles(latencies),
+        "in_flight": {"mean": round(float(np.mean(depth_samples)), 2) if depth_samples else 0, "max": max(depth_samples, default=0)},
+        "llm_waiting": {"mean": round(float(np.mean(llm_waiting_samples)), 2) if llm_waiting_samples else 0,
+                        "max": max(llm_waiting_samples, default=0)},
+        "nodes": nodes,
+    }
+
+
+def sustainable_rate(steps: List[Dict[str, Any]], slo: float) -> Optional[float]:
+    """Highest rate with no errors and p95 latency within the SLO"""
+    ok = [step["rate"] for step in steps
+          if step["errors"] == 0 and step["latency_seconds"]["p95"] is not None and step["latency_seconds"]["p95"] <= slo]
+    return max(ok) if ok else None
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.3f}"
+
+
+def _print_step(step: Dict[str, Any]):
+    latency = step["latency_seconds"]
+    print(f"{step['rate']:>7.2f} {step['throughput']:>8.2f} {_fmt(latency['p50']):>8} {_fmt(latency['p95']):>8} "
+          f"{_fmt(latency['p99']):>8} {step['in_flight']['max']:>7} {step['llm_waiting']['max']:>7} {step['error_rate']:>7.1%}")
+    for node, stats in step["nodes"].items():
+        print(f"{'':>9}{node:<14} p50 {stats['p50']:.3f}s  p95 {stats['p95']:.3f}s  p99 {stats['p99']:.3f}s  (n={stats['count']})")
+
+
+async def ramp(agent, tickets, rates: List[float], duration: float, timeout: float, poisson: bool,
+               slo: float, stop_on_breach: bool = True) -> Dict[str, Any]:
+    print(f"{'rate/s':>7} {'done/s':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'inflt':>7} {'llmq':>7} {'errors':>7}")
+    steps = []
+    for rate in rates:
+        step = await run_step(agent, tickets, rate, duration, timeout, poisson)
+        steps.append(step)
+        _print_step(step)
+        p95 = step["latency_seconds"]["p95"]
+        if stop_on_breach and (step["error_rate"] > 0.5 or (p95 is not None and p95 > 4 * slo)):
+            print("🛑 Latency or errors far past the SLO, stopping the ramp")
+            break
+    return {"steps": steps, "slo_seconds": slo, "sustainable_rate": sustainable_rate(steps, slo)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Open-loop load test of the support agent")
+    parser.add_argument("--rates", default="0.5,1,2,4", help="comma-separated arrival rates (tickets/second)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of arrivals per rate")
+    parser.add_argument("--source", help="tickets JSONL/JSON or escalation_log.csv (default: built-in samples)")
+    parser.add_argument("--stub", action="store_true", help="use the fake LLM and hashing encoder instead of Ollama")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake LLM call with --stub")
+    parser.add_argument("--rejections", type=int, default=0, help="attempts the fake reviewer rejects with --stub")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times instead of a fixed interval")
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-ticket timeout in seconds")
+    parser.add_argument("--slo", type=float, default=30.0, help="p95 latency target in seconds")
+    parser.add_argument("--output", help="write the full report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    tickets = load_source(args.source)
+    rates = [float(r) for r in args.rates.split(",") if r.strip()]
+
+    if args.stub:
+        from benchmarks.bench_graph import offline_agent
+        context = offline_agent(args.llm_latency, args.rejections)
+    else:
+        from main import create_async_support_agent
+        context = contextlib.nullcontext({"async": create_async_support_agent()})
+
+    print(f"🚦 {len(tickets)} distinct tickets, {args.duration:.0f}s per rate, {'stub' if args.stub else 'Ollama'} model")
+    with context as agents:
+        report = asyncio.run(ramp(agents["async"], tickets, rates, args.duration, args.timeout, args.poisson, args.slo))
+
+    rate = report["sustainable_rate"]
+    print(f"\n✅ Sustainable rate: {rate} tickets/s (p95 <= {args.slo}s)" if rate else
+          f"\n❌ No tested rate met p95 <= {args.slo}s without errors")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+Synthetic inputs for the benchmarks: a hashing encoder, knowledge bases of
+any size and a fixed set of tickets.
+"""
+import json
+import os
+import random
+from typing import Dict, List
+
+from encoders import HashingEncoder  # noqa: F401  re-exported for the benchmarks
+
+TOPICS = {
+    "billing": ["refund", "invoice", "payment", "card", "charge", "subscription", "plan", "receipt", "manager", "approval"],
+    "technical": ["error", "crash", "install", "update", "browser", "cache", "sync", "api", "timeout", "version"],
+    "security": ["password", "reset", "2fa", "login", "session", "device", "phishing", "lock", "verify", "email"],
+    "general": ["hours", "contact", "account", "profile", "language", "delete", "export", "team", "holiday", "office"],
+}
+FILLER = ["please", "customers", "should", "the", "settings", "page", "within", "days", "support", "team", "can", "help"]
+
+TICKETS = [
+    {"subject": "Refund request", "description": "I was charged twice for my subscription this month"},
+    {"subject": "App crashes", "description": "The desktop app crashes with an error after the latest update"},
+    {"subject": "Forgot password", "description": "I cannot login and the password reset email never arrives"},
+    {"subject": "Office hours", "description": "What are your support hours during the holidays?"},
+    {"subject": "Invoice copy", "description": "Where can I download a receipt for my last payment?"},
+    {"subject": "Sync problem", "description": "Files do not sync between my laptop and phone"},
+    {"subject": "Suspicious login", "description": "I got an alert about a login from a device I do not recognise"},
+    {"subject": "Delete account", "description": "How do I delete my account and export my data first?"},
+]
+
+
+def make_knowledge_base(documents: int, seed: int = 0) -> Dict[str, List[str]]:
+    """``documents`` short policy-like documents spread evenly over the four categories"""
+    rng = random.Random(seed)
+    knowledge_base: Dict[str, List[str]] = {category: [] for category in TOPICS}
+    categories = list(TOPICS)
+    for i in range(documents):
+        category = categories[i % len(categories)]
+        words = rng.choices(TOPICS[category], k=8) + rng.choices(FILLER, k=10)
+        rng.shuffle(words)
+        knowledge_base[category].append(f"{category.title()} policy {i}: " + " ".join(words) + ".")
+    return knowledge_base
+
+
+def write_knowledge_base(directory: str, documents: int, seed: int = 0) -> str:
+    """Write a synthetic knowledge base JSON into ``directory`` and return its path"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"kb_{documents}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(make_knowledge_base(documents, seed), f)
+    return path
@@ -0,0 +1,277 @@
+"""
+Approximate nearest-neighbour search for large knowledge bases.
+
+IVFIndex is an inverted-file index built in pure NumPy: the documents of each
+category are clustered with spherical k-means, and a query only scores the
+documents in the ``n_probe`` closest clusters of each requested category.
+
+Run ``python src/ann_index.py`` to print a recall-vs-exact report for the
+embedding index stored next to a knowledge base.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from logging_config import configure_logging
+from vector_index import VectorIndex, normalize_rows, top_k_indices
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+
+def _spherical_kmeans(vectors: np.ndarray, n_lists: int, iterations: int, seed: int) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity and return unit-length centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~np.bincount(assignment, minlength=n_lists).astype(bool)
+        # Re-seed empty clusters so every list keeps a useful centroid
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over a VectorIndex, partitioned per category.
+
+    Only centroids and posting lists are stored; vectors are read from the
+    wrapped exact index, so the ANN index adds little memory on top of it.
+    """
+
+    def __init__(self, base: VectorIndex, n_lists: int = 0, n_probe: int = 8,
+                 iterations: int = 10, train_size: int = 50_000, seed: int = 0, encoder_id: str = ""):
+        self.base = base
+        self.encoder_id = encoder_id
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.iterations = iterations
+        self.train_size = train_size
+        self.seed = seed
+
+        self.centroids = np.empty((0, base.dim), dtype=np.float32)
+        self.centroid_category = np.empty(0, dtype=np.int32)
+        self.list_offsets = np.zeros(1, dtype=np.int64)
+        self.list_rows = np.empty(0, dtype=np.int64)
+
+    def fingerprint(self) -> str:
+        """Identifies the documents, encoder and build settings the index was trained on"""
+        digest = hashlib.sha1()
+        digest.update(json.dumps([self.encoder_id, self.base.dim, self.base.categories, self.base.ranges,
+                                  self.n_lists, self.seed]).encode("utf-8"))
+        for document in self.base.documents:
+            digest.update(document.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _lists_for(self, size: int) -> int:
+        n_lists = self.n_lists if self.n_lists > 0 else int(round(np.sqrt(size)))
+        return max(1, min(n_lists, size))
+
+    def build(self) -> "IVFIndex":
+        """Train centroids and posting lists for every category partition"""
+        rng = np.random.default_rng(self.seed)
+        centroids, owners, lists = [], [], []
+
+        for cid, (start, end) in enumerate(self.base.ranges):
+            vectors = self.base.vectors(np.arange(start, end))
+            n_lists = self._lists_for(end - start)
+            if n_lists == 1:
+                part_centroids = normalize_rows(vectors.mean(axis=0, keepdims=True))
+            else:
+                sample = vectors
+                if len(vectors) > self.train_size:
+                    sample = vectors[np.sort(rng.choice(len(vectors), self.train_size, replace=False))]
+                part_centroids = _spherical_kmeans(sample, n_lists, self.iterations, self.seed + cid)
+
+            assignment = np.argmax(vectors @ part_centroids.T, axis=1)
+            order = np.argsort(assignment, kind="stable")
+            counts = np.bincount(assignment, minlength=n_lists)
+            for rows in np.split(order + start, np.cumsum(counts)[:-1]):
+                lists.append(rows)
+            centroids.append(part_centroids)
+            owners.append(np.full(n_lists, cid, dtype=np.int32))
+
+        if centroids:
+            self.centroids = np.concatenate(centroids).astype(np.float32)
+            self.centroid_category = np.concatenate(owners)
+            self.list_offsets = np.concatenate([[0], np.cumsum([len(rows) for rows in lists])]).astype(np.int64)
+            self.list_rows = np.concatenate(lists).astype(np.int64)
+        return self
+
+    def save(self, path: str):
+        """Write the index atomically so a crashed build never leaves a partial file"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                version=INDEX_VERSION,
+                fingerprint=self.fingerprint(),
+                centroids=self.centroids,
+                centroid_category=self.centroid_category,
+                list_offsets=self.list_offsets,
+                list_rows=self.list_rows,
+            )
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        """Load a saved index; returns False if it is missing or was built from other documents"""
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as data:
+                if int(data["version"]) != INDEX_VERSION or str(data["fingerprint"]) != self.fingerprint():
+                    return False
+                self.centroids = data["centroids"]
+                self.centroid_category = data["centroid_category"]
+                self.list_offsets = data["list_offsets"]
+                self.list_rows = data["list_rows"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("⚠️ Ignoring unreadable ANN index: %s", e)
+            return False
+        return True
+
+    def load_or_build(self, path: str) -> "IVFIndex":
+        if self.load(path):
+            logger.info("✅ Loaded ANN index: %s lists", len(self.centroids))
+            return self
+        logger.info("🔄 Building ANN index...")
+        self.build()
+        self.save(path)
+        logger.info("✅ Built ANN index: %s lists", len(self.centroids))
+        return self
+
+    def _probe(self, query: np.ndarray, category_ids: Optional[Iterable[int]], n_probe: int) -> np.ndarray:
+        """Row indices stored in the ``n_probe`` closest lists of each requested category"""
+        if category_ids is None:
+            category_ids = range(len(self.base.categories))
+
+        selected = []
+        for cid in category_ids:
+            lists = np.flatnonzero(self.centroid_category == cid)
+            if lists.size > n_probe:
+                lists = lists[top_k_indices(self.centroids[lists] @ query, n_probe)]
+            selected.extend(lists)
+
+        if not selected:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([
+            self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]] for i in selected
+        ])
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        category_ids: Optional[Iterable[int]] = None,
+        top_k: int = 3,
+        min_score: float = 0.1,
+        n_probe: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        """Same contract as VectorIndex.search, scoring only the probed lists"""
+        query = normalize_rows(query_vector)[0]
+        rows = self._probe(query, category_ids, n_probe or self.n_probe)
+        if not rows.size:
+            return []
+        scores = self.base.vectors(rows) @ query
+        best = top_k_indices(scores, top_k)
+        best = best[scores[best] > min_score]
+        return [(int(rows[i]), float(scores[i])) for i in best]
+
+
+def recall_report(
+    base: VectorIndex,
+    ann: IVFIndex,
+    queries: np.ndarray,
+    top_k: int = 10,
+    n_probes: Sequence[int] = (1, 2, 4, 8, 16, 32),
+) -> List[Dict]:
+    """
+    Compare the ANN index against exact search for several ``n_probe`` values.
+
+    Every query is searched within the category of its nearest document, as the
+    retrieve node does. Returns one row per setting with recall@k and latencies.
+    """
+    queries = normalize_rows(queries)
+    exact_results, category_sets = [], []
+    started = time.perf_counter()
+    for query in queries:
+        nearest = base.search(query, None, 1, min_score=-1.0)[0][0]
+        category = base.category_ids[nearest]
+        category_sets.append([int(category)])
+        exact_results.append({row for row, _ in base.search(query, category_sets[-1], top_k, min_score=-1.0)})
+    exact_ms = (time.perf_counter() - started) * 1000 / max(len(queries), 1)
+
+    report = []
+    for n_probe in n_probes:
+        hits = total = 0
+        started = time.perf_counter()
+        found = [
+            {row for row, _ in ann.search(query, categories, top_k, min_score=-1.0, n_probe=n_probe)}
+            for query, categories in zip(queries, category_sets)
+        ]
+        ann_ms = (time.perf_counter() - started) * 1000 / max(len(queries), 1)
+        for expected, got in zip(exact_results, found):
+            hits += len(expected & got)
+            total += len(expected)
+        report.append({
+            "n_probe": n_probe,
+            f"recall@{top_k}": hits / total if total else 1.0,
+            "ann_ms": ann_ms,
+            "exact_ms": exact_ms,
+        })
+    return report
+
+
+def ann_index_path(knowledge_base_path: str) -> str:
+    base, _ = os.path.splitext(knowledge_base_path)
+    return f"{base}.ivf.npz"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall-vs-exact report for the IVF index")
+    parser.add_argument("--kb", default="data/mock_docs.json", help="knowledge base JSON the embedding index was built for")
+    parser.add_argument("--lists", type=int, default=0, help="lists per category (0 = sqrt of category size)")
+    parser.add_argument("--queries", type=int, default=200, help="number of synthetic queries")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--noise", type=float, default=0.05, help="noise added to sampled documents to form queries")
+    args = parser.parse_args()
+    configure_logging()
+
+    from embedding_store import EmbeddingStore
+
+    store = EmbeddingStore(args.kb, model_name="")
+    with open(store.manifest_path, "r") as f:
+        manifest = json.load(f)
+    matrix = np.load(store.matrix_path, mmap_mode="r")
+
+    embeddings: Dict[str, List[int]] = {}
+    for row, entry in enumerate(manifest["documents"]):
+        embeddings.setdefault(entry["category"], []).append(row)
+    base = VectorIndex(
+        {c: matrix[rows] for c, rows in embeddings.items()},
+        {c: [str(r) for r in rows] for c, rows in embeddings.items()},
+    )
+    ann = IVFIndex(base, n_lists=args.lists, encoder_id=manifest["model"]).build()
+
+    rng = np.random.default_rng(0)
+    sampled = base.vectors(rng.choice(len(base), args.queries))
+    queries = sampled + rng.normal(0, args.noise, sampled.shape).astype(np.float32)
+
+    print(f"📊 {len(base)} documents, {len(ann.centroids)} lists, model {manifest['model']}")
+    print(f"{'n_probe':>8} {'recall@' + str(args.top_k):>10} {'ann ms':>8} {'exact ms':>9}")
+    for row in recall_report(base, ann, queries, top_k=args.top_k):
+        print(f"{row['n_probe']:>8} {row[f'recall@{args.top_k}']:>10.3f} {row['ann_ms']:>8.3f} {row['exact_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Semantic answer cache.
+
+Approved responses are stored with the embedding of their ticket text. A new
+ticket whose embedding is close enough to a stored one reuses that answer
+instead of running classify -> retrieve -> draft -> review again. Entries are
+tied to a version of the knowledge base and dropped when it changes.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from config import env_bool, env_float, env_int, env_str
+from vector_index import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+
+class AnswerCache:
+    """Approved answers keyed by ticket embedding, persisted in SQLite"""
+
+    def __init__(self, path: str, kb_version: str, max_entries: int = 5000, ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.kb_version = kb_version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY,
+                kb_version TEXT NOT NULL,
+                category TEXT,
+                context TEXT,
+                draft TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+
+        self.ids = np.empty(0, dtype=np.int64)
+        self.matrix: Optional[np.ndarray] = None
+        self._reload()
+
+    def _reload(self):
+        """Drop stale entries and rebuild the in-memory embedding matrix"""
+        now = time.time()
+        self.conn.execute("DELETE FROM answers WHERE kb_version != ? OR created < ?", (self.kb_version, now - self.ttl))
+        rows = self.conn.execute("SELECT id, embedding FROM answers ORDER BY id").fetchall()
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.matrix = normalize_rows(np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])) if rows else None
+
+    def set_kb_version(self, kb_version: str):
+        """Invalidate every entry written against a different knowledge base"""
+        with self.lock:
+            if kb_version != self.kb_version:
+                logger.info("🧹 Knowledge base changed, clearing answer cache")
+                self.kb_version = kb_version
+                self._reload()
+
+    def lookup(self, embedding: np.ndarray, threshold: float) -> Optional[Dict]:
+        """Best stored answer with cosine similarity >= threshold, or None"""
+        with self.lock:
+            if self.matrix is None:
+                self.misses += 1
+                return None
+            scores = self.matrix @ normalize_rows(embedding)[0]
+            best = int(np.argmax(scores))
+            if scores[best] < threshold:
+                self.misses += 1
+                return None
+            entry_id = int(self.ids[best])
+            row = self.conn.execute(
+                "SELECT category, context, draft, created FROM answers WHERE id = ?", (entry_id,)
+            ).fetchone()
+            if row is None or row[3] < time.time() - self.ttl:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE answers SET accessed = ? WHERE id = ?", (time.time(), entry_id))
+            self.hits += 1
+            return {"id": entry_id, "similarity": float(scores[best]), "category": row[0], "context": row[1], "draft": row[2]}
+
+    def store(self, embedding: np.ndarray, category: Optional[str], context: Optional[str], draft: str):
+        """Remember an approved answer, evicting least recently used entries past max_entries"""
+        vector = normalize_rows(embedding)
+        now = time.time()
+        with self.lock:
+            if self.matrix is not None and float(np.max(self.matrix @ vector[0])) >= 0.999:
+                return  # Near-identical ticket already cached
+            entry_id = self.conn.execute(
+                "INSERT INTO answers (kb_version, category, context, draft, embedding, created, accessed) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.kb_version, category, context, draft, vector[0].tobytes(), now, now),
+            ).lastrowid
+            self.ids = np.append(self.ids, entry_id)
+            self.matrix = vector if self.matrix is None else np.vstack([self.matrix, vector])
+
+            if len(self.ids) > self.max_entries:
+                self.conn.execute(
+                    "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY accessed LIMIT ?)",
+                    (len(self.ids) - self.max_entries,),
+                )
+                self._reload()
+
+    def invalidate(self, entry_id: int):
+        """Remove one entry, e.g. after its reuse was rejected by review"""
+        with self.lock:
+            self.conn.execute("DELETE FROM answers WHERE id = ?", (entry_id,))
+            keep = self.ids != entry_id
+            self.ids = self.ids[keep]
+            self.matrix = self.matrix[keep] if self.matrix is not None and keep.any() else None
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.ids)}
+
+
+_cache_lock = threading.Lock()
+_cache: Optional[AnswerCache] = None
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """The shared answer cache, or None if disabled or the RAG encoder is unavailable"""
+    global _cache
+    if not env_bool("ANSWER_CACHE_ENABLED", True):
+        return None
+    from simple_rag import get_rag_system
+
+    rag_system = get_rag_system()
+    if not rag_system.model:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache(
+                env_str("ANSWER_CACHE_PATH", ".cache/answers.sqlite"),
+                kb_version=rag_system.kb_version,
+                max_entries=env_int("ANSWER_CACHE_MAX_ENTRIES", 5000),
+                ttl=env_float("ANSWER_CACHE_TTL", 7 * 24 * 3600),
+            )
+        else:
+            _cache.set_kb_version(rag_system.kb_version)
+        return _cache
+
+
+def _ticket_embedding(state) -> np.ndarray:
+    from nodes.retrieve import build_search_query
+    from simple_rag import get_rag_system
+
+    return get_rag_system().embed_query(build_search_query(state.get("subject", ""), state.get("description", "")))
+
+
+def find_cached_answer(state) -> Optional[Dict]:
+    """Look up a previously approved answer for a near-duplicate ticket"""
+    cache = get_answer_cache()
+    if cache is None:
+        return None
+    return cache.lookup(_ticket_embedding(state), env_float("ANSWER_CACHE_THRESHOLD", 0.92))
+
+
+def remember_answer(state):
+    """Store the approved draft of a freshly processed ticket"""
+    if state.get("answer_cache_id") is not None or not state.get("draft"):
+        return
+    cache = get_answer_cache()
+    if cache is not None:
+        cache.store(_ticket_embedding(state), state.get("category"), state.get("context"), state["draft"])
+
+
+def forget_answer(entry_id: int):
+    cache = get_answer_cache()
+    if cache is not None:
+        cache.invalidate(entry_id)
@@ -0,0 +1,147 @@
+"""
+Batch ticket processing for the support agent graph.
+
+Usage:
+    python src/batch.py tickets.jsonl --concurrency 8 --output results.jsonl
+
+Each input line is a JSON object with "subject" and "description". Results are
+written in input order, one JSON object per ticket, followed by throughput stats.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from nodes.retrieve import build_search_query
+from simple_rag import get_rag_system
+
+logger = logging.getLogger(__name__)
+
+
+def load_tickets(path: str) -> List[Dict[str, Any]]:
+    """Read tickets from a JSONL file (or a JSON list), skipping blank lines"""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _ticket_query(ticket: Dict[str, Any]) -> str:
+    return build_search_query(
+        str(ticket.get("subject") or "").strip(),
+        str(ticket.get("description") or "").strip(),
+    )
+
+
+def _run_one(agent, ticket: Dict[str, Any]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        if not isinstance(ticket, dict):
+            raise TypeError(f"ticket must be an object, got {type(ticket).__name__}")
+        result = agent.invoke(ticket)
+        return {"ok": True, "result": result, "seconds": time.perf_counter() - started}
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}", "seconds": time.perf_counter() - started}
+
+
+def run_batch(
+    tickets: Iterable[Dict[str, Any]],
+    max_concurrency: int = 8,
+    agent=None,
+) -> Dict[str, Any]:
+    """
+    Run tickets through the support agent with bounded concurrency.
+
+    All retrieval queries are encoded up front in one encoder call, so the
+    retrieve node never encodes inside the batch. Returns per-ticket outcomes
+    in input order plus throughput stats; a failing ticket never stops the batch.
+    """
+    tickets = list(tickets)
+    if agent is None:
+        from main import create_support_agent
+        agent = create_support_agent()
+
+    started = time.perf_counter()
+    rag_system = get_rag_system()
+    queries = [_ticket_query(t) for t in tickets if isinstance(t, dict)]
+    encoded = rag_system.prime_queries(queries)
+    logger.info("📦 Processing %s tickets (concurrency=%s, %s queries pre-encoded)", len(tickets), max_concurrency, encoded)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            outcomes = list(executor.map(lambda ticket: _run_one(agent, ticket), tickets))
+    finally:
+        rag_system.release_queries(queries)
+
+    elapsed = time.perf_counter() - started
+    results = [{"index": i, **outcome} for i, outcome in enumerate(outcomes)]
+    return {"results": results, "stats": batch_stats(results, elapsed)}
+
+
+def batch_stats(results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Throughput and latency summary for a finished batch"""
+    latencies = np.array([r["seconds"] for r in results]) if results else np.zeros(1)
+    succeeded = [r for r in results if r["ok"]]
+    escalated = sum(1 for r in succeeded if r["result"].get("needs_review") or r["result"].get("review_result") != "APPROVED")
+    return {
+        "tickets": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "escalated": escalated,
+        "elapsed_seconds": round(elapsed, 3),
+        "tickets_per_second": round(len(results) / elapsed, 3) if elapsed > 0 else 0.0,
+        "latency_p50_seconds": round(float(np.percentile(latencies, 50)), 3),
+        "latency_p95_seconds": round(float(np.percentile(latencies, 95)), 3),
+        "latency_max_seconds": round(float(latencies.max()), 3),
+    }
+
+
+def _summarize(outcome: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe view of one ticket's outcome"""
+    if not outcome["ok"]:
+        return {"index": outcome["index"], "ok": False, "error": outcome["error"]}
+    result = outcome["result"]
+    return {
+        "index": outcome["index"],
+        "ok": True,
+        "category": result.get("category"),
+        "status": "APPROVED" if result.get("review_result") == "APPROVED" else "ESCALATED",
+        "attempts": result.get("attempts", 0),
+        "draft": result.get("draft"),
+        "seconds": round(outcome["seconds"], 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Process a batch of support tickets")
+    parser.add_argument("tickets", help="JSONL file with one ticket per line")
+    parser.add_argument("--concurrency", type=int, default=8, help="tickets processed at the same time")
+    parser.add_argument("--output", help="write per-ticket results as JSONL to this file")
+    args = parser.parse_args(argv)
+    from main import startup
+    startup()
+
+    batch = run_batch(load_tickets(args.tickets), max_concurrency=args.concurrency)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for outcome in batch["results"]:
+            out.write(json.dumps(_summarize(outcome)) + "\n")
+    finally:
+        if args.output:
+            out.close()
+
+    stats = batch["stats"]
+    print(f"\n📊 {stats['succeeded']}/{stats['tickets']} succeeded, {stats['failed']} failed, {stats['escalated']} escalated")
+    print(f"⏱️ {stats['elapsed_seconds']}s total, {stats['tickets_per_second']} tickets/s, "
+          f"p50 {stats['latency_p50_seconds']}s, p95 {stats['latency_p95_seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Runtime settings read from environment variables (see .env.example).
+
+Values are read on every call so tests and long-running servers can change
+them without re-importing modules.
+"""
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def env_str(name: str, default: str) -> str:
+    value = os.getenv(name)
+    return value.strip() if value and value.strip() else default
+
+
+def env_int(name: str, default: int) -> int:
+    try:
+        return int(env_str(name, str(default)))
+    except ValueError:
+        logger.warning("⚠️ Invalid integer for %s, using %s", name, default)
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    try:
+        return float(env_str(name, str(default)))
+    except ValueError:
+        logger.warning("⚠️ Invalid number for %s, using %s", name, default)
+        return default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = env_str(name, "").lower()
+    if not value:
+        return default
+    return value in ("1", "true", "yes", "on")
@@ -0,0 +1,116 @@
+"""
+Token budgets for the knowledge base context in LLM prompts.
+
+Draft and review both re-send the retrieved context, and Ollama's prefill
+time grows with prompt length, so large documents slow down every call.
+The retrieved passages are packed into a per-role token budget instead:
+near-duplicates are skipped (maximal marginal relevance over the passage
+embeddings), and the last passage that does not fit is cut at a sentence
+boundary.
+
+Budgets come from RAG_CONTEXT_TOKENS_<ROLE> (0 = unlimited); review defaults
+to the draft budget so it grades against the context the draft was written
+from. Tokens are estimated at CHARS_PER_TOKEN characters each; nothing here
+loads a tokenizer.
+"""
+import re
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import env_float, env_int
+
+CHARS_PER_TOKEN = 4
+DEFAULT_BUDGETS = {"draft": 1024}
+
+# Sentence ends, and line breaks for lists and headings
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English prose; errs towards more tokens"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def context_budget(role: str) -> int:
+    """Token budget for the context in ``role``'s prompt (0 = unlimited)"""
+    default = context_budget("draft") if role == "review" else DEFAULT_BUDGETS.get(role, 0)
+    return env_int(f"RAG_CONTEXT_TOKENS_{role.upper()}", default)
+
+
+def truncate_sentences(text: str, max_tokens: int) -> str:
+    """
+    The longest run of whole sentences from the start of ``text`` within ``max_tokens``.
+
+    A first sentence that alone is too long is cut at a word instead, so
+    something is kept as long as a few words fit. Cuts end with "...".
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens * CHARS_PER_TOKEN - 3
+    if limit <= 0:
+        return ""
+    kept = ""
+    for match in SENTENCE_END.finditer(text):
+        if match.start() > limit:
+            break
+        kept = text[:match.start()]
+    if not kept:
+        kept = text[:max(0, text.rfind(" ", 0, limit + 1))]
+    return kept.rstrip() + " ..." if kept else ""
+
+
+def mmr_order(relevance: Sequence[float], vectors: Optional[np.ndarray], diversity: Optional[float] = None,
+              duplicate_threshold: Optional[float] = None) -> List[int]:
+    """
+    Passage positions in maximal marginal relevance order, near-duplicates removed.
+
+    Each step picks the passage with the best ``(1 - diversity) * relevance -
+    diversity * similarity`` to those already picked; a passage whose cosine
+    similarity to a picked one reaches ``duplicate_threshold`` is dropped.
+    Without vectors the passages keep their relevance order.
+    """
+    order = sorted(range(len(relevance)), key=lambda i: -relevance[i])
+    if vectors is None or len(order) < 2:
+        return order
+    diversity = env_float("RAG_CONTEXT_DIVERSITY", 0.3) if diversity is None else diversity
+    if duplicate_threshold is None:
+        duplicate_threshold = env_float("RAG_CONTEXT_DEDUP_THRESHOLD", 0.92)
+
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarities = vectors @ vectors.T
+    scores = np.asarray(relevance, dtype=np.float32)
+    picked = [order[0]]
+    candidates = order[1:]
+    while candidates:
+        redundancy = similarities[np.ix_(candidates, picked)].max(axis=1)
+        candidates = [c for c, r in zip(candidates, redundancy) if r < duplicate_threshold]
+        if not candidates:
+            break
+        redundancy = similarities[np.ix_(candidates, picked)].max(axis=1)
+        best = int(np.argmax((1 - diversity) * scores[candidates] - diversity * redundancy))
+        picked.append(candidates.pop(best))
+    return picked
+
+
+def fit_context(context: str, max_tokens: int) -> Tuple[str, int]:
+    """
+    Trim an already formatted context to ``max_tokens``; returns it and the tokens saved.
+
+    Passages are ordered most relevant first, so the tail is cut at a
+    sentence boundary. A closing "=== ... ===" banner is kept.
+    """
+    tokens = estimate_tokens(context)
+    if max_tokens <= 0 or tokens <= max_tokens:
+        return context, 0
+    body, footer = context, ""
+    head, _, last = context.rpartition("\n")
+    if head and last.startswith("===") and last.endswith("==="):
+        body, footer = head, "\n" + last
+    body = truncate_sentences(body, max_tokens - estimate_tokens(footer))
+    # Drop a passage banner whose passage was cut off entirely
+    head, _, last = body.rpartition("\n")
+    if last.startswith("[") and last.removesuffix(" ...").endswith("]"):
+        body = head
+    trimmed = body.rstrip() + footer
+    return trimmed, tokens - estimate_tokens(trimmed)
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 2
+# Version 1 stored rows as encoded; they are normalized and rewritten on the next load
+UNNORMALIZED_VERSIONS = (1,)
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of a document's text, used to detect changed documents"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Persistent embedding index stored next to the knowledge base JSON.
+
+    The index is two files:
+    - ``<kb>.embeddings.npy``: one contiguous float32 matrix of unit-length rows, one per document
+    - ``<kb>.manifest.json``: model name plus the category and content hash of every row
+
+    On load the matrix is memory-mapped and only documents whose hash is not
+    already in the index are re-encoded, so a warm start is I/O-bound.
+    Rows are normalized when written, so VectorIndex can search the mapped
+    file in place instead of copying it into memory.
+    """
+
+    def __init__(self, knowledge_base_path: str, model_name: str):
+        base, _ = os.path.splitext(knowledge_base_path)
+        self.model_name = model_name
+        self.matrix_path = f"{base}.embeddings.npy"
+        self.manifest_path = f"{base}.manifest.json"
+        self.last_encoded = 0
+
+    def _read_manifest(self) -> Optional[dict]:
+        """Return the manifest if it exists and matches the current model"""
+        if not (os.path.exists(self.manifest_path) and os.path.exists(self.matrix_path)):
+            return None
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ Ignoring unreadable embedding manifest: %s", e)
+            return None
+
+        if manifest.get("version") not in (MANIFEST_VERSION,) + UNNORMALIZED_VERSIONS \
+                or manifest.get("model") != self.model_name:
+            logger.warning("⚠️ Embedding index was built with a different model, rebuilding")
+            return None
+        return manifest
+
+    def _open_matrix(self, manifest: Optional[dict]) -> Optional[np.ndarray]:
+        """Memory-map the stored matrix, or return None if it is missing or inconsistent"""
+        if manifest is None:
+            return None
+        try:
+            matrix = np.load(self.matrix_path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ Ignoring unreadable embedding matrix: %s", e)
+            return None
+        if matrix.ndim != 2 or matrix.shape[0] != len(manifest.get("documents", [])):
+            logger.warning("⚠️ Embedding matrix does not match its manifest, rebuilding")
+            return None
+        return matrix
+
+    def _write(self, matrix: np.ndarray, documents: List[dict]):
+        """Atomically replace the matrix and manifest on disk"""
+        tmp_matrix = f"{self.matrix_path}.tmp"
+        tmp_manifest = f"{self.manifest_path}.tmp"
+
+        with open(tmp_matrix, "wb") as f:
+            np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+        with open(tmp_manifest, "w") as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "model": self.model_name,
+                "dim": int(matrix.shape[1]),
+                "documents": documents,
+            }, f)
+
+        # Matrix first: a manifest never points at rows that are not on disk yet
+        os.replace(tmp_matrix, self.matrix_path)
+        os.replace(tmp_manifest, self.manifest_path)
+
+    def load(
+        self,
+        knowledge_base: Dict[str, List[str]],
+        encode: Callable[[List[str]], np.ndarray],
+    ) -> Dict[str, np.ndarray]:
+        """
+        Return per-category embedding arrays for ``knowledge_base``.
+
+        Rows for unchanged documents are taken from the memory-mapped index;
+        only new or edited documents are passed to ``encode``. The index on
+        disk is rewritten only when something changed.
+        """
+        manifest = self._read_manifest()
+        stored = self._open_matrix(manifest)
+
+        stored_rows: Dict[str, int] = {}
+        if stored is not None:
+            for row, entry in enumerate(manifest["documents"]):
+                stored_rows.setdefault(entry["hash"], row)
+
+        documents: List[dict] = []
+        ranges: Dict[str, Tuple[int, int]] = {}
+        missing: Dict[str, str] = {}
+        for category, texts in knowledge_base.items():
+            start = len(documents)
+            for text in texts:
+                digest = content_hash(text)
+                documents.append({"category": category, "hash": digest})
+                if digest not in stored_rows:
+                    missing.setdefault(digest, text)
+            ranges[category] = (start, len(documents))
+
+        self.last_encoded = len(missing)
+        if not documents:
+            return {}
+
+        unchanged = (
+            stored is not None
+            and manifest["version"] == MANIFEST_VERSION
+            and not missing
+            and [(d["category"], d["hash"]) for d in documents]
+            == [(d["category"], d["hash"]) for d in manifest["documents"]]
+        )
+
+        if unchanged:
+            matrix = stored
+        else:
+            new_rows: Dict[str, np.ndarray] = {}
+            if missing:
+                logger.info("🔄 Encoding %s new or changed documents...", len(missing))
+                encoded = np.asarray(encode(list(missing.values())), dtype=np.float32)
+                new_rows = dict(zip(missing.keys(), encoded))
+
+            dim = stored.shape[1] if stored is not None else next(iter(new_rows.values())).shape[0]
+            matrix = np.empty((len(documents), dim), dtype=np.float32)
+            for row, entry in enumerate(documents):
+                digest = entry["hash"]
+                matrix[row] = new_rows[digest] if digest in new_rows else stored[stored_rows[digest]]
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+
+            # Release the old mapping before the file underneath it is replaced
+            stored = None
+            self._write(matrix, documents)
+            matrix = np.load(self.matrix_path, mmap_mode="r")
+
+        return {category: matrix[start:end] for category, (start, end) in ranges.items()}
@@ -0,0 +1,296 @@
+"""
+Sentence encoder backends for retrieval.
+
+Every backend has the sentence-transformers ``encode(texts, batch_size=...)``
+API and returns one float32 row per text, so SimpleRAG, the embedding store
+and the fast classifier work with any of them. RAG_ENCODER_BACKEND picks one:
+
+- sentence-transformers: the PyTorch model (default)
+- onnx: the same model exported to ONNX and run by onnxruntime, by default
+  with int8 dynamically quantized weights; needs neither torch nor a GPU
+- hashing: a deterministic bag-of-words stub for tests and offline benchmarks
+
+Usage:
+    python src/encoders.py export --model all-MiniLM-L6-v2 --output models/all-MiniLM-L6-v2-onnx
+    python src/encoders.py parity --candidate onnx [--reference sentence-transformers]
+
+``export`` needs torch, sentence-transformers and onnxruntime; serving the
+export needs only onnxruntime and tokenizers. ``parity`` encodes the
+knowledge base and sample tickets with both backends and fails unless every
+pair of embeddings has cosine similarity within --tolerance of 1. Documents
+embedded by one backend can then be searched with queries from the other.
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import env_bool, env_int, env_str
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("sentence-transformers", "onnx", "hashing")
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class HashingEncoder:
+    """
+    Deterministic bag-of-words encoder with the sentence-transformer ``encode`` API.
+
+    Costs microseconds instead of a model download, so tests and benchmarks
+    exercise the retrieval code rather than the encoder.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in WORD_PATTERN.findall(text.lower()):
+                h = zlib.crc32(word.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class SentenceTransformerEncoder:
+    """The PyTorch sentence transformer; importing it loads torch"""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=batch_size, **kwargs), dtype=np.float32)
+
+
+class OnnxEncoder:
+    """
+    A sentence transformer exported by ``export_onnx``, run with onnxruntime.
+
+    Tokenization, pooling and normalization follow the settings recorded in
+    the export's encoder.json, so the output matches the PyTorch model.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = True, threads: int = 0):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("The onnx encoder backend needs `pip install onnxruntime tokenizers`") from e
+
+        with open(os.path.join(model_dir, "encoder.json"), "r") as f:
+            self.config = json.load(f)
+        path = os.path.join(model_dir, "model.int8.onnx" if quantized else "model.onnx")
+        options = onnxruntime.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        batches = [self._encode_batch(texts[start:start + batch_size]) for start in range(0, len(texts), batch_size)]
+        return np.concatenate(batches) if batches else np.empty((0, self.config["dim"]), dtype=np.float32)
+
+    def _encode_batch(self, texts: Sequence[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(list(texts))
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: value for name, value in inputs.items() if name in self.input_names})[0]
+
+        if self.config["pooling"] == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.config["normalize"]:
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
+
+
+def encoder_backend(backend: Optional[str] = None) -> str:
+    return (backend or env_str("RAG_ENCODER_BACKEND", "sentence-transformers")).lower()
+
+
+def encoder_id(model_name: str, backend: Optional[str] = None) -> str:
+    """
+    Name the embedding store records for vectors from this model and backend.
+
+    Cached document vectors are only reused by the backend that wrote them;
+    the PyTorch backend keeps the bare model name so existing caches stay valid.
+    """
+    backend = encoder_backend(backend)
+    if backend == "onnx" and env_bool("RAG_ONNX_QUANTIZED", True):
+        backend = "onnx-int8"
+    return model_name if backend == "sentence-transformers" else f"{model_name}@{backend}"
+
+
+def onnx_model_dir(model_name: str) -> str:
+    return env_str("RAG_ONNX_MODEL_DIR", os.path.join("models", f"{os.path.basename(model_name)}-onnx"))
+
+
+def create_encoder(model_name: str, backend: Optional[str] = None):
+    """The encoder for RAG_ENCODER_BACKEND (or ``backend``)"""
+    backend = encoder_backend(backend)
+    logger.info("🤖 Loading %s encoder for %s...", backend, model_name)
+    if backend == "sentence-transformers":
+        encoder = SentenceTransformerEncoder(model_name)
+    elif backend == "onnx":
+        encoder = OnnxEncoder(onnx_model_dir(model_name), quantized=env_bool("RAG_ONNX_QUANTIZED", True),
+                              threads=env_int("RAG_ENCODER_THREADS", 0))
+    elif backend == "hashing":
+        encoder = HashingEncoder()
+    else:
+        raise ValueError(f"Unknown encoder backend {backend!r}, expected one of {BACKENDS}")
+    logger.info("✅ Encoder loaded")
+    return encoder
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = True, opset: int = 17) -> str:
+    """Export a sentence transformer to ``output_dir`` for OnnxEncoder; returns the directory"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer, tokenizer = model[0].auto_model.eval(), model.tokenizer
+    pooling = next((m for m in model if type(m).__name__ == "Pooling"), None)
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["an example support ticket"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer, tuple(sample[name] for name in input_names), fp32_path,
+            input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes={**axes, "last_hidden_state": {0: "batch", 1: "sequence"}}, opset_version=opset,
+        )
+
+    with open(os.path.join(output_dir, "encoder.json"), "w") as f:
+        json.dump({
+            "model": model_name,
+            "dim": model.get_sentence_embedding_dimension(),
+            "max_seq_length": model.max_seq_length,
+            "pooling": "cls" if pooling is not None and pooling.get_pooling_mode_str() == "cls" else "mean",
+            "normalize": any(type(m).__name__ == "Normalize" for m in model),
+            "pad_token": tokenizer.pad_token,
+            "pad_token_id": tokenizer.pad_token_id,
+        }, f, indent=2)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, os.path.join(output_dir, "model.int8.onnx"), weight_type=QuantType.QInt8)
+    logger.info("✅ Exported %s to %s", model_name, output_dir)
+    return output_dir
+
+
+def parity_check(reference, candidate, texts: List[str], tolerance: float = 0.02) -> Dict:
+    """
+    Compare two encoders on ``texts``.
+
+    Reports per-text cosine similarity between the backends and whether each
+    text's nearest neighbour among the others is the same under both.
+    Passes if the lowest cosine is at least ``1 - tolerance``.
+    """
+    a = np.asarray(reference.encode(texts), dtype=np.float32)
+    b = np.asarray(candidate.encode(texts), dtype=np.float32)
+    a /= np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b /= np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    cosines = np.sum(a * b, axis=1)
+
+    neighbours = []
+    for vectors in (a, b):
+        similarities = vectors @ vectors.T
+        np.fill_diagonal(similarities, -np.inf)
+        neighbours.append(np.argmax(similarities, axis=1))
+
+    return {
+        "texts": len(texts),
+        "min_cosine": round(float(cosines.min()), 5),
+        "mean_cosine": round(float(cosines.mean()), 5),
+        "max_abs_diff": round(float(np.abs(a - b).max()), 5),
+        "nearest_neighbour_agreement": round(float(np.mean(neighbours[0] == neighbours[1])), 4) if len(texts) > 1 else 1.0,
+        "passed": bool(cosines.min() >= 1 - tolerance),
+    }
+
+
+def _query_latency_ms(encoder, texts: List[str], repeat: int = 50) -> float:
+    timings = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        encoder.encode([texts[i % len(texts)]])
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(float(np.median(timings)), 3)
+
+
+def _parity_texts(knowledge_base_path: str) -> List[str]:
+    from simple_rag import read_knowledge_base
+
+    knowledge_base, _ = read_knowledge_base(knowledge_base_path)
+    texts = [document for documents in knowledge_base.values() for document in documents]
+    texts += [
+        "I was charged twice for my subscription this month",
+        "The app crashes with error E1042 on Android 9",
+        "How do I enable 2FA on my account?",
+    ]
+    return texts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Export encoders and check that backends agree")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="export a sentence transformer to ONNX")
+    export.add_argument("--model", default="all-MiniLM-L6-v2")
+    export.add_argument("--output", help="export directory (default: RAG_ONNX_MODEL_DIR or models/<model>-onnx)")
+    export.add_argument("--no-quantize", action="store_true", help="skip the int8 model")
+    parity = commands.add_parser("parity", help="compare embeddings from two backends")
+    parity.add_argument("--model", default="all-MiniLM-L6-v2")
+    parity.add_argument("--reference", default="sentence-transformers", choices=BACKENDS)
+    parity.add_argument("--candidate", default="onnx", choices=BACKENDS)
+    parity.add_argument("--knowledge-base", default=env_str("RAG_KNOWLEDGE_BASE", "data/mock_docs.json"))
+    parity.add_argument("--tolerance", type=float, default=0.02, help="allowed 1 - cosine between backends")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if args.command == "export":
+        export_onnx(args.model, args.output or onnx_model_dir(args.model), quantize=not args.no_quantize)
+        return 0
+
+    texts = _parity_texts(args.knowledge_base)
+    reference = create_encoder(args.model, args.reference)
+    candidate = create_encoder(args.model, args.candidate)
+    report = parity_check(reference, candidate, texts, args.tolerance)
+    report["query_ms"] = {args.reference: _query_latency_ms(reference, texts), args.candidate: _query_latency_ms(candidate, texts)}
+    print(json.dumps(report, indent=2))
+    print(("✅ Backends agree" if report["passed"] else "❌ Backends disagree") + f" (min cosine {report['min_cosine']})")
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
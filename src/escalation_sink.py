@@ -0,0 +1,275 @@
+"""
+Buffered, concurrency-safe escalation log.
+
+The escalate node only puts a record on an in-memory queue. A background
+thread writes queued records in batches, holding an exclusive file lock so
+rows from several worker processes never interleave. Failed drafts are
+stored once per content hash in a side file (or table), and escalation rows
+only reference them by hash. File backends rotate by size or age, moving the
+log and its drafts file aside together.
+
+Backends (ESCALATION_BACKEND):
+- csv:    escalation_log.csv + escalation_log.drafts.jsonl
+- jsonl:  gzip-compressed JSONL, escalation_log.jsonl.gz + escalation_log.drafts.jsonl.gz
+- sqlite: escalations and drafts tables in one database file
+"""
+import atexit
+import csv
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on the single in-process writer thread
+    fcntl = None
+
+from config import env_float, env_int, env_str
+
+logger = logging.getLogger(__name__)
+
+CSV_HEADER = ["timestamp", "subject", "description", "attempts", "feedback", "failed_draft_ids"]
+
+DEFAULT_PATHS = {
+    "csv": "escalation_log.csv",
+    "jsonl": "escalation_log.jsonl.gz",
+    "sqlite": "escalation_log.sqlite",
+}
+
+_STOP = object()
+
+
+def draft_id(draft: str) -> str:
+    """Short content hash used to reference a failed draft"""
+    return hashlib.sha1(draft.encode("utf-8")).hexdigest()[:16]
+
+
+def _split_ext(path: str) -> tuple:
+    for ext in (".jsonl.gz", ".csv", ".sqlite", ".jsonl"):
+        if path.endswith(ext):
+            return path[: -len(ext)], ext
+    return os.path.splitext(path)
+
+
+class EscalationSink:
+    """Background writer for escalation records"""
+
+    def __init__(self, path: str, backend: str = "csv", max_bytes: int = 10 * 1024 * 1024,
+                 rotate_seconds: float = 0, flush_seconds: float = 1.0, batch_size: int = 100):
+        if backend not in DEFAULT_PATHS:
+            raise ValueError(f"Unknown escalation backend: {backend}")
+        self.path = path
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+
+        base, ext = _split_ext(path)
+        self.drafts_path = f"{base}.drafts.jsonl" + (".gz" if backend == "jsonl" else "")
+        self.opened_at = time.time()
+        self.seen_drafts: Set[str] = set()
+        self.log_inode: Optional[int] = None
+        self.written = 0
+        self.conn: Optional[sqlite3.Connection] = None
+
+        self.queue: "queue.Queue[Any]" = queue.Queue()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="escalation-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def submit(self, record: Dict[str, Any]):
+        """Queue one escalation; returns immediately"""
+        self.queue.put(record)
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        self.queue.join()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(_STOP)
+        self.thread.join(timeout=10)
+
+    def _run(self):
+        """Writer thread: collect up to batch_size records or flush_seconds worth, then write once"""
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            records = [r for r in batch if r is not _STOP]
+            if records:
+                try:
+                    self._write(records)
+                    self.written += len(records)
+                except Exception as e:
+                    logger.error("❌ Failed to write %s escalations: %s", len(records), e)
+            for _ in batch:
+                self.queue.task_done()
+            if any(r is _STOP for r in batch):
+                if self.conn is not None:
+                    self.conn.close()
+                return
+
+    def _compact(self, record: Dict[str, Any], drafts: Dict[str, str]) -> Dict[str, Any]:
+        """Replace failed draft texts with their hashes, collecting unseen drafts"""
+        ids = []
+        for draft in record.get("failed_drafts") or []:
+            digest = draft_id(draft)
+            ids.append(digest)
+            if digest not in self.seen_drafts:
+                drafts[digest] = draft
+        return {
+            "timestamp": record.get("timestamp") or datetime.now().isoformat(),
+            "subject": record.get("subject", ""),
+            "description": record.get("description", ""),
+            "attempts": record.get("attempts", 0),
+            "feedback": record.get("feedback") or "",
+            "failed_draft_ids": ids,
+        }
+
+    def _write(self, records: List[Dict[str, Any]]):
+        if self.backend == "sqlite":
+            drafts: Dict[str, str] = {}
+            rows = [self._compact(record, drafts) for record in records]
+            self._write_sqlite(rows, drafts)
+            self.seen_drafts.update(drafts)
+        else:
+            self._append(records)
+
+    def _encode_rows(self, rows: List[Dict[str, Any]]) -> str:
+        if self.backend == "jsonl":
+            return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([row[column] if column != "failed_draft_ids" else ";".join(row[column]) for column in CSV_HEADER])
+        return buffer.getvalue()
+
+    def _encode_drafts(self, drafts: Dict[str, str]) -> str:
+        return "".join(json.dumps({"id": k, "draft": v}, ensure_ascii=False) + "\n" for k, v in drafts.items())
+
+    def _should_rotate(self, size: int) -> bool:
+        if self.max_bytes and size >= self.max_bytes:
+            return True
+        return bool(self.rotate_seconds) and size > 0 and time.time() - self.opened_at >= self.rotate_seconds
+
+    def _rotate(self):
+        """Move the log and its drafts file aside together, so each rotated pair is self-contained"""
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        for path in (self.path, self.drafts_path):
+            if os.path.exists(path):
+                base, ext = _split_ext(path)
+                os.replace(path, f"{base}.{stamp}{ext}")
+        # Rows in the new log must not reference drafts that only the rotated drafts file holds
+        self.seen_drafts.clear()
+        self.opened_at = time.time()
+        logger.info("🗂️ Rotated escalation log %s", self.path)
+
+    def _append(self, records: List[Dict[str, Any]]):
+        """Append records and their unseen drafts under the log's exclusive lock, rotating first if due"""
+        while True:
+            f = open(self.path, "ab")
+            try:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                # Another process may have rotated the file while we waited for the lock
+                if not os.path.exists(self.path) or os.stat(self.path).st_ino != os.fstat(f.fileno()).st_ino:
+                    continue
+                size = os.fstat(f.fileno()).st_size
+                if self._should_rotate(size) or self._legacy_header(self.path, size):
+                    self._rotate()
+                    continue
+                if os.fstat(f.fileno()).st_ino != self.log_inode:
+                    # A log this process has not written to yet, e.g. rotated by another process
+                    self.seen_drafts.clear()
+                    self.log_inode = os.fstat(f.fileno()).st_ino
+
+                drafts: Dict[str, str] = {}
+                rows = [self._compact(record, drafts) for record in records]
+                if drafts:
+                    self._append_drafts(self._encode_drafts(drafts))
+                text = self._encode_rows(rows)
+                if self.backend == "csv" and size == 0:
+                    text = ",".join(CSV_HEADER) + "\r\n" + text
+                f.write(self._encode_file(self.path, text))
+                f.flush()
+                self.seen_drafts.update(drafts)
+                return
+            finally:
+                f.close()  # closing the descriptor releases the lock
+
+    def _append_drafts(self, text: str):
+        """Append to the drafts file; callers hold the log's lock, which also guards its rotation"""
+        with open(self.drafts_path, "ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            f.write(self._encode_file(self.drafts_path, text))
+
+    def _encode_file(self, path: str, text: str) -> bytes:
+        data = text.encode("utf-8")
+        # Each batch is a complete gzip member; concatenated members read back as one stream
+        return gzip.compress(data) if path.endswith(".gz") else data
+
+    def _legacy_header(self, path: str, size: int) -> bool:
+        """True for a CSV written in the old full-text format, which must not be appended to"""
+        if self.backend != "csv" or size == 0:
+            return False
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return f.readline().strip() != ",".join(CSV_HEADER)
+
+    def _write_sqlite(self, rows: List[Dict[str, Any]], drafts: Dict[str, str]):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, timeout=30.0)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS escalations (
+                timestamp TEXT, subject TEXT, description TEXT, attempts INTEGER, feedback TEXT, failed_draft_ids TEXT)""")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS drafts (id TEXT PRIMARY KEY, draft TEXT)")
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO drafts (id, draft) VALUES (?, ?)", drafts.items())
+            self.conn.executemany(
+                "INSERT INTO escalations VALUES (?, ?, ?, ?, ?, ?)",
+                [(r["timestamp"], r["subject"], r["description"], r["attempts"], r["feedback"], ";".join(r["failed_draft_ids"]))
+                 for r in rows],
+            )
+
+
+_sink_lock = threading.Lock()
+_sink: Optional[EscalationSink] = None
+
+
+def get_escalation_sink() -> EscalationSink:
+    """Process-wide sink configured from ESCALATION_* settings"""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            backend = env_str("ESCALATION_BACKEND", "csv").lower()
+            _sink = EscalationSink(
+                env_str("ESCALATION_LOG", DEFAULT_PATHS.get(backend, DEFAULT_PATHS["csv"])),
+                backend=backend,
+                max_bytes=env_int("ESCALATION_MAX_BYTES", 10 * 1024 * 1024),
+                rotate_seconds=env_float("ESCALATION_ROTATE_SECONDS", 0),
+                flush_seconds=env_float("ESCALATION_FLUSH_SECONDS", 1.0),
+                batch_size=env_int("ESCALATION_BATCH_SIZE", 100),
+            )
+        return _sink
@@ -0,0 +1,153 @@
+"""
+Embedding-based ticket classifier.
+
+A nearest-centroid classifier over the sentence-transformer embeddings that
+SimpleRAG already computes. Centroids are trained from the knowledge base
+documents plus any labeled historical tickets, so most tickets are classified
+without an LLM call; the classify node only asks the LLM when the confidence
+is below CLASSIFIER_CONFIDENCE_THRESHOLD.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import env_float, env_str
+from vector_index import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+
+class CentroidClassifier:
+    """Cosine nearest-centroid classifier with softmax confidences"""
+
+    def __init__(self, categories: List[str], centroids: np.ndarray, temperature: float = 0.05):
+        self.categories = categories
+        self.centroids = normalize_rows(centroids)
+        self.temperature = temperature
+
+    @classmethod
+    def fit(cls, embeddings: np.ndarray, labels: List[str], categories: List[str],
+            temperature: float = 0.05) -> "CentroidClassifier":
+        """Train one centroid per category from labeled embeddings"""
+        vectors = normalize_rows(embeddings)
+        labels = np.asarray(labels)
+        known = [c for c in categories if np.any(labels == c)]
+        centroids = np.stack([vectors[labels == c].mean(axis=0) for c in known])
+        return cls(known, centroids, temperature)
+
+    def predict(self, embedding: np.ndarray) -> Tuple[str, float]:
+        """Return the best category and its softmax probability"""
+        scores = self.centroids @ normalize_rows(embedding)[0]
+        logits = (scores - scores.max()) / self.temperature
+        probabilities = np.exp(logits) / np.exp(logits).sum()
+        best = int(np.argmax(probabilities))
+        return self.categories[best], float(probabilities[best])
+
+
+def load_labeled_tickets(path: str) -> List[Dict[str, str]]:
+    """Historical tickets from a JSONL file with subject, description and category"""
+    if not os.path.exists(path):
+        return []
+    tickets = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                ticket = json.loads(line)
+                if ticket.get("category"):
+                    tickets.append(ticket)
+    return tickets
+
+
+def build_classifier(rag_system, categories: List[str]) -> Optional[CentroidClassifier]:
+    """
+    Train the classifier from the RAG knowledge base and labeled tickets.
+
+    Knowledge base rows are reused from the already-normalized search index,
+    a category at a time (a quantized index never rebuilds its whole float32
+    matrix), so only the historical tickets need encoding.
+    """
+    from nodes.retrieve import build_search_query
+    from vector_index import BUILD_CHUNK_ROWS
+
+    if not rag_system.model or not len(rag_system.index):
+        return None
+
+    index = rag_system.index
+    sums: Dict[str, np.ndarray] = {}
+    counts: Dict[str, int] = {}
+    for cid, (start, end) in enumerate(index.ranges):
+        label = index.categories[cid].lower()
+        if label not in categories or end <= start:
+            continue
+        total = np.zeros(index.dim, dtype=np.float64)
+        for offset in range(start, end, BUILD_CHUNK_ROWS):
+            total += index.vectors(np.arange(offset, min(offset + BUILD_CHUNK_ROWS, end))).sum(axis=0)
+        sums[label], counts[label] = total, end - start
+
+    tickets = load_labeled_tickets(env_str("CLASSIFIER_TRAINING_PATH", "data/labeled_tickets.jsonl"))
+    tickets = [t for t in tickets if t["category"].lower() in categories]
+    if tickets:
+        texts = [build_search_query(t.get("subject", ""), t.get("description", "")) for t in tickets]
+        vectors = normalize_rows(np.asarray(rag_system.model.encode(texts, batch_size=64), dtype=np.float32))
+        for ticket, vector in zip(tickets, vectors):
+            label = ticket["category"].lower()
+            sums[label] = sums.get(label, 0) + vector
+            counts[label] = counts.get(label, 0) + 1
+
+    known = [c for c in categories if counts.get(c)]
+    if not known:
+        return None
+    classifier = CentroidClassifier(known, np.stack([sums[c] / counts[c] for c in known]).astype(np.float32))
+    logger.info("✅ Fast classifier ready: %s categories, %s examples (%s tickets)",
+                len(classifier.categories), sum(counts.values()), len(tickets))
+    return classifier
+
+
+_classifier_lock = threading.Lock()
+_classifier: Optional[CentroidClassifier] = None
+_classifier_version: Optional[str] = None
+
+
+def get_fast_classifier(categories: List[str]) -> Optional[CentroidClassifier]:
+    """
+    Shared classifier instance; None if no encoder is available.
+
+    Built on first use and rebuilt when the knowledge base version changes,
+    so centroids follow SimpleRAG.reload().
+    """
+    global _classifier, _classifier_version
+    from simple_rag import get_rag_system
+
+    rag_system = get_rag_system()
+    with _classifier_lock:
+        if _classifier_version != rag_system.kb_version:
+            try:
+                _classifier = build_classifier(rag_system, categories)
+            except Exception as e:
+                logger.warning("⚠️ Fast classifier unavailable: %s", e)
+                _classifier = None
+            _classifier_version = rag_system.kb_version
+        return _classifier
+
+
+def classify_by_embedding(subject: str, description: str, categories: List[str]) -> Optional[Tuple[str, float]]:
+    """
+    Predict ``(category, confidence)`` for a ticket, or None if the fast path is off.
+
+    CLASSIFIER_CONFIDENCE_THRESHOLD >= 1 disables the fast path entirely.
+    """
+    if env_float("CLASSIFIER_CONFIDENCE_THRESHOLD", 0.7) >= 1:
+        return None
+    classifier = get_fast_classifier(categories)
+    if classifier is None:
+        return None
+
+    from nodes.retrieve import build_search_query
+    from simple_rag import get_rag_system
+
+    embedding = get_rag_system().embed_query(build_search_query(subject, description))
+    return classifier.predict(embedding)
@@ -0,0 +1,251 @@
+"""
+Streaming ingestion of a document corpus into an on-disk retrieval index.
+
+Usage:
+    python src/ingest.py docs/ --output data/corpus.jsonl [--chunk-chars 800]
+                         [--overlap 120] [--batch-size 64] [--category general]
+
+Reads .txt/.md files and .jsonl records ({"text", "category", "source"}) from
+the given files or directories, splits them into overlapping chunks and
+encodes the chunks in fixed-size batches. Memory use is bounded by one read
+block and one batch, whatever the corpus size: encoded rows go straight to
+per-category spill files and are stitched into the index at the end.
+
+Output, next to --output:
+- corpus.jsonl:           one chunk per line with category, text, source and offset
+- corpus.embeddings.npy,
+  corpus.manifest.json:   the EmbeddingStore index, so SimpleRAG loads it without re-encoding
+
+Point RAG_KNOWLEDGE_BASE at the .jsonl file to serve it. Text files take
+their category from their first directory under the input root.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+from embedding_store import MANIFEST_VERSION, EmbeddingStore, content_hash
+from encoders import BACKENDS, create_encoder, encoder_id
+from logging_config import configure_logging
+from vector_index import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTENSIONS = (".txt", ".md", ".markdown")
+READ_BLOCK_CHARS = 1 << 16
+
+
+def _break_point(text: str, limit: int) -> int:
+    """End of the chunk starting at text[0]: the last paragraph, line, sentence or word break before ``limit``"""
+    if len(text) <= limit:
+        return len(text)
+    window = text[:limit]
+    for separator in ("\n\n", "\n", ". ", " "):
+        cut = window.rfind(separator, limit // 2)
+        if cut != -1:
+            return cut + len(separator)
+    return limit
+
+
+def chunk_stream(reader: TextIO, chunk_chars: int = 800, overlap: int = 120) -> Iterator[Tuple[int, str]]:
+    """
+    Yield ``(offset, text)`` chunks of at most ``chunk_chars`` characters.
+
+    Consecutive chunks share about ``overlap`` characters, starting on a word
+    boundary. ``offset`` is the character position of the chunk in the source.
+    Only a couple of chunks worth of text is held in memory at once.
+    """
+    overlap = max(0, min(overlap, chunk_chars // 2))
+    buffer, offset, eof = "", 0, False
+    while True:
+        while not eof and len(buffer) < chunk_chars + READ_BLOCK_CHARS:
+            data = reader.read(READ_BLOCK_CHARS)
+            eof = not data
+            buffer += data
+        end = _break_point(buffer, chunk_chars)
+        chunk = buffer[:end]
+        if chunk.strip():
+            lead = len(chunk) - len(chunk.lstrip())
+            yield offset + lead, chunk.strip()
+        if end >= len(buffer) and eof:
+            return
+
+        start = end
+        if overlap:
+            boundary = buffer.find(" ", end - overlap, end)
+            start = boundary + 1 if boundary != -1 else end - overlap
+        buffer, offset = buffer[start:], offset + start
+
+
+def iter_files(paths: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """``(root, path)`` for every supported file under ``paths``, in a stable order"""
+    for root in paths:
+        if os.path.isfile(root):
+            yield os.path.dirname(root), root
+            continue
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories.sort()
+            for name in sorted(files):
+                if name.endswith(TEXT_EXTENSIONS + (".jsonl",)):
+                    yield root, os.path.join(directory, name)
+
+
+def iter_chunks(paths: Iterable[str], chunk_chars: int = 800, overlap: int = 120,
+                default_category: str = "general") -> Iterator[Dict]:
+    """Chunk records (category, text, source, offset) for every document under ``paths``"""
+    for root, path in iter_files(paths):
+        relative = os.path.relpath(path, root)
+        if path.endswith(".jsonl"):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        logger.warning("⚠️ Skipping invalid JSON at %s:%s", path, line_number)
+                        continue
+                    text = str(record.get("text") or record.get("content") or "")
+                    category = str(record.get("category") or default_category)
+                    source = str(record.get("source") or f"{relative}:{line_number}")
+                    for offset, chunk in chunk_stream(StringIO(text), chunk_chars, overlap):
+                        yield {"category": category, "text": chunk, "source": source, "offset": offset}
+        else:
+            parts = relative.split(os.sep)
+            category = parts[0] if len(parts) > 1 else default_category
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for offset, chunk in chunk_stream(f, chunk_chars, overlap):
+                    yield {"category": category, "text": chunk, "source": relative, "offset": offset}
+
+
+class _CategorySpill:
+    """Encoded rows and chunk records of one category, appended as batches finish"""
+
+    def __init__(self, directory: str, index: int):
+        self.rows_path = os.path.join(directory, f"{index}.f32")
+        self.chunks_path = os.path.join(directory, f"{index}.jsonl")
+        self.rows = open(self.rows_path, "wb")
+        self.chunks = open(self.chunks_path, "w", encoding="utf-8")
+        self.count = 0
+
+    def append(self, chunk: Dict, row: np.ndarray):
+        self.rows.write(np.ascontiguousarray(row, dtype="<f4").tobytes())
+        self.chunks.write(json.dumps(chunk) + "\n")
+        self.count += 1
+
+    def close(self):
+        self.rows.close()
+        self.chunks.close()
+
+
+def ingest(paths: Iterable[str], output: str, model_name: str = "all-MiniLM-L6-v2", encoder=None,
+           chunk_chars: int = 800, overlap: int = 120, batch_size: int = 64,
+           default_category: str = "general", backend: Optional[str] = None) -> Dict:
+    """
+    Chunk, encode and index a corpus; returns ingestion stats.
+
+    The corpus, matrix and manifest are replaced atomically at the end, the
+    corpus last, so a server watching it reloads onto a complete index.
+    ``backend`` (RAG_ENCODER_BACKEND) should match the server's, or it re-encodes.
+    """
+    store = EmbeddingStore(output, model_name if encoder is not None else encoder_id(model_name, backend))
+    encoder = encoder or create_encoder(model_name, backend)
+    started = time.perf_counter()
+    spills: Dict[str, _CategorySpill] = {}
+    dim: Optional[int] = None
+    chunks = 0
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output))) as directory:
+        def flush(batch: List[Dict]):
+            nonlocal dim, chunks
+            # Unit-length rows, as EmbeddingStore writes them
+            rows = normalize_rows(encoder.encode([chunk["text"] for chunk in batch]))
+            dim = rows.shape[1]
+            for chunk, row in zip(batch, rows):
+                spill = spills.get(chunk["category"])
+                if spill is None:
+                    spill = spills[chunk["category"]] = _CategorySpill(directory, len(spills))
+                spill.append(chunk, row)
+            chunks += len(batch)
+            logger.debug("📥 %s chunks encoded", chunks)
+
+        batch: List[Dict] = []
+        for chunk in iter_chunks(paths, chunk_chars, overlap, default_category):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        for spill in spills.values():
+            spill.close()
+        if not chunks:
+            raise ValueError(f"No documents found in {', '.join(paths)}")
+
+        # Stitch the spills together category by category, so each category is one contiguous block of rows
+        tmp_matrix, tmp_manifest, tmp_corpus = (f"{path}.tmp" for path in (store.matrix_path, store.manifest_path, output))
+        with open(tmp_matrix, "wb") as matrix, open(tmp_manifest, "w") as manifest, \
+                open(tmp_corpus, "w", encoding="utf-8") as corpus:
+            np.lib.format.write_array_header_1_0(matrix, {
+                "descr": np.lib.format.dtype_to_descr(np.dtype("<f4")),
+                "fortran_order": False,
+                "shape": (chunks, dim),
+            })
+            manifest.write(json.dumps({"version": MANIFEST_VERSION, "model": store.model_name, "dim": dim})[:-1]
+                           + ', "documents": [')
+            first = True
+            for category, spill in spills.items():
+                with open(spill.rows_path, "rb") as rows:
+                    shutil.copyfileobj(rows, matrix)
+                with open(spill.chunks_path, "r", encoding="utf-8") as lines:
+                    for line in lines:
+                        corpus.write(line)
+                        entry = {"category": category, "hash": content_hash(json.loads(line)["text"])}
+                        manifest.write(("" if first else ", ") + json.dumps(entry))
+                        first = False
+            manifest.write("]}")
+
+        os.replace(tmp_matrix, store.matrix_path)
+        os.replace(tmp_manifest, store.manifest_path)
+        os.replace(tmp_corpus, output)
+
+    seconds = time.perf_counter() - started
+    stats = {
+        "chunks": chunks,
+        "categories": {category: spill.count for category, spill in spills.items()},
+        "dim": dim,
+        "seconds": round(seconds, 3),
+        "chunks_per_second": round(chunks / seconds, 1) if seconds > 0 else None,
+    }
+    logger.info("✅ Indexed %s chunks in %.1fs (%s chunks/s) into %s", chunks, seconds, stats["chunks_per_second"], output)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Chunk, encode and index a directory of documents")
+    parser.add_argument("paths", nargs="+", help="files or directories of .txt, .md and .jsonl documents")
+    parser.add_argument("--output", default="data/corpus.jsonl", help="corpus file; the index is written next to it")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="sentence transformer used for encoding")
+    parser.add_argument("--backend", choices=BACKENDS, help="encoder backend (default: RAG_ENCODER_BACKEND)")
+    parser.add_argument("--chunk-chars", type=int, default=800, help="maximum characters per chunk")
+    parser.add_argument("--overlap", type=int, default=120, help="characters shared by consecutive chunks")
+    parser.add_argument("--batch-size", type=int, default=64, help="chunks per encoder call")
+    parser.add_argument("--category", default="general", help="category of files outside a category directory")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    stats = ingest(args.paths, args.output, args.model, chunk_chars=args.chunk_chars, overlap=args.overlap,
+                   batch_size=args.batch_size, default_category=args.category, backend=args.backend)
+    print(f"📊 {stats['chunks']} chunks in {stats['seconds']}s: "
+          + ", ".join(f"{category} {count}" for category, count in stats["categories"].items()))
+
+
+if __name__ == "__main__":
+    main()
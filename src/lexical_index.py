@@ -0,0 +1,122 @@
+"""
+BM25 keyword search over the same rows as a VectorIndex.
+
+Error codes, version numbers and acronyms ("E1042", "Android 9", "2FA") are
+what a small sentence encoder handles worst and an inverted index handles
+best. The index needs only numpy, so it also serves retrieval on its own when
+the encoder is unavailable or RAG_RETRIEVAL_MODE=lexical.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from vector_index import VectorIndex, top_k_indices
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Only the most frequent function words; anything rarer is left to BM25's idf
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from has have how i if in is it its me my no not of on or our "
+    "please so that the their them there this to was we were what when which will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens without stopwords; "2FA" and "E-1042" keep their digits"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Merge ranked lists of rows; each list adds 1 / (k + rank) to a row's score.
+
+    Only ranks matter, so cosine similarities and BM25 scores can be fused
+    without calibrating one against the other.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, 1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
+
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 scoring.
+
+    Each posting list stores its rows and their precomputed term weights
+    (idf included), so a query only sums the posting lists of its terms.
+    """
+
+    def __init__(self, base: VectorIndex, k1: float = 1.2, b: float = 0.75):
+        self.base = base
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.idf: Dict[str, float] = {}
+
+        # One (term, row) key per token; np.unique turns them into sorted postings with term frequencies
+        n = len(base)
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        lengths = np.zeros(n, dtype=np.float32)
+        for row, document in enumerate(base.documents):
+            tokens = tokenize(document)
+            lengths[row] = len(tokens)
+            term_ids.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+        if not term_ids:
+            return
+        token_rows = np.repeat(np.arange(n, dtype=np.int64), lengths.astype(np.int64))
+        keys, tf = np.unique(np.asarray(term_ids, dtype=np.int64) * n + token_rows, return_counts=True)
+        terms, rows = keys // n, keys % n
+        bounds = np.searchsorted(terms, np.arange(len(vocabulary) + 1))
+        df = np.diff(bounds)
+
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        norms = k1 * (1 - b + b * lengths / lengths.mean())
+        weights = (idf[terms] * tf * (k1 + 1) / (tf + norms[rows])).astype(np.float32)
+        for term, term_id in vocabulary.items():
+            start, end = bounds[term_id], bounds[term_id + 1]
+            self.idf[term] = float(idf[term_id])
+            self.postings[term] = (rows[start:end], weights[start:end])
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    def max_score(self, terms: Iterable[str]) -> float:
+        """Upper bound of a document's score for ``terms``, used to scale scores into [0, 1]"""
+        return sum(self.idf.get(term, 0.0) for term in terms) * (self.k1 + 1)
+
+    def search(
+        self,
+        query: str,
+        category_ids: Optional[Iterable[int]] = None,
+        top_k: int = 3,
+        normalize: bool = False,
+    ) -> List[Tuple[int, float]]:
+        """
+        Return ``(row, score)`` pairs for the best keyword matches, best first.
+
+        With ``normalize`` the scores are divided by ``max_score`` so they can
+        stand in for a similarity.
+        """
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term in self.postings]
+        if not terms or top_k <= 0:
+            return []
+
+        if len(terms) == 1:
+            candidates, scores = self.postings[terms[0]]
+        else:
+            rows = np.concatenate([self.postings[term][0] for term in terms])
+            weights = np.concatenate([self.postings[term][1] for term in terms])
+            candidates, inverse = np.unique(rows, return_inverse=True)
+            scores = np.bincount(inverse, weights=weights).astype(np.float32)
+
+        if category_ids is not None:
+            keep = np.isin(self.base.category_ids[candidates], list(category_ids))
+            candidates, scores = candidates[keep], scores[keep]
+
+        best = top_k_indices(scores, top_k)
+        scale = self.max_score(terms) if normalize else 1.0
+        return [(int(candidates[i]), float(scores[i]) / scale) for i in best]
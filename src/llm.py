@@ -1,16 +1,257 @@
 # from langchain_community.chat_models import ChatOllama
-# from langchain_core.language_models.chat_models import BaseChatModel
-
+# 
 # def get_llm() -> BaseChatModel:
 #     return ChatOllama(model="mistral")
 
 
+import asyncio
+import contextlib
+import threading
+import time
+import weakref
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List
+import httpx
 from langchain_ollama import ChatOllama
-from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, BaseMessageChunk
+from config import env_float, env_int, env_str
+from llm_cache import ChatModel, with_response_cache
+import metrics
+from tracing import span, tracing_active
+
+# Per-role generation settings. Every value can be overridden with
+# LLM_<ROLE>_<SETTING>, e.g. LLM_DRAFT_NUM_PREDICT=768; LLM_MODEL sets the
+# default model for all roles. temperature=0 keeps the agent deterministic.
+ROLE_DEFAULTS: Dict[str, dict] = {
+    "default": {"temperature": 0.0, "num_predict": -1, "num_ctx": 4096},
+    # A single category name is all classify needs back
+    "classify": {"temperature": 0.0, "num_predict": 10, "num_ctx": 2048},
+    "draft": {"temperature": 0.0, "num_predict": 512, "num_ctx": 4096},
+    "review": {"temperature": 0.0, "num_predict": 192, "num_ctx": 4096},
+}
+
+_clients_lock = threading.Lock()
+_clients: Dict[str, ChatModel] = {}
+_loop_clients = weakref.WeakKeyDictionary()
+
+def llm_config(role: str = "default") -> dict:
+    """Resolved ChatOllama settings for a role, after environment overrides"""
+    defaults = ROLE_DEFAULTS.get(role, ROLE_DEFAULTS["default"])
+    prefix = f"LLM_{role.upper()}_"
+    return {
+        "model": env_str(prefix + "MODEL", env_str("LLM_MODEL", "mistral")),
+        "temperature": env_float(prefix + "TEMPERATURE", defaults["temperature"]),
+        "num_predict": env_int(prefix + "NUM_PREDICT", defaults["num_predict"]),
+        "num_ctx": env_int(prefix + "NUM_CTX", defaults["num_ctx"]),
+        "keep_alive": env_str(prefix + "KEEP_ALIVE", env_str("LLM_KEEP_ALIVE", "30m")),
+    }
+
+def _create_llm(role: str) -> ChatModel:
+    # One pooled keep-alive HTTP client per model instance; sized to the
+    # global request limit so concurrent calls never wait on a connection.
+    pool_size = _max_concurrency()
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=env_float("LLM_KEEPALIVE_EXPIRY", 120.0),
+    )
+    llm = ChatOllama(**llm_config(role), client_kwargs={"limits": limits})
+    return with_response_cache(llm, role)
+
+def get_llm(role: str = "default") -> ChatModel:
+    """
+    Returns the shared ChatOllama client for a role (classify, draft, review).
+
+    Clients are created once and reused, so every call after the first skips
+    client construction and reuses pooled keep-alive connections. Responses
+    are served from the disk cache when possible (see llm_cache). Async
+    callers get one client per event loop because async HTTP connections
+    cannot be shared between loops.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    with _clients_lock:
+        clients = _clients if loop is None else _loop_clients.setdefault(loop, {})
+        llm = clients.get(role)
+        if llm is None:
+            llm = _create_llm(role)
+            clients[role] = llm
+        return llm
+
+def reset_llm_clients():
+    """Forget all shared clients, e.g. after changing LLM_* settings"""
+    with _clients_lock:
+        _clients.clear()
+        _loop_clients.clear()
+
+def warm_llm(role: str = "default") -> str:
+    """
+    Load a role's model into Ollama memory ahead of the first ticket.
+
+    An empty prompt loads the model without generating anything; num_ctx
+    must match the role's, or Ollama reloads the model on the first real call.
+    """
+    from ollama import Client
+
+    config = llm_config(role)
+    Client(timeout=env_float("LLM_WARMUP_TIMEOUT", 300.0)).generate(
+        model=config["model"], prompt="", keep_alive=config["keep_alive"], options={"num_ctx": config["num_ctx"]})
+    return config["model"]
+
 
-def get_llm() -> BaseChatModel:
+# Global limit on outstanding LLM requests (LLM_MAX_CONCURRENCY) so a large
+# batch or many async tickets cannot overload the Ollama server. One limiter is
+# shared by sync callers and every event loop, so the cap holds process-wide.
+class _LLMSlots:
     """
-    Returns an instance of the ChatOllama LLM configured for agents.
-    Using temperature=0 for more deterministic behavior for a reviewer/agent.
+    A counting semaphore that threads and coroutines on any event loop can wait on.
+
+    Waiters queue in arrival order and a released slot is handed straight to
+    the first one: a thread is woken through its Event, a coroutine through a
+    future resolved on its own loop. Coroutines never block their loop.
     """
-    return ChatOllama(model="mistral", temperature=0)
\ No newline at end of file
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self._waiters: Deque = deque()  # threading.Event or (loop, future)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _take_free_slot(self) -> bool:
+        if self.active < _max_concurrency() and not self._waiters:
+            self.active += 1
+            return True
+        return False
+
+    def acquire(self):
+        with self._lock:
+            if self._take_free_slot():
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._take_free_slot():
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # Already handed a slot: if the future was cancelled _hand_over releases it, else pass it on here
+            if not waiter[1].cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            if not self._waiters or self.active > _max_concurrency():
+                self.active -= 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+            return
+        loop, future = waiter
+        try:
+            loop.call_soon_threadsafe(_hand_over, future, self)
+        except RuntimeError:
+            self.release()  # the waiter's loop is closed
+
+def _hand_over(future: asyncio.Future, slots: "_LLMSlots"):
+    if future.done():
+        # The waiter was cancelled after being picked; nobody else will release its slot
+        slots.release()
+    else:
+        future.set_result(None)
+
+_slots = _LLMSlots()
+
+def _max_concurrency() -> int:
+    return max(1, env_int("LLM_MAX_CONCURRENCY", 8))
+
+def _prompt_size(messages: List[BaseMessage]) -> dict:
+    """Prompt size for the trace; only computed when the ticket is being traced"""
+    if not tracing_active():
+        return {}
+    return {"messages": len(messages), "prompt_chars": sum(len(str(getattr(m, "content", m))) for m in messages)}
+
+def llm_queue_depth() -> int:
+    """Number of LLM calls currently waiting for a free slot"""
+    return _slots.waiting
+
+@contextlib.contextmanager
+def _thread_slot():
+    _slots.acquire()
+    try:
+        yield
+    finally:
+        _slots.release()
+
+@contextlib.asynccontextmanager
+async def _async_slot():
+    await _slots.aacquire()
+    try:
+        yield
+    finally:
+        _slots.release()
+
+def invoke_llm(llm: ChatModel, messages: List[BaseMessage], role: str = "default") -> BaseMessage:
+    """Call ``llm.invoke`` while holding one of the global LLM slots"""
+    started = time.perf_counter()
+    with span(f"llm.{role}", "llm", **_prompt_size(messages)) as trace_span:
+        try:
+            with _thread_slot():
+                response = llm.invoke(messages)
+        except Exception:
+            metrics.inc("llm_errors_total", role=role)
+            raise
+        trace_span.set(**metrics.llm_usage(response))
+    metrics.record_llm_response(role, response, time.perf_counter() - started)
+    return response
+
+async def ainvoke_llm(llm: ChatModel, messages: List[BaseMessage], role: str = "default") -> BaseMessage:
+    """Call ``llm.ainvoke`` while holding one of the global LLM slots"""
+    started = time.perf_counter()
+    with span(f"llm.{role}", "llm", **_prompt_size(messages)) as trace_span:
+        try:
+            async with _async_slot():
+                response = await llm.ainvoke(messages)
+        except Exception:
+            metrics.inc("llm_errors_total", role=role)
+            raise
+        trace_span.set(**metrics.llm_usage(response))
+    metrics.record_llm_response(role, response, time.perf_counter() - started)
+    return response
+
+async def astream_llm(llm: ChatModel, messages: List[BaseMessage], role: str = "default") -> AsyncIterator[BaseMessageChunk]:
+    """Stream ``llm.astream`` chunks, holding an LLM slot until the stream ends"""
+    started = time.perf_counter()
+    response = None
+    with span(f"llm.{role}", "llm", stream=True, **_prompt_size(messages)) as trace_span:
+        try:
+            async with _async_slot():
+                async for chunk in llm.astream(messages):
+                    if response is None:
+                        trace_span.set(first_token_ms=round((time.perf_counter() - started) * 1000, 1))
+                    # Summing chunks merges their metadata, so token counts from the final chunk survive
+                    response = chunk if response is None else response + chunk
+                    yield chunk
+        except Exception:
+            metrics.inc("llm_errors_total", role=role)
+            raise
+        trace_span.set(**metrics.llm_usage(response))
+    metrics.record_llm_response(role, response, time.perf_counter() - started)
@@ -0,0 +1,223 @@
+"""
+Disk-backed cache for LLM responses.
+
+The pipeline runs at temperature=0, so an identical prompt sent to the same
+model with the same settings always gets the same answer. ResponseCache stores
+those answers in a local SQLite file (WAL mode, so several worker processes can
+share it) with per-role TTLs and LRU eviction once it grows past its size limit.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, BaseMessageChunk
+
+from config import env_bool, env_int, env_str
+
+# Seconds a cached answer stays valid for each role (LLM_CACHE_TTL_<ROLE>), 0 disables caching
+ROLE_TTLS = {
+    "default": 24 * 3600,
+    "classify": 7 * 24 * 3600,
+    "draft": 24 * 3600,
+    "review": 24 * 3600,
+}
+
+# Settings that change the model's output and therefore belong in the cache key
+KEY_PARAMS = ("model", "temperature", "num_predict", "num_ctx", "top_k", "top_p", "seed", "stop", "format")
+
+
+def _normalize_content(content: Any) -> Any:
+    """Ignore indentation and trailing whitespace differences in prompt text"""
+    if isinstance(content, str):
+        return "\n".join(line.strip() for line in content.strip().splitlines())
+    return content
+
+
+def cache_key(model: BaseChatModel, messages: List[BaseMessage]) -> str:
+    """Hash of the model, its generation parameters and the normalized messages"""
+    payload = {
+        "params": {name: getattr(model, name, None) for name in KEY_PARAMS},
+        "messages": [(message.type, _normalize_content(message.content)) for message in messages],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response store shared by all roles and worker processes"""
+
+    def __init__(self, path: str, max_entries: int = 10_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._local = threading.local()
+        self._writes = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    expires REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers and a writer work concurrently"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, role: str) -> Optional[str]:
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute("SELECT content, expires FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < now:
+            self.misses[role] += 1
+            return None
+        conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        self.hits[role] += 1
+        return row[0]
+
+    def put(self, key: str, role: str, content: str, ttl: float):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, role, content, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, role, content, now + ttl, now),
+        )
+        self._writes += 1
+        # Evicting on every write would rescan the table; amortize it instead
+        if self._writes % 100 == 1:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then the least recently used ones beyond max_entries"""
+        conn = self._connection()
+        removed = conn.execute("DELETE FROM responses WHERE expires < ?", (time.time(),)).rowcount
+        count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            removed += conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,),
+            ).rowcount
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": dict(self.hits), "misses": dict(self.misses), "entries": entries}
+
+
+class CachedChatModel:
+    """
+    Wraps a chat model so invoke/ainvoke/astream answers come from the cache when possible.
+
+    Only deterministic (temperature=0) models are cached. Every other attribute
+    is forwarded to the wrapped model.
+    """
+
+    def __init__(self, llm: BaseChatModel, cache: ResponseCache, role: str, ttl: float):
+        self.llm = llm
+        self.cache = cache
+        self.role = role
+        self.ttl = ttl
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+    def _cacheable(self) -> bool:
+        return self.ttl > 0 and getattr(self.llm, "temperature", None) == 0
+
+    def _hit(self, content: str) -> AIMessage:
+        return AIMessage(content=content, response_metadata={"cache_hit": True})
+
+    def invoke(self, messages: List[BaseMessage], *args, **kwargs) -> BaseMessage:
+        if not self._cacheable():
+            return self.llm.invoke(messages, *args, **kwargs)
+        key = cache_key(self.llm, messages)
+        content = self.cache.get(key, self.role)
+        if content is not None:
+            return self._hit(content)
+        response = self.llm.invoke(messages, *args, **kwargs)
+        if isinstance(response.content, str):
+            self.cache.put(key, self.role, response.content, self.ttl)
+        return response
+
+    async def ainvoke(self, messages: List[BaseMessage], *args, **kwargs) -> BaseMessage:
+        if not self._cacheable():
+            return await self.llm.ainvoke(messages, *args, **kwargs)
+        key = cache_key(self.llm, messages)
+        # SQLite may wait on another process's write lock, so keep it off the event loop
+        content = await asyncio.to_thread(self.cache.get, key, self.role)
+        if content is not None:
+            return self._hit(content)
+        response = await self.llm.ainvoke(messages, *args, **kwargs)
+        if isinstance(response.content, str):
+            await asyncio.to_thread(self.cache.put, key, self.role, response.content, self.ttl)
+        return response
+
+    async def astream(self, messages: List[BaseMessage], *args, **kwargs) -> AsyncIterator[BaseMessageChunk]:
+        if not self._cacheable():
+            async for chunk in self.llm.astream(messages, *args, **kwargs):
+                yield chunk
+            return
+        key = cache_key(self.llm, messages)
+        content = await asyncio.to_thread(self.cache.get, key, self.role)
+        if content is not None:
+            # A cached answer arrives as one chunk
+            yield AIMessageChunk(content=content, response_metadata={"cache_hit": True})
+            return
+        parts = []
+        async for chunk in self.llm.astream(messages, *args, **kwargs):
+            if isinstance(chunk.content, str):
+                parts.append(chunk.content)
+            yield chunk
+        await asyncio.to_thread(self.cache.put, key, self.role, "".join(parts), self.ttl)
+
+
+# What get_llm() hands out: a chat model, wrapped in the response cache when caching is on
+ChatModel = Union[BaseChatModel, CachedChatModel]
+
+
+_cache_lock = threading.Lock()
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The process-wide response cache, or None when LLM_CACHE_ENABLED is off"""
+    global _cache
+    if not env_bool("LLM_CACHE_ENABLED", True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                env_str("LLM_CACHE_PATH", ".cache/llm_responses.sqlite"),
+                max_entries=env_int("LLM_CACHE_MAX_ENTRIES", 10_000),
+            )
+        return _cache
+
+
+def with_response_cache(llm: BaseChatModel, role: str) -> ChatModel:
+    """Wrap ``llm`` in the response cache for ``role`` if caching is enabled"""
+    cache = get_response_cache()
+    ttl = env_int(f"LLM_CACHE_TTL_{role.upper()}", ROLE_TTLS.get(role, ROLE_TTLS["default"]))
+    if cache is None or ttl <= 0:
+        return llm
+    return CachedChatModel(llm, cache, role, ttl)
@@ -0,0 +1,44 @@
+"""
+Logging setup for the support agent.
+
+Modules log through ``logging.getLogger(__name__)`` with lazy %-style
+arguments, so messages below LOG_LEVEL are never formatted. LOG_FORMAT=json
+emits one JSON object per line, including any ``extra={...}`` fields, for log
+shippers; the default is plain text.
+"""
+import json
+import logging
+import sys
+
+from config import env_str
+
+# Attributes every LogRecord has; anything else came from ``extra=``
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _RESERVED})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(force: bool = False):
+    """Install a stderr handler from LOG_LEVEL/LOG_FORMAT unless logging is already configured"""
+    root = logging.getLogger()
+    if root.handlers and not force:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    if env_str("LOG_FORMAT", "text").lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(message)s"))
+    root.handlers = [handler]
+    root.setLevel(getattr(logging, env_str("LOG_LEVEL", "INFO").upper(), logging.INFO))
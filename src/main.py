@@ -1,64 +1,94 @@
 # File: src/main.py
+import logging
+import threading
 from langgraph.graph import StateGraph, END
 from state import AgentState
 from nodes.input_node import receive_input
-from nodes.classify import classify
-from nodes.retrieve import retrieve
-from nodes.draft import draft
-from nodes.review import review
+from nodes.cache_lookup import acache_lookup, cache_lookup, route_cache
+from nodes.classify import aclassify, classify
+from nodes.retrieve import aretrieve, retrieve
+from nodes.draft import adraft, draft
+from nodes.review import areview, review
+from nodes.speculative import speculative_candidates, speculative_draft, speculative_draft_sync
 from nodes.retry import retry_with_feedback
 from nodes.escalate import escalate
+from logging_config import configure_logging
+from config import env_bool
+from metrics import start_metrics_exporter, timed_node
+from tracing import trace_graph, traced_node
+from warmup import warmup
 
-def create_support_agent():
-    """Create and return the compiled support agent graph"""
+logger = logging.getLogger(__name__)
+
+# Conditional routing from review
+def route_review(state: AgentState) -> str:
+    """Route based on review result and attempt count"""
+    logger.debug("🔍 Routing review: review_result=%s, attempts=%s", state.get("review_result"), state.get("attempts", 0))
+    # Check if review was approved
+    if state.get("review_result") == "APPROVED":
+        return "end"
+
+    # If rejected, check current attempts
+    current_attempts = state.get("attempts", 0)
+    # 'attempts' is incremented by the 'review' node itself on rejection.
+    # So, if current_attempts is 2, it means it has been rejected twice already.
+    if current_attempts >= 2:
+        return "escalate"
+
+    # Otherwise, retry (meaning current_attempts is 0 or 1)
+    return "retry"
+
+def _build_graph(cache_node, classify_node, retrieve_node, draft_node, review_node, speculative=False):
+    """
+    Wire the support agent graph around the given LLM/RAG node implementations.
+
+    With ``speculative=True`` the draft node reviews its own candidates, so it
+    routes straight to retry/escalate/end instead of going through review.
+    """
     graph = StateGraph(AgentState)
 
-    # Add nodes
-    graph.add_node("input", receive_input)
-    graph.add_node("classify", classify)
-    graph.add_node("retrieve", retrieve)
-    graph.add_node("draft", draft)
-    graph.add_node("review", review)
-    graph.add_node("retry", retry_with_feedback)
-    graph.add_node("escalate", escalate)
+    # Add nodes, each timed into the node_seconds histogram and traced as a span
+    nodes = {
+        "input": receive_input,
+        "cache_lookup": cache_node,
+        "classify": classify_node,
+        "retrieve": retrieve_node,
+        "draft": draft_node,
+        "review": review_node,
+        "retry": retry_with_feedback,
+        "escalate": escalate,
+    }
+    for name, node in nodes.items():
+        graph.add_node(name, timed_node(name, traced_node(name, node)))
 
     # Set entry point
     graph.set_entry_point("input")
 
     # Add sequential edges
-    graph.add_edge("input", "classify")
-    graph.add_edge("classify", "retrieve")
-    graph.add_edge("retrieve", "draft")
-    graph.add_edge("draft", "review")
-
-    # Conditional routing from review
-    def route_review(state: AgentState) -> str:
-        """Route based on review result and attempt count"""
-        print(f"🔍 Routing review: review_result={state.get('review_result')}, attempts={state.get('attempts', 0)}")
-        # Check if review was approved
-        if state.get("review_result") == "APPROVED":
-            return "end"
-
-        # If rejected, check current attempts
-        current_attempts = state.get("attempts", 0)
-        # 'attempts' is incremented by the 'review' node itself on rejection.
-        # So, if current_attempts is 2, it means it has been rejected twice already.
-        if current_attempts >= 2:
-            return "escalate"
-
-        # Otherwise, retry (meaning current_attempts is 0 or 1)
-        return "retry"
-
-    # Add conditional edges with proper mapping
+    graph.add_edge("input", "cache_lookup")
     graph.add_conditional_edges(
-        "review",
-        route_review,
+        "cache_lookup",
+        route_cache,
         {
-            "end": END,
-            "retry": "retry",
-            "escalate": "escalate"
+            "classify": "classify",
+            "review": "review",
+            "end": END
         }
     )
+    graph.add_edge("classify", "retrieve")
+    graph.add_edge("retrieve", "draft")
+
+    # Add conditional edges with proper mapping
+    review_routes = {
+        "end": END,
+        "retry": "retry",
+        "escalate": "escalate"
+    }
+    if speculative:
+        graph.add_conditional_edges("draft", route_review, review_routes)
+    else:
+        graph.add_edge("draft", "review")
+    graph.add_conditional_edges("review", route_review, review_routes)
 
     # Corrected Retry path: Retry goes back to draft to generate a new response
     graph.add_edge("retry", "draft")
@@ -66,7 +96,77 @@ def create_support_agent():
     # Escalation path
     graph.add_edge("escalate", END)
 
-    return graph.compile()
+    return trace_graph(graph.compile())
+
+def create_support_agent():
+    """Create and return the compiled support agent graph"""
+    if speculative_candidates() > 1:
+        return _build_graph(cache_lookup, classify, retrieve, speculative_draft_sync, review, speculative=True)
+    return _build_graph(cache_lookup, classify, retrieve, draft, review)
+
+def create_async_support_agent():
+    """
+    Create the support agent graph with async LLM/RAG nodes.
+
+    Use ainvoke/abatch on the result: tickets share one event loop and the
+    number of outstanding LLM calls is capped by LLM_MAX_CONCURRENCY.
+    Set DRAFT_CANDIDATES > 1 to draft and review several candidates in parallel.
+    """
+    if speculative_candidates() > 1:
+        return _build_graph(acache_lookup, aclassify, aretrieve, speculative_draft, areview, speculative=True)
+    return _build_graph(acache_lookup, aclassify, aretrieve, adraft, areview)
+
+def startup():
+    """
+    Process setup for entry points: logging, the metrics exporters and, with
+    WARMUP_ON_START, the background warm-up. Safe to call more than once.
+
+    Importing this module does none of it; batch.py and streaming.py call
+    this, and so does the first access to a module-level agent.
+    """
+    configure_logging()
+    start_metrics_exporter()
+    if env_bool("WARMUP_ON_START", False):
+        warmup()
+
+# The compiled graph instances are built on first access, so importing this
+# module stays cheap and free of side effects; langgraph.json and
+# `from main import support_agent` work as before and run startup() first
+_agent_factories = {"support_agent": create_support_agent, "async_support_agent": create_async_support_agent}
+_agents_lock = threading.Lock()
+
+def __getattr__(name: str):
+    factory = _agent_factories.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _agents_lock:
+        agent = globals().get(name)
+        if agent is None:
+            startup()
+            agent = globals()[name] = factory()
+        return agent
+
+
+def main():
+    """Interactive CLI: prompt for tickets until 'exit' and print each outcome"""
+    startup()
+    agent = create_support_agent()
+    while True:
+        try:
+            subject = input("\nSubject (or 'exit'): ").strip()
+            if subject.lower() == "exit":
+                break
+            description = input("Description: ").strip()
+        except EOFError:
+            break
+
+        result = agent.invoke({"subject": subject, "description": description})
+        if result.get("review_result") == "APPROVED":
+            print(f"\n✅ APPROVED ({result.get('category')}):\n{result.get('draft')}")
+        else:
+            print(f"\n🚨 ESCALATED after {result.get('attempts', 0)} rejected attempts: "
+                  f"{result.get('reviewer_feedback')}")
+
 
-# Create the compiled graph instance
-support_agent = create_support_agent()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
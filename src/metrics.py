@@ -0,0 +1,315 @@
+"""
+In-process metrics for the support agent.
+
+Every graph node and LLM call records its wall time into a histogram, along
+with token counts reported by Ollama, LLM cache hits and retries. Metrics can
+be read as Prometheus text (METRICS_PORT serves /metrics, METRICS_PROM_PATH
+writes a file for the node_exporter textfile collector) or dumped as JSON
+every METRICS_DUMP_SECONDS to METRICS_JSON_PATH.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import env_bool, env_float, env_int, env_str
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; LLM calls can take tens of seconds on a local model
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+HELP = {
+    "node_seconds": "Wall time of one graph node execution",
+    "node_errors_total": "Graph node executions that raised",
+    "llm_seconds": "Wall time of one LLM call, including waiting for a concurrency slot",
+    "llm_calls_total": "LLM calls by role",
+    "llm_errors_total": "LLM calls that raised",
+    "llm_cache_hits_total": "LLM calls answered from the response cache",
+    "llm_prompt_tokens": "Prompt tokens per LLM call (Ollama prompt_eval_count)",
+    "llm_completion_tokens": "Completion tokens per LLM call (Ollama eval_count)",
+    "llm_prefill_seconds": "Prompt evaluation time per LLM call (Ollama prompt_eval_duration); drops when the prompt prefix is cached",
+    "rag_encode_seconds": "Time to encode one retrieval query",
+    "rag_search_seconds": "Time to search the document index for one query",
+    "rag_query_cache_hits_total": "Retrieval queries served from primed or recent embeddings",
+    "retries_total": "Drafts sent back for another attempt",
+    "escalations_total": "Tickets escalated to a human",
+    "answer_cache_hits_total": "Tickets answered from the semantic answer cache",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with sum and count, like a Prometheus histogram"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-th quantile by interpolating inside its bucket, like histogram_quantile()"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return round(lower + (bound - lower) * (rank - seen) / count, 6)
+            seen += count
+            lower = bound
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Thread-safe store of labeled counters and histograms"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-friendly view: counters as values, histograms as count/sum/p50/p95/p99"""
+        with self.lock:
+            return {
+                "timestamp": time.time(),
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self.counters.items()
+                },
+                "histograms": {
+                    name: [{
+                        "labels": dict(key),
+                        "count": h.count,
+                        "sum": round(h.sum, 6),
+                        "p50": h.quantile(0.5),
+                        "p95": h.quantile(0.95),
+                        "p99": h.quantile(0.99),
+                    } for key, h in series.items()]
+                    for name, series in self.histograms.items()
+                },
+            }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} counter"]
+                lines += [f"{name}{_labels(key)} {value:g}" for key, value in series.items()]
+            for name, series in sorted(self.histograms.items()):
+                lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} histogram"]
+                for key, h in series.items():
+                    cumulative = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(key, le=f'{bound:g}')} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(key, le='+Inf')} {h.count}")
+                    lines.append(f"{name}_sum{_labels(key)} {h.sum:.6f}")
+                    lines.append(f"{name}_count{_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key: LabelKey, **extra: str) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+registry = MetricsRegistry()
+
+
+def enabled() -> bool:
+    return env_bool("METRICS_ENABLED", True)
+
+
+def inc(name: str, amount: float = 1, **labels: str):
+    if enabled():
+        registry.inc(name, amount, **labels)
+
+
+def observe(name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels: str):
+    if enabled():
+        registry.observe(name, value, buckets, **labels)
+
+
+def llm_usage(response: Any) -> Dict[str, Any]:
+    """Token counts, prefill time and cache hit flag from a chat model response"""
+    metadata = getattr(response, "response_metadata", None) or {}
+    usage = getattr(response, "usage_metadata", None) or {}
+    prefill_ns = metadata.get("prompt_eval_duration")
+    return {
+        "cache_hit": bool(metadata.get("cache_hit")),
+        "prompt_tokens": usage.get("input_tokens", metadata.get("prompt_eval_count")),
+        "completion_tokens": usage.get("output_tokens", metadata.get("eval_count")),
+        "prefill_seconds": prefill_ns / 1e9 if prefill_ns is not None else None,
+    }
+
+
+def record_llm_response(role: str, response: Any, seconds: float):
+    """Record latency, token usage and cache hits for one LLM response"""
+    if not enabled():
+        return
+    registry.observe("llm_seconds", seconds, role=role)
+    registry.inc("llm_calls_total", role=role)
+    usage = llm_usage(response)
+    if usage["cache_hit"]:
+        registry.inc("llm_cache_hits_total", role=role)
+        return
+    if usage["prompt_tokens"] is not None:
+        registry.observe("llm_prompt_tokens", usage["prompt_tokens"], TOKEN_BUCKETS, role=role)
+    if usage["completion_tokens"] is not None:
+        registry.observe("llm_completion_tokens", usage["completion_tokens"], TOKEN_BUCKETS, role=role)
+    if usage["prefill_seconds"] is not None:
+        registry.observe("llm_prefill_seconds", usage["prefill_seconds"], role=role)
+
+
+def timed_node(name: str, node: Callable) -> Callable:
+    """Wrap a sync or async graph node so each run records node_seconds{node=name}"""
+    if asyncio.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def async_wrapper(state, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await node(state, *args, **kwargs)
+            except Exception:
+                inc("node_errors_total", node=name)
+                raise
+            finally:
+                observe("node_seconds", time.perf_counter() - started, node=name)
+        return async_wrapper
+
+    @functools.wraps(node)
+    def wrapper(state, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return node(state, *args, **kwargs)
+        except Exception:
+            inc("node_errors_total", node=name)
+            raise
+        finally:
+            observe("node_seconds", time.perf_counter() - started, node=name)
+    return wrapper
+
+
+def write_prometheus(path: str):
+    """Write the Prometheus text atomically so a scraper never reads half a file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(registry.render_prometheus())
+    os.replace(tmp_path, path)
+
+
+def write_json(path: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(registry.snapshot(), f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            self._send(200, "text/plain; version=0.0.4; charset=utf-8", registry.render_prometheus())
+        elif path == "/ready":
+            # 503 until warm-up has loaded the encoder and index, so load balancers hold traffic back
+            from warmup import readiness
+            status = readiness()
+            self._send(200 if status["ready"] else 503, "application/json", json.dumps(status))
+        else:
+            self.send_error(404)
+
+    def _send(self, code: int, content_type: str, text: str):
+        body = text.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics request: " + format, *args)
+
+
+_exporter_lock = threading.Lock()
+_exporter_started = False
+
+
+def start_metrics_exporter() -> Optional[ThreadingHTTPServer]:
+    """
+    Start the configured exporters once per process.
+
+    METRICS_PORT serves /metrics and the warm-up status on /ready over HTTP;
+    METRICS_JSON_PATH and METRICS_PROM_PATH are rewritten every
+    METRICS_DUMP_SECONDS by a daemon thread. Returns the HTTP server if one was started.
+    """
+    global _exporter_started
+    with _exporter_lock:
+        if _exporter_started or not enabled():
+            return None
+        _exporter_started = True
+
+    server = None
+    port = env_int("METRICS_PORT", 0)
+    if port:
+        server = ThreadingHTTPServer((env_str("METRICS_HOST", "127.0.0.1"), port), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info("📈 Serving metrics on http://%s:%d/metrics", *server.server_address[:2])
+
+    json_path = env_str("METRICS_JSON_PATH", "")
+    prom_path = env_str("METRICS_PROM_PATH", "")
+    if json_path or prom_path:
+        interval = env_float("METRICS_DUMP_SECONDS", 60.0)
+
+        def dump_forever():
+            while True:
+                time.sleep(interval)
+                try:
+                    if json_path:
+                        write_json(json_path)
+                    if prom_path:
+                        write_prometheus(prom_path)
+                except OSError as e:
+                    logger.warning("⚠️ Could not write metrics: %s", e)
+
+        threading.Thread(target=dump_forever, name="metrics-dump", daemon=True).start()
+    return server
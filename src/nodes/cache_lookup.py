@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from state import AgentState
+from config import env_bool
+from answer_cache import find_cached_answer
+import metrics
+
+logger = logging.getLogger(__name__)
+
+def cache_lookup(state: AgentState) -> dict:
+    """
+    Reuse a previously approved answer when this ticket is a near-duplicate.
+    """
+    try:
+        hit = find_cached_answer(state)
+    except Exception as e:
+        logger.warning("⚠️ Answer cache lookup failed: %s", e)
+        hit = None
+    
+    if hit is None:
+        return {"answer_cache_id": None}
+    
+    metrics.inc("answer_cache_hits_total")
+    logger.info("♻️ Reusing approved answer #%s (%.1f%% similar)", hit['id'], hit['similarity'] * 100)
+    update = {
+        "answer_cache_id": hit["id"],
+        "category": hit["category"],
+        "context": hit["context"],
+        "draft": hit["draft"],
+    }
+    if not env_bool("ANSWER_CACHE_REVIEW", False):
+        update.update({"review_result": "APPROVED", "approved": True})
+    return update
+
+async def acache_lookup(state: AgentState) -> dict:
+    """
+    Async version of cache_lookup; encoding runs in a worker thread.
+    """
+    return await asyncio.to_thread(cache_lookup, state)
+
+def route_cache(state: AgentState) -> str:
+    """Skip straight to the end (or to review) when a cached answer was found"""
+    if state.get("answer_cache_id") is None:
+        return "classify"
+    return "end" if state.get("review_result") == "APPROVED" else "review"
@@ -68,59 +68,110 @@
 
 # now with RAG
 
+import asyncio
+import logging
+from typing import Optional
 from langchain_core.prompts import ChatPromptTemplate
 from state import AgentState
-from llm import get_llm
+from llm import ainvoke_llm, get_llm, invoke_llm
+from config import env_float
+from fast_classifier import classify_by_embedding
+
+logger = logging.getLogger(__name__)
+
+# Categories matching your mock_docs.json
+CATEGORIES = ["billing", "technical", "security", "general"]
+
+# Compiled once; the system message is identical for every ticket, so Ollama can reuse its prefill,
+# and ticket text only enters as template variables (braces in it are not parsed)
+CLASSIFICATION_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", f"""You are an expert support ticket classifier. Your task is to accurately categorize customer support tickets into one of the following predefined categories:
+{', '.join(CATEGORIES)}
+
+Carefully analyze the subject and description of the ticket. Choose the SINGLE BEST category that most accurately reflects the customer's primary issue.
+
+CRITICAL: Respond ONLY with the chosen category name. Do NOT include any other text, explanations, or punctuation. Your response must be one of the exact category names from the list above."""),
+    ("human", """Customer Ticket:
+Subject: {subject}
+Description: {description}
+
+Which category does this ticket belong to?"""),
+])
+
+def _classification_messages(state: AgentState) -> list:
+    """Build the classification prompt for a ticket"""
+    return CLASSIFICATION_PROMPT.format_messages(
+        subject=state.get("subject", ""),
+        description=state.get("description", "")
+    )
+
+def _parse_category(category_response) -> str:
+    """Map the raw LLM answer onto one of the known categories"""
+    predicted_category = category_response.content.strip().lower()
+    
+    if predicted_category not in CATEGORIES:
+        logger.warning("⚠️ LLM predicted unknown category '%s'. Defaulting to 'general'.", predicted_category)
+        category = "general"
+    else:
+        category = predicted_category
+    
+    logger.info("🗂️ Ticket classified as: %s", category)
+    return category
+
+def _fast_classify(state: AgentState) -> Optional[dict]:
+    """
+    Classify with the embedding classifier; returns None when the LLM should decide.
+    """
+    try:
+        prediction = classify_by_embedding(state.get("subject", ""), state.get("description", ""), CATEGORIES)
+    except Exception as e:
+        logger.warning("⚠️ Fast classifier failed: %s", e)
+        return None
+    if prediction is None:
+        return None
+    
+    category, confidence = prediction
+    if confidence < env_float("CLASSIFIER_CONFIDENCE_THRESHOLD", 0.7):
+        logger.info("🤔 Fast classifier unsure (%s, %.2f), asking the LLM...", category, confidence)
+        return None
+    logger.info("⚡ Ticket classified as: %s (confidence %.2f)", category, confidence)
+    return {"category": category, "category_confidence": confidence}
 
 def classify(state: AgentState) -> dict:
     """
-    Classifies the support ticket into a predefined category using an LLM.
+    Classifies the support ticket into a predefined category, using the
+    embedding classifier when it is confident and the LLM otherwise.
     """
-    llm = get_llm()
+    fast_result = _fast_classify(state)
+    if fast_result:
+        return {**state, **fast_result}
     
-    subject = state.get("subject", "")
-    description = state.get("description", "")
+    llm = get_llm("classify")
     
-    # Categories matching your mock_docs.json
-    categories = ["billing", "technical", "security", "general"]
+    try:
+        logger.info("🗂️ Classifying ticket...")
+        category_response = invoke_llm(llm, _classification_messages(state), role="classify")
+        return {**state, "category": _parse_category(category_response)}  # Fixed: proper state spreading
     
-    classification_prompt = ChatPromptTemplate.from_messages([
-        ("system", f"""You are an expert support ticket classifier. Your task is to accurately categorize customer support tickets into one of the following predefined categories:
-        {', '.join(categories)}
-        
-        Carefully analyze the subject and description of the ticket. Choose the SINGLE BEST category that most accurately reflects the customer's primary issue.
-        
-        CRITICAL: Respond ONLY with the chosen category name. Do NOT include any other text, explanations, or punctuation. Your response must be one of the exact category names from the list above.
-        """),
-        ("human", f"""
-        Customer Ticket:
-        Subject: {subject}
-        Description: {description}
-        
-        Which category does this ticket belong to?
-        """)
-    ])
+    except Exception as e:
+        logger.error("Error classifying ticket: %s. Defaulting to 'general' category.", e)
+        return {**state, "category": "general"}
+
+async def aclassify(state: AgentState) -> dict:
+    """
+    Async version of classify, for the async graph.
+    """
+    fast_result = await asyncio.to_thread(_fast_classify, state)
+    if fast_result:
+        return {**state, **fast_result}
+    
+    llm = get_llm("classify")
     
     try:
-        print("🗂️ Classifying ticket...")
-        category_response = llm.invoke(
-            classification_prompt.format_messages(
-                subject=subject,
-                description=description
-            )
-        )
-        
-        predicted_category = category_response.content.strip().lower()
-        
-        if predicted_category not in categories:
-            print(f"⚠️ LLM predicted unknown category '{predicted_category}'. Defaulting to 'general'.")
-            category = "general"
-        else:
-            category = predicted_category
-        
-        print(f"🗂️ Ticket classified as: {category}")
-        return {**state, "category": category}  # Fixed: proper state spreading
+        logger.info("🗂️ Classifying ticket...")
+        category_response = await ainvoke_llm(llm, _classification_messages(state), role="classify")
+        return {**state, "category": _parse_category(category_response)}
     
     except Exception as e:
-        print(f"Error classifying ticket: {e}. Defaulting to 'general' category.")
-        return {**state, "category": "general"}
\ No newline at end of file
+        logger.error("Error classifying ticket: %s. Defaulting to 'general' category.", e)
+        return {**state, "category": "general"}
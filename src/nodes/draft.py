@@ -1,96 +1,125 @@
+import logging
 from langchain_core.prompts import ChatPromptTemplate
 from state import AgentState
-from llm import get_llm
+from langgraph.config import get_stream_writer
+from llm import astream_llm, get_llm, invoke_llm
 
-def draft(state: AgentState) -> dict:
-    """
-    Generate a draft response based on the ticket and retrieved context,
-    incorporating reviewer feedback if this is a retry attempt.
-    """
-    llm = get_llm()
+logger = logging.getLogger(__name__)
+
+# Compiled once. First attempts and retries share the system message and the ticket and context that
+# follow it, so Ollama can reuse that prefill; only the closing instructions differ. Ticket text, context
+# and feedback enter as template variables, so braces in them are not parsed as placeholders.
+DRAFT_SYSTEM = """You are a professional customer support agent.
+Generate a helpful, empathetic response to the customer's issue.
+
+Your response should:
+- Be professional and courteous
+- Directly address the customer's concern
+- Provide clear, actionable guidance or next steps
+- Resolve the issue when possible
+- Show understanding of their situation"""
+
+DRAFT_TICKET = """Customer Ticket:
+Subject: {subject}
+Description: {description}
+Category: {category}
+
+Available Context:
+{context}
 
+"""
+
+DRAFT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", DRAFT_SYSTEM),
+    ("human", DRAFT_TICKET + "Generate a helpful response:"),
+])
+
+RETRY_DRAFT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", DRAFT_SYSTEM),
+    ("human", DRAFT_TICKET + """This is retry attempt #{attempt}. Your previous response was rejected with this feedback:
+---
+REVIEWER FEEDBACK: {feedback}
+---
+
+Create an improved response that directly addresses this feedback while being:
+- Professional and empathetic
+- Accurate and genuinely helpful
+- Clear and actionable
+- Directly addressing the customer's specific issue
+
+Generate an improved response that addresses the feedback:"""),
+])
+
+def _draft_messages(state: AgentState) -> list:
+    """Build the drafting prompt, using the feedback-aware variant on retries"""
     attempts = state.get("attempts", 0)
     feedback = state.get("reviewer_feedback", "")
-    subject = state.get("subject", "")
-    description = state.get("description", "")
-    category = state.get("category", "")
-    context = state.get("context", "")
-
-    print(f"✍️ Generating draft (Attempt #{attempts + 1})...")
+    variables = {
+        "subject": state.get("subject", ""),
+        "description": state.get("description", ""),
+        "category": state.get("category", ""),
+        "context": state.get("context", ""),
+    }
 
     if attempts > 0 and feedback:
         # This is a retry - use enhanced prompt with feedback
-        draft_prompt = ChatPromptTemplate.from_messages([
-            ("system", f"""You are a customer support agent working on retry attempt #{attempts + 1}.
-            
-            Your previous response was rejected with this feedback:
-            ---
-            REVIEWER FEEDBACK: {feedback}
-            ---
-
-            Create an improved response that directly addresses this feedback while being:
-            - Professional and empathetic
-            - Accurate and genuinely helpful
-            - Clear and actionable
-            - Directly addressing the customer's specific issue
-            
-            Focus on resolving the issues mentioned in the feedback."""),
-            
-            ("human", f"""
-            Customer Ticket:
-            Subject: {subject}
-            Description: {description}
-            Category: {category}
-
-            Available Context:
-            {context}
-
-            Previous Rejection Reason: {feedback}
-
-            Generate an improved response that addresses the feedback:
-            """)
-        ])
-    else:
-        # First attempt - standard prompt
-        draft_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a professional customer support agent.
-            Generate a helpful, empathetic response to the customer's issue.
-            
-            Your response should:
-            - Be professional and courteous
-            - Directly address the customer's concern
-            - Provide clear, actionable guidance or next steps
-            - Resolve the issue when possible
-            - Show understanding of their situation"""),
-            
-            ("human", f"""
-            Customer Ticket:
-            Subject: {subject}
-            Description: {description}
-            Category: {category}
-
-            Available Context:
-            {context}
-
-            Generate a helpful response:
-            """)
-        ])
+        return RETRY_DRAFT_PROMPT.format_messages(attempt=attempts + 1, feedback=feedback, **variables)
+    return DRAFT_PROMPT.format_messages(**variables)
+
+def _fallback_draft(state: AgentState) -> dict:
+    category = state.get("category", "")
+    return {
+        "draft": f"I apologize for the technical difficulty in generating a response. Please contact support directly for assistance with your {category or 'general'} inquiry."
+    }
+
+def draft(state: AgentState) -> dict:
+    """
+    Generate a draft response based on the ticket and retrieved context,
+    incorporating reviewer feedback if this is a retry attempt.
+    """
+    llm = get_llm("draft")
+    logger.info("✍️ Generating draft (Attempt #%s)...", state.get('attempts', 0) + 1)
 
     try:
-        messages = draft_prompt.format_messages(
-            subject=subject,
-            description=description,
-            category=category,
-            context=context
-        )
-        
-        response = llm.invoke(messages)
+        response = invoke_llm(llm, _draft_messages(state), role="draft")
         return {
             "draft": response.content.strip()
         }
 
     except Exception as e:
-        print(f"💥 Error generating draft: {e}")
+        logger.error("💥 Error generating draft: %s", e)
+        return _fallback_draft(state)
+
+def _stream_writer():
+    """LangGraph's custom stream writer, or a no-op outside of a graph run"""
+    try:
+        return get_stream_writer()
+    except Exception:
+        return lambda event: None
+
+async def adraft(state: AgentState) -> dict:
+    """
+    Async version of draft, for the async graph.
+
+    Tokens are streamed from the LLM and emitted as "draft_token" events on
+    LangGraph's custom stream, so callers can show a provisional response
+    while generation and review are still running.
+    """
+    llm = get_llm("draft")
+    attempt = state.get('attempts', 0) + 1
+    logger.info("✍️ Generating draft (Attempt #%s)...", attempt)
+    writer = _stream_writer()
+
+    try:
+        parts = []
+        async for chunk in astream_llm(llm, _draft_messages(state), role="draft"):
+            if isinstance(chunk.content, str) and chunk.content:
+                parts.append(chunk.content)
+                writer({"event": "draft_token", "attempt": attempt, "text": chunk.content})
         return {
-            "draft": f"I apologize for the technical difficulty in generating a response. Please contact support directly for assistance with your {category or 'general'} inquiry."
-        }
\ No newline at end of file
+            "draft": "".join(parts).strip()
+        }
+
+    except Exception as e:
+        logger.error("💥 Error generating draft: %s", e)
+        return _fallback_draft(state)
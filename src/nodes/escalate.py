@@ -1,37 +1,22 @@
-import csv
-import os
+import logging
 from datetime import datetime
 from state import AgentState
+from escalation_sink import get_escalation_sink
+import metrics
 
-ESCALATION_LOG = "escalation_log.csv"
-
-def ensure_csv_header():
-    """Ensure CSV file has proper headers"""
-    if not os.path.exists(ESCALATION_LOG):
-        with open(ESCALATION_LOG, "w", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            writer.writerow([
-                "timestamp", 
-                "subject", 
-                "description", 
-                "attempts", 
-                "feedback", 
-                "failed_drafts"
-            ])
+logger = logging.getLogger(__name__)
 
 def escalate(state: AgentState) -> AgentState:
-    ensure_csv_header()
-    
-    with open(ESCALATION_LOG, mode="a", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        writer.writerow([
-            datetime.now().isoformat(),
-            state["subject"],
-            state["description"],
-            state["attempts"],
-            state["reviewer_feedback"],
-            "; ".join(state["failed_drafts"])  # Join multiple drafts with semicolon
-        ])
-    
-    print("🚨 Escalated and logged to CSV")
-    return state
\ No newline at end of file
+    # The sink writes in the background, so the graph never waits on the log file
+    get_escalation_sink().submit({
+        "timestamp": datetime.now().isoformat(),
+        "subject": state["subject"],
+        "description": state["description"],
+        "attempts": state["attempts"],
+        "feedback": state["reviewer_feedback"],
+        "failed_drafts": list(state["failed_drafts"]),
+    })
+
+    metrics.inc("escalations_total")
+    logger.info("🚨 Escalated and queued for the escalation log")
+    return state
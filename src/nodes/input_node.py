@@ -8,11 +8,13 @@ def receive_input(state):
         "subject": subject,
         "description": description,
         "category": None,            # to be set by classifier
+        "category_confidence": None, # set when the embedding classifier decides
         "context": None,             # to be set by RAG
         "draft": None,               # to be set by draft generator
         "review_result": None,       # to be set by reviewer
         "reviewer_feedback": None,   # to be set by reviewer
         "attempts": 0,
         "failed_drafts": [],
-        "needs_review": False
+        "needs_review": False,
+        "answer_cache_id": None      # set when a cached answer is reused
     }
\ No newline at end of file
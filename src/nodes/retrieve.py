@@ -10,9 +10,22 @@
 
 
 
+import asyncio
+import logging
 from state import AgentState
+from config import env_int
+from context_packer import context_budget
 from simple_rag import get_rag_system
 
+logger = logging.getLogger(__name__)
+
+def build_search_query(subject: str, description: str) -> str:
+    """Build the retrieval query for a ticket (shared with batch pre-encoding)"""
+    search_query = f"{subject} {description}".strip()
+    if not search_query:
+        search_query = subject or description or "general support"
+    return search_query
+
 def retrieve(state: AgentState) -> AgentState:
     """
     Retrieve relevant documents using RAG system
@@ -23,31 +36,30 @@ def retrieve(state: AgentState) -> AgentState:
         category = state.get("category", "general")
         
         # Create search query
-        search_query = f"{subject} {description}".strip()
-        if not search_query:
-            search_query = subject or description or "general support"
+        search_query = build_search_query(subject, description)
         
-        print(f"🔍 RAG retrieval for: '{search_query}' (category: {category})")
+        logger.debug("🔍 RAG retrieval for: '%s' (category: %s)", search_query, category)
         
         # Get RAG system
         rag_system = get_rag_system()
         
-        if not rag_system.model:
-            print("⚠️ RAG system not available, using fallback")
+        if not rag_system.available:
+            logger.warning("⚠️ RAG system not available, using fallback")
             fallback_context = f"RAG system unavailable. Handle {category} issue: {subject}"
             return {**state, "context": fallback_context}
         
-        # Retrieve relevant documents
+        # Retrieve a few spare documents, so near-duplicates can be replaced
         relevant_docs = rag_system.retrieve_documents(
             query=search_query,
             category=category,
-            top_k=3
+            top_k=env_int("RAG_CONTEXT_CANDIDATES", 5)
         )
         
-        # Format context
+        # Format context within the drafting budget; review trims it to its own
         if relevant_docs:
-            context = rag_system.format_context(relevant_docs, search_query)
-            print(f"✅ Retrieved {len(relevant_docs)} relevant documents")
+            context = rag_system.format_context(relevant_docs, search_query, max_tokens=context_budget("draft"),
+                                                max_passages=env_int("RAG_CONTEXT_PASSAGES", 3))
+            logger.info("✅ Retrieved %s relevant documents", len(relevant_docs))
         else:
             context = f"""
 No specific documentation found for this {category} issue: "{search_query}"
@@ -57,12 +69,12 @@ General guidance:
 - Provide helpful information based on standard support practices  
 - Escalate if the issue seems complex or requires specialized knowledge
             """.strip()
-            print("⚠️ No relevant documents found, using fallback guidance")
+            logger.warning("⚠️ No relevant documents found, using fallback guidance")
         
         return {**state, "context": context}  # Fixed: proper state spreading
         
     except Exception as e:
-        print(f"❌ RAG retrieval failed: {e}")
+        logger.error("❌ RAG retrieval failed: %s", e)
         
         # Fallback context
         fallback_context = f"""
@@ -70,4 +82,11 @@ Context retrieval failed for this {category} issue: "{subject}"
 Please provide general helpful guidance and escalate if needed.
         """.strip()
         
-        return {**state, "context": fallback_context}
\ No newline at end of file
+        return {**state, "context": fallback_context}
+
+async def aretrieve(state: AgentState) -> AgentState:
+    """
+    Async version of retrieve: encoding and search run in a worker thread
+    so the event loop keeps serving other tickets.
+    """
+    return await asyncio.to_thread(retrieve, state)
@@ -16,7 +16,12 @@
 
 
 
+import logging
 from state import AgentState
+import metrics
+from tracing import instant
+
+logger = logging.getLogger(__name__)
 
 def retry_with_feedback(state: AgentState) -> dict:
     """
@@ -36,7 +41,9 @@ def retry_with_feedback(state: AgentState) -> dict:
     # Get the reviewer feedback
     feedback = state.get("reviewer_feedback", "")
     
-    print(f"🔄 Retry attempt #{new_attempts}: {feedback}")
+    logger.info("🔄 Retry attempt #%s: %s", new_attempts, feedback)
+    metrics.inc("retries_total")
+    instant("retry", "graph", attempt=new_attempts, feedback=feedback)
     
     # Return updated state with incremented attempts and failed drafts
     return {
@@ -151,122 +151,205 @@
 # now with RAG
 
 
+import asyncio
+import logging
 from langchain_core.prompts import ChatPromptTemplate
 from state import AgentState
-from llm import get_llm
-
-def review(state: AgentState) -> dict:
-    """
-    Review the draft response for quality and accuracy.
-    Only provides review result and feedback - does NOT manage attempts or failed drafts.
-    """
-    llm = get_llm()
+from llm import ainvoke_llm, get_llm, invoke_llm
+from answer_cache import forget_answer, remember_answer
+from config import env_bool
+from context_packer import context_budget, fit_context
+import metrics
+from review_rules import check_draft
+
+logger = logging.getLogger(__name__)
+
+# Compiled once; the criteria come first and are identical for every ticket, so Ollama can reuse
+# their prefill, and ticket text, context and draft enter as template variables
+REVIEW_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a quality assurance reviewer for customer support responses.
+
+Evaluate the draft response against these criteria:
+1. ACCURACY: Does it correctly address the customer's issue?
+2. COMPLETENESS: Does it fully answer their question?
+3. PROFESSIONALISM: Is the tone appropriate and helpful?
+4. ACTIONABILITY: Does it provide clear next steps?
+5. CONTEXT USAGE: Does it properly use the available knowledge base information?
+
+Respond with EXACTLY this format:
+RESULT: [APPROVED or REJECTED]
+FEEDBACK: [Specific feedback explaining your decision]
+
+Be strict but fair. Only approve responses that meet all criteria."""),
+    ("human", """Customer Issue:
+Subject: {subject}
+Description: {description}
+Category: {category}
+
+Available Context:
+{context}
+
+Draft Response to Review:
+{draft}
+
+Please review this response:"""),
+])
+
+def _review_messages(state: AgentState) -> list:
+    """Build the review prompt for the current draft"""
+    context, saved = fit_context(state.get("context") or "", context_budget("review"))
+    if saved:
+        metrics.inc("rag_context_tokens_saved_total", saved, stage="review")
     
-    subject = state.get("subject", "")
-    description = state.get("description", "")
-    category = state.get("category", "")
-    context = state.get("context", "")
+    return REVIEW_PROMPT.format_messages(
+        subject=state.get("subject", ""),
+        description=state.get("description", ""),
+        category=state.get("category", ""),
+        context=context,
+        draft=state.get("draft", "")
+    )
+
+def _apply_review(state: AgentState, review_content: str) -> dict:
+    """Parse the reviewer's answer and return the updated state"""
     draft = state.get("draft", "")
     current_attempts = state.get("attempts", 0)
     
-    print(f"🔍 Reviewing draft (attempt #{current_attempts + 1})...")
+    # Parse the response
+    lines = review_content.split('\n')
+    result_line = next((line for line in lines if line.startswith('RESULT:')), '')
+    feedback_line = next((line for line in lines if line.startswith('FEEDBACK:')), '')
     
-    review_prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a quality assurance reviewer for customer support responses.
-        
-        Evaluate the draft response against these criteria:
-        1. ACCURACY: Does it correctly address the customer's issue?
-        2. COMPLETENESS: Does it fully answer their question?
-        3. PROFESSIONALISM: Is the tone appropriate and helpful?
-        4. ACTIONABILITY: Does it provide clear next steps?
-        5. CONTEXT USAGE: Does it properly use the available knowledge base information?
-        
-        Respond with EXACTLY this format:
-        RESULT: [APPROVED or REJECTED]
-        FEEDBACK: [Specific feedback explaining your decision]
-        
-        Be strict but fair. Only approve responses that meet all criteria."""),
-        
-        ("human", f"""
-        Customer Issue:
-        Subject: {subject}
-        Description: {description}
-        Category: {category}
+    # Extract result and feedback
+    result = result_line.replace('RESULT:', '').strip() if result_line else 'REJECTED'
+    feedback = feedback_line.replace('FEEDBACK:', '').strip() if feedback_line else 'Review parsing failed'
+    
+    # Validate result
+    if result not in ['APPROVED', 'REJECTED']:
+        logger.warning("⚠️ Invalid review result '%s', defaulting to REJECTED", result)
+        result = 'REJECTED'
+        feedback = f"Invalid review format. Original response: {review_content}"
+    
+    logger.debug("📋 Review result: %s", result)
+    if result == 'REJECTED':
+        logger.debug("💬 Feedback: %s", feedback)
+    
+    # Update state based on review result
+    updated_state = {**state}
+    
+    if result == 'APPROVED':
+        updated_state.update({
+            "review_result": "APPROVED",
+            "reviewer_feedback": feedback,
+            "approved": True
+        })
+    else:
+        # A reused answer that fails review should not be served again (see _update_answer_cache)
+        if state.get("answer_cache_id") is not None:
+            updated_state["answer_cache_id"] = None
         
-        Available Context:
-        {context}
+        # Increment attempts on rejection
+        new_attempts = current_attempts + 1
         
-        Draft Response to Review:
-        {draft}
+        # Add current draft to failed drafts
+        failed_drafts = state.get("failed_drafts", [])
+        if draft and draft not in failed_drafts:
+            failed_drafts.append(draft)
         
-        Please review this response:
-        """)
-    ])
+        updated_state.update({
+            "review_result": "REJECTED", 
+            "reviewer_feedback": feedback,
+            "attempts": new_attempts,
+            "failed_drafts": failed_drafts,
+            "approved": False
+        })
+    
+    return updated_state
+
+def _update_answer_cache(state: AgentState, reviewed: dict):
+    """Cache an approved answer, or drop a reused one that failed review; encodes and writes SQLite"""
+    if reviewed["review_result"] == "APPROVED":
+        try:
+            remember_answer(reviewed)
+        except Exception as e:
+            logger.warning("⚠️ Could not cache approved answer: %s", e)
+    elif state.get("answer_cache_id") is not None:
+        try:
+            forget_answer(state["answer_cache_id"])
+        except Exception as e:
+            logger.warning("⚠️ Could not drop cached answer: %s", e)
+
+def _finish_review(state: AgentState, review_content: str) -> dict:
+    reviewed = _apply_review(state, review_content)
+    _update_answer_cache(state, reviewed)
+    return reviewed
+
+async def _afinish_review(state: AgentState, review_content: str) -> dict:
+    reviewed = _apply_review(state, review_content)
+    # The answer cache encodes the query and writes SQLite, which may wait on another process's lock
+    await asyncio.to_thread(_update_answer_cache, state, reviewed)
+    return reviewed
+
+def _review_error(state: AgentState, e: Exception) -> dict:
+    logger.error("❌ Review failed: %s", e)
+    return {
+        **state,
+        "review_result": "REJECTED",
+        "reviewer_feedback": f"Review system error: {str(e)}",
+        "approved": False
+    }
+
+def _rule_review(state: AgentState):
+    """
+    Run the deterministic rule checks before the LLM reviewer.
+
+    Returns (state, rejection): the state carries the draft with safe placeholders
+    filled, and rejection is the review text to apply when a rule failed, else None.
+    """
+    if not env_bool("REVIEW_RULES_ENABLED", True):
+        return state, None
+    
+    checked = check_draft(state.get("draft", ""), state.get("category"))
+    if checked["filled"]:
+        logger.info("🧩 Filled placeholders: %s", ', '.join(checked['filled']))
+        state = {**state, "draft": checked["draft"]}
+    if not checked["violations"]:
+        return state, None
+    
+    logger.info("⚡ Draft rejected by rule checks, skipping LLM review")
+    feedback = " ".join(checked["violations"])
+    return state, f"RESULT: REJECTED\nFEEDBACK: {feedback}"
+
+def review(state: AgentState) -> dict:
+    """
+    Review the draft response for quality and accuracy.
+    Only provides review result and feedback - does NOT manage attempts or failed drafts.
+    """
+    logger.info("🔍 Reviewing draft (attempt #%s)...", state.get('attempts', 0) + 1)
+    state, rejection = _rule_review(state)
+    if rejection:
+        return _finish_review(state, rejection)
+    llm = get_llm("review")
     
     try:
-        messages = review_prompt.format_messages(
-            subject=subject,
-            description=description,
-            category=category,
-            context=context,
-            draft=draft
-        )
-        
-        response = llm.invoke(messages)
-        review_content = response.content.strip()
-        
-        # Parse the response
-        lines = review_content.split('\n')
-        result_line = next((line for line in lines if line.startswith('RESULT:')), '')
-        feedback_line = next((line for line in lines if line.startswith('FEEDBACK:')), '')
-        
-        # Extract result and feedback
-        result = result_line.replace('RESULT:', '').strip() if result_line else 'REJECTED'
-        feedback = feedback_line.replace('FEEDBACK:', '').strip() if feedback_line else 'Review parsing failed'
-        
-        # Validate result
-        if result not in ['APPROVED', 'REJECTED']:
-            print(f"⚠️ Invalid review result '{result}', defaulting to REJECTED")
-            result = 'REJECTED'
-            feedback = f"Invalid review format. Original response: {review_content}"
-        
-        print(f"📋 Review result: {result}")
-        if result == 'REJECTED':
-            print(f"💬 Feedback: {feedback}")
-        
-        # Update state based on review result
-        updated_state = {**state}
+        response = invoke_llm(llm, _review_messages(state), role="review")
+        return _finish_review(state, response.content.strip())
         
-        if result == 'APPROVED':
-            updated_state.update({
-                "review_result": "APPROVED",
-                "reviewer_feedback": feedback,
-                "approved": True
-            })
-        else:
-            # Increment attempts on rejection
-            new_attempts = current_attempts + 1
-            
-            # Add current draft to failed drafts
-            failed_drafts = state.get("failed_drafts", [])
-            if draft and draft not in failed_drafts:
-                failed_drafts.append(draft)
-            
-            updated_state.update({
-                "review_result": "REJECTED", 
-                "reviewer_feedback": feedback,
-                "attempts": new_attempts,
-                "failed_drafts": failed_drafts,
-                "approved": False
-            })
-        
-        return updated_state
+    except Exception as e:
+        return _review_error(state, e)
+
+async def areview(state: AgentState) -> dict:
+    """
+    Async version of review, for the async graph.
+    """
+    logger.info("🔍 Reviewing draft (attempt #%s)...", state.get('attempts', 0) + 1)
+    state, rejection = _rule_review(state)
+    if rejection:
+        return await _afinish_review(state, rejection)
+    llm = get_llm("review")
+    
+    try:
+        response = await ainvoke_llm(llm, _review_messages(state), role="review")
+        return await _afinish_review(state, response.content.strip())
         
     except Exception as e:
-        print(f"❌ Review failed: {e}")
-        return {
-            **state,
-            "review_result": "REJECTED",
-            "reviewer_feedback": f"Review system error: {str(e)}",
-            "approved": False
-        }
\ No newline at end of file
+        return _review_error(state, e)
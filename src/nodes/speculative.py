@@ -0,0 +1,146 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import threading
+from typing import List, Optional
+from langchain_core.messages import HumanMessage
+from state import AgentState
+from config import env_int, env_str
+from llm import ainvoke_llm, get_llm
+from nodes.draft import _draft_messages, _fallback_draft, _stream_writer
+from nodes.review import areview
+
+logger = logging.getLogger(__name__)
+
+# Each candidate gets a different extra instruction so the drafts actually differ
+# at temperature=0. The first candidate uses the plain prompt.
+DRAFT_VARIATIONS: List[Optional[str]] = [
+    None,
+    "Keep the response concise: no more than five sentences, ending with one clear next step.",
+    "Structure the response as a short acknowledgement followed by numbered next steps.",
+    "Ground every statement in the Available Context and state the relevant policy explicitly.",
+    "Lead with empathy for the customer's situation, then give the concrete resolution.",
+]
+
+def speculative_candidates() -> int:
+    """Number of parallel draft candidates (DRAFT_CANDIDATES); 1 disables speculation"""
+    return max(1, env_int("DRAFT_CANDIDATES", 1))
+
+async def _draft_and_review(state: AgentState, index: int) -> dict:
+    """Generate one candidate draft and review it"""
+    variation = DRAFT_VARIATIONS[index % len(DRAFT_VARIATIONS)]
+    messages = _draft_messages(state)
+    if variation:
+        messages = messages + [HumanMessage(content=f"Additional instruction: {variation}")]
+
+    try:
+        response = await ainvoke_llm(get_llm("draft"), messages, role="draft")
+        draft = response.content.strip()
+    except Exception as e:
+        logger.error("💥 Error generating candidate #%s: %s", index + 1, e)
+        draft = _fallback_draft(state)["draft"]
+
+    # Each candidate reviews against its own copy of failed_drafts; review mutates that list
+    candidate = {**state, "draft": draft, "failed_drafts": list(state.get("failed_drafts") or [])}
+    return await areview(candidate)
+
+async def speculative_draft(state: AgentState) -> dict:
+    """
+    Draft and review DRAFT_CANDIDATES responses concurrently.
+
+    The first candidate approved by review wins. With DRAFT_CANCEL_POLICY=cancel
+    (default) the remaining candidates are cancelled as soon as that happens;
+    with "finish" they run to completion (their results still warm the caches).
+    If every candidate is rejected the ticket falls through to the usual
+    retry/escalate routing with all candidates recorded as failed drafts.
+    """
+    count = speculative_candidates()
+    cancel = env_str("DRAFT_CANCEL_POLICY", "cancel").lower() != "finish"
+    attempts = state.get("attempts", 0)
+    writer = _stream_writer()
+    logger.info("✍️ Generating %s candidate drafts in parallel (Attempt #%s)...", count, attempts + 1)
+
+    tasks = [asyncio.create_task(_draft_and_review(state, i)) for i in range(count)]
+    winner = None
+    rejected = []
+    try:
+        for finished in asyncio.as_completed(tasks):
+            result = await finished
+            approved = result.get("review_result") == "APPROVED"
+            writer({"event": "candidate", "attempt": attempts + 1, "approved": approved, "draft": result.get("draft")})
+            if approved and winner is None:
+                winner = result
+                if cancel:
+                    break
+            elif not approved:
+                rejected.append(result)
+    finally:
+        if cancel:
+            for task in tasks:
+                task.cancel()
+            # Wait for the cancellations to land, so no candidate outlives the ticket
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    if winner is not None:
+        logger.info("🏁 Candidate approved after %s of %s reviews", len(rejected) + 1, count)
+        return {
+            "draft": winner["draft"],
+            "review_result": "APPROVED",
+            "reviewer_feedback": winner.get("reviewer_feedback"),
+            "approved": True,
+        }
+
+    failed_drafts = list(state.get("failed_drafts") or [])
+    for result in rejected:
+        if result.get("draft") and result["draft"] not in failed_drafts:
+            failed_drafts.append(result["draft"])
+    feedback = " | ".join(dict.fromkeys(r.get("reviewer_feedback") or "" for r in rejected if r.get("reviewer_feedback")))
+    logger.info("❌ All %s candidates rejected", count)
+    return {
+        "draft": rejected[0]["draft"] if rejected else state.get("draft"),
+        "review_result": "REJECTED",
+        "reviewer_feedback": feedback or "All candidate drafts were rejected",
+        "attempts": attempts + 1,
+        "failed_drafts": failed_drafts,
+        "approved": False,
+    }
+
+# One event loop for every sync ticket, so get_llm's per-loop clients and their connection pools are reused
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="speculative-drafts", daemon=True).start()
+        return _loop
+
+def speculative_draft_sync(state: AgentState) -> dict:
+    """
+    Sync entry point for the sync graph; runs the candidates on a shared background event loop.
+
+    The task starts in a copy of the caller's context, so LangGraph's stream
+    writer and the ticket's trace still apply. Candidate calls take the same
+    process-wide LLM slots as sync classify and review calls.
+    """
+    loop = _background_loop()
+    context = contextvars.copy_context()
+    result: concurrent.futures.Future = concurrent.futures.Future()
+
+    def finished(task: asyncio.Task):
+        if task.cancelled():
+            result.cancel()
+        elif task.exception() is not None:
+            result.set_exception(task.exception())
+        else:
+            result.set_result(task.result())
+
+    def start():
+        task = context.run(loop.create_task, speculative_draft(state))
+        task.add_done_callback(finished)
+
+    loop.call_soon_threadsafe(start)
+    return result.result()
@@ -0,0 +1,145 @@
+"""
+Deterministic checks that run before the LLM reviewer.
+
+Most rejected drafts fail for mechanical reasons (unfilled placeholders, leaked
+prompt text, no next steps, contradicting a knowledge base policy). These are
+caught here with precompiled patterns so the LLM review call is only spent on
+drafts that pass. Safe placeholders such as [Your Name] are filled from config
+instead of rejecting the draft.
+"""
+import re
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from config import env_int, env_str
+
+# Template slots such as [Company Name], [Insert Date], [XXX] or <Your Name>; markdown links are not placeholders
+PLACEHOLDER_PATTERN = re.compile(
+    r"\[(?:[^\[\]\n]{0,40}\b(?:name|position|title|company|your|insert|customer|number|date|link|email|phone|address|url|department|signature)\b[^\[\]\n]{0,40}|X+|\.\.\.)\](?!\()"
+    r"|<(?:your|customer|company|insert) [a-z ]{1,30}>",
+    re.I,
+)
+
+# Placeholder text -> setting that may fill it, and the value used when the setting is unset.
+# A None default means the placeholder is only safe to fill once configured. A bare [Name]
+# is usually the agent's sign-off, so it is not filled with the customer salutation.
+SAFE_PLACEHOLDERS: Dict[str, Tuple[str, Optional[str]]] = {
+    "your name": ("SUPPORT_AGENT_NAME", "The Support Team"),
+    "agent name": ("SUPPORT_AGENT_NAME", "The Support Team"),
+    "your position": ("SUPPORT_AGENT_TITLE", "Customer Support"),
+    "your title": ("SUPPORT_AGENT_TITLE", "Customer Support"),
+    "customer name": ("SUPPORT_CUSTOMER_SALUTATION", "Customer"),
+    "customer": ("SUPPORT_CUSTOMER_SALUTATION", "Customer"),
+    "company name": ("SUPPORT_COMPANY_NAME", None),
+    "company": ("SUPPORT_COMPANY_NAME", None),
+    "support email": ("SUPPORT_EMAIL", None),
+}
+
+BANNED_PHRASES: List[Tuple[Pattern, str]] = [
+    (re.compile(r"\bas an ai\b|\bas a (?:large )?language model\b|\bI am an AI\b", re.I),
+     "The response refers to itself as an AI; write as the support team."),
+    (re.compile(r"\bI (?:can )?guarantee\b|\bguaranteed (?:refund|fix|resolution)\b|\b100% (?:refund|guarantee)\b", re.I),
+     "The response makes a guarantee the support team cannot promise."),
+]
+
+# Prompt scaffolding that should never reach a customer
+FORMAT_PATTERN = re.compile(r"^\s*(?:RESULT|FEEDBACK|Customer Ticket|Available Context|Category):", re.I | re.M)
+
+NEXT_STEP_PATTERN = re.compile(
+    r"\b(?:please|you can|you may|try|steps?|contact|reach out|reply|we will|we'll|I will|I'll|next|follow|visit|click|go to|let us know)\b",
+    re.I,
+)
+
+# Policies from data/mock_docs.json that a draft must not contradict, by category.
+# Checked per sentence; a match is fine when a negation qualifies the action itself ("we never email
+# reset links"), but not when it only appears elsewhere in the sentence ("... so you do not have to wait").
+POLICY_RULES: Dict[str, List[Tuple[Pattern, str]]] = {
+    "security": [
+        (re.compile(r"(?:send|email|e-mail|mail)\w*\b[^.]{0,80}\b(?:password )?reset link"
+                    r"|(?:password )?reset link[^.]{0,80}\b(?:via|by|to your|over) e-?mail", re.I),
+         "Policy violation: never provide password reset links via email (security policy)."),
+    ],
+    "billing": [
+        (re.compile(r"\b(?:we|I) (?:have|'ve|will|'ll)\s+(?:already\s+)?(?:issued|processed|approved|refunded)\b[^.]{0,40}\brefund"
+                    r"|\byour refund (?:has been|is) (?:approved|processed|issued)\b", re.I),
+         "Policy violation: refunds require approval by a human manager and cannot be promised in the response."),
+    ],
+}
+
+NEGATION_PATTERN = re.compile(r"\b(?:never|not|cannot|can't|won't|don't|do not|unable)\b", re.I)
+# Words before a policy match, and at its start, in which a negation counts as negating it
+NEGATION_WINDOW = 5
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def _placeholder_key(placeholder: str) -> str:
+    return placeholder.strip("[]<>").strip().lower()
+
+
+def fill_placeholders(draft: str) -> Tuple[str, List[str]]:
+    """Replace safe placeholders with configured values; returns the draft and what was filled"""
+    filled: List[str] = []
+
+    def replace(match: re.Match) -> str:
+        setting = SAFE_PLACEHOLDERS.get(_placeholder_key(match.group(0)))
+        if setting is None:
+            return match.group(0)
+        value = env_str(setting[0], setting[1] or "")
+        if not value:
+            return match.group(0)
+        filled.append(match.group(0))
+        return value
+
+    return PLACEHOLDER_PATTERN.sub(replace, draft), filled
+
+
+def _negated(sentence: str, match: re.Match) -> bool:
+    """True if a negation sits right before the matched action or among its first words ("reset links are never sent")"""
+    words = sentence[:match.start()].split()[-NEGATION_WINDOW:] + match.group(0).split()[:NEGATION_WINDOW]
+    return bool(NEGATION_PATTERN.search(" ".join(words)))
+
+
+def _violates(pattern: Pattern, sentence: str) -> bool:
+    return any(not _negated(sentence, match) for match in pattern.finditer(sentence))
+
+
+def check_draft(draft: str, category: Optional[str] = None) -> Dict:
+    """
+    Run all rules against a draft.
+
+    Returns {"draft": <draft with safe placeholders filled>, "filled": [...],
+    "violations": [...]}. Any violation means the draft should be rejected
+    with the violations as feedback, without calling the LLM reviewer.
+    """
+    draft, filled = fill_placeholders(draft or "")
+    violations: List[str] = []
+
+    remaining = list(dict.fromkeys(m.group(0) for m in PLACEHOLDER_PATTERN.finditer(draft)))
+    if remaining:
+        violations.append(
+            f"The draft contains unfilled placeholders: {', '.join(remaining)}. Remove them or write the actual text."
+        )
+
+    length = len(draft.strip())
+    min_chars = env_int("REVIEW_MIN_CHARS", 40)
+    max_chars = env_int("REVIEW_MAX_CHARS", 2500)
+    if length < min_chars:
+        violations.append(f"The draft is too short ({length} characters) to resolve the customer's issue.")
+    elif length > max_chars:
+        violations.append(f"The draft is too long ({length} characters, limit {max_chars}); make it concise.")
+
+    if FORMAT_PATTERN.search(draft):
+        violations.append("The draft contains prompt or review scaffolding (e.g. 'RESULT:' or 'Available Context:'); return only the customer-facing reply.")
+
+    for pattern, feedback in BANNED_PHRASES:
+        if pattern.search(draft):
+            violations.append(feedback)
+
+    if length >= min_chars and not NEXT_STEP_PATTERN.search(draft):
+        violations.append("The draft gives the customer no clear next step.")
+
+    sentences = SENTENCE_SPLIT.split(draft)
+    for pattern, feedback in POLICY_RULES.get((category or "").lower(), []):
+        if any(_violates(pattern, sentence) for sentence in sentences):
+            violations.append(feedback)
+
+    return {"draft": draft, "filled": filled, "violations": violations}
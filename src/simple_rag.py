@@ -1,112 +1,477 @@
+import hashlib
 import json
+import logging
 import os
+import threading
+import time
+from collections import Counter, OrderedDict
 import numpy as np
-from typing import Dict, List
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from ann_index import IVFIndex, ann_index_path
+from config import env_float, env_int, env_str
+from context_packer import estimate_tokens, mmr_order, truncate_sentences
+from embedding_store import EmbeddingStore
+import encoders
+from lexical_index import BM25Index, reciprocal_rank_fusion
+import metrics
+from tracing import span
+from vector_index import CategoryQuery, VectorIndex, normalize_rows
+import warmup
+
+logger = logging.getLogger(__name__)
+
+def knowledge_base_version(knowledge_base: Dict[str, List[str]], sources: Optional[Dict[str, List[Dict]]] = None) -> str:
+    content = [knowledge_base, sources] if sources else knowledge_base
+    return hashlib.sha1(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def read_knowledge_base(path: str) -> Tuple[Dict[str, List[str]], Dict[str, List[Dict]]]:
+    """
+    Documents per category and, for a chunked corpus, their citations.
+
+    A .json knowledge base maps category names to lists of strings. A .jsonl
+    corpus written by ingest.py has one chunk per line, and each chunk's
+    source and offset are returned in the same per-category order.
+    """
+    if not path.endswith(".jsonl"):
+        with open(path, 'r') as f:
+            return json.load(f), {}
+    
+    knowledge_base: Dict[str, List[str]] = {}
+    sources: Dict[str, List[Dict]] = {}
+    with open(path, 'r', encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            category = chunk.get("category") or "general"
+            knowledge_base.setdefault(category, []).append(chunk["text"])
+            sources.setdefault(category, []).append({"source": chunk.get("source"), "offset": chunk.get("offset")})
+    return knowledge_base, sources
+
+
+def diff_knowledge_base(old: Dict[str, List[str]], new: Dict[str, List[str]]) -> Dict[str, int]:
+    """Documents added, removed and unchanged per category between two versions; an edit is one of each"""
+    added = removed = unchanged = 0
+    for category in set(old) | set(new):
+        before, after = Counter(old.get(category, [])), Counter(new.get(category, []))
+        same = sum((before & after).values())
+        unchanged += same
+        added += sum(after.values()) - same
+        removed += sum(before.values()) - same
+    return {"added": added, "removed": removed, "unchanged": unchanged}
+
+
+RETRIEVAL_MODES = ("hybrid", "dense", "lexical")
+# Cosine similarity a keyword-only hybrid hit needs; the same floor VectorIndex.search applies
+HYBRID_MIN_SCORE = 0.1
+
+
+class _Snapshot(NamedTuple):
+    """Everything a search reads; replaced as a whole on reload"""
+    index: VectorIndex
+    ann_index: Optional[IVFIndex]
+    sources: Optional[List[Dict]]
+    lexical: BM25Index
+
 
 class SimpleRAG:
-    def __init__(self, knowledge_base_path: str = "data/mock_docs.json"):
-        """Initialize simple RAG system"""
+    def __init__(self, knowledge_base_path: str = "data/mock_docs.json", model_name: str = "all-MiniLM-L6-v2",
+                 index_backend: Optional[str] = None, encoder=None, retrieval_mode: Optional[str] = None,
+                 encoder_backend: Optional[str] = None):
+        """
+        Initialize simple RAG system.
+
+        ``index_backend`` is "exact" or "ivf" (defaults to RAG_INDEX_BACKEND).
+        The IVF index is tuned with RAG_IVF_LISTS and RAG_IVF_NPROBE.
+        RAG_VECTOR_PRECISION (float32, float16 or int8) sets how the document
+        matrix is held in memory; see VectorIndex.
+        ``encoder_backend`` (RAG_ENCODER_BACKEND) runs the model with
+        sentence-transformers, onnx or the hashing stub; see encoders.py.
+        ``encoder`` replaces the backend with any object that has the same
+        ``encode`` method (used by the benchmarks and tests).
+        ``retrieval_mode`` (RAG_RETRIEVAL_MODE) is "hybrid" (dense and BM25
+        results fused by reciprocal rank), "dense" or "lexical"; lexical never
+        loads the encoder, and every mode falls back to lexical without one.
+        """
         self.knowledge_base_path = knowledge_base_path
+        self.model_name = model_name
+        self.index_backend = (index_backend or env_str("RAG_INDEX_BACKEND", "exact")).lower()
+        self.retrieval_mode = (retrieval_mode or env_str("RAG_RETRIEVAL_MODE", "hybrid")).lower()
+        if self.retrieval_mode not in RETRIEVAL_MODES:
+            logger.warning("⚠️ Unknown retrieval mode %s, using hybrid", self.retrieval_mode)
+            self.retrieval_mode = "hybrid"
+        self.encoder_backend = encoders.encoder_backend(encoder_backend)
         self.model = None
+        self.embedding_store = EmbeddingStore(
+            knowledge_base_path, model_name if encoder is not None else encoders.encoder_id(model_name, self.encoder_backend))
         self.knowledge_base = {}
+        self.sources: Dict[str, List[Dict]] = {}
+        self.kb_version = ""
         self.document_embeddings = {}
         self.documents_list = {}
+        empty = VectorIndex({}, {})
+        self._indexes = _Snapshot(empty, None, None, BM25Index(empty))
+        self.primed_queries: Dict[str, np.ndarray] = {}
+        self.recent_queries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.recent_queries_lock = threading.Lock()
+        self.encoder = encoder
+        self._reload_lock = threading.Lock()
+        self._source: Optional[Tuple[int, int]] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        self.last_reload: Optional[Dict] = None
         
         self._initialize()
     
+    @property
+    def index(self) -> VectorIndex:
+        return self._indexes.index
+    
+    @property
+    def ann_index(self) -> Optional[IVFIndex]:
+        return self._indexes.ann_index
+    
+    @property
+    def lexical_index(self) -> BM25Index:
+        return self._indexes.lexical
+    
+    @property
+    def available(self) -> bool:
+        """True if retrieval can return documents, with or without the encoder"""
+        return self.model is not None or len(self._indexes.lexical) > 0
+    
     def _initialize(self):
         """Initialize model and load knowledge base"""
+        if self.retrieval_mode != "lexical":
+            try:
+                if self.encoder is not None:
+                    self.model = self.encoder
+                else:
+                    # Backends import torch or onnxruntime only here, so importing the agent stays cheap
+                    self.model = encoders.create_encoder(self.model_name, self.encoder_backend)
+            except Exception as e:
+                logger.error("❌ Error loading the encoder, falling back to keyword search: %s", e)
+                self.model = None
+        
         try:
-            print("🤖 Loading sentence transformer model...")
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            print("✅ Model loaded successfully")
-            
             self._load_knowledge_base()
             self._create_embeddings()
-            
         except Exception as e:
-            print(f"❌ Error initializing RAG: {e}")
-            self.model = None
+            logger.error("❌ Error initializing RAG: %s", e)
     
-    def _load_knowledge_base(self):
-        """Load knowledge base from JSON"""
+    def _source_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.knowledge_base_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _read_knowledge_base(self) -> Optional[Tuple[Dict[str, List[str]], Dict[str, List[Dict]]]]:
+        """Parse the knowledge base and its citations; None if it is missing or not valid yet"""
         if not os.path.exists(self.knowledge_base_path):
-            print(f"❌ Knowledge base not found: {self.knowledge_base_path}")
-            return
+            logger.error("❌ Knowledge base not found: %s", self.knowledge_base_path)
+            return None
         
         try:
-            with open(self.knowledge_base_path, 'r') as f:
-                self.knowledge_base = json.load(f)
-            print(f"✅ Loaded knowledge base: {list(self.knowledge_base.keys())}")
+            return read_knowledge_base(self.knowledge_base_path)
         except Exception as e:
-            print(f"❌ Error loading knowledge base: {e}")
+            logger.error("❌ Error loading knowledge base: %s", e)
+            return None
+    
+    def _load_knowledge_base(self):
+        """Load knowledge base from JSON, or a chunked JSONL corpus"""
+        self._source = self._source_signature()
+        loaded = self._read_knowledge_base()
+        if loaded is not None:
+            self.knowledge_base, self.sources = loaded
+            self.kb_version = knowledge_base_version(*loaded)
+            logger.info("✅ Loaded knowledge base: %s", list(self.knowledge_base.keys()))
+    
+    def _build_indexes(self, knowledge_base: Dict[str, List[str]], sources: Dict[str, List[Dict]]):
+        """
+        Embeddings and search indexes for ``knowledge_base``, built without
+        touching the ones currently serving queries. Without an encoder the
+        vector index has zero-width rows and only keyword search is possible.
+        """
+        knowledge_base = {category: documents for category, documents in knowledge_base.items() if documents}
+        if self.model:
+            embeddings = self.embedding_store.load(knowledge_base, self.model.encode)
+        else:
+            embeddings = {category: np.empty((len(documents), 0), dtype=np.float32)
+                          for category, documents in knowledge_base.items()}
+        document_embeddings, documents_list = {}, {}
+        for category, documents in knowledge_base.items():
+            document_embeddings[category] = embeddings[category]
+            documents_list[category] = documents
+            logger.info("✅ %s: %s documents", category, len(documents))
+        if self.model:
+            index = VectorIndex(document_embeddings, documents_list,
+                                precision=env_str("RAG_VECTOR_PRECISION", "float32").lower(),
+                                rescore_factor=env_int("RAG_RESCORE_FACTOR", 4), normalized=True)
+        else:
+            index = VectorIndex(document_embeddings, documents_list)
+        ann_index = None
+        if self.model and self.index_backend == "ivf":
+            ann_index = IVFIndex(
+                index,
+                n_lists=env_int("RAG_IVF_LISTS", 0),
+                n_probe=env_int("RAG_IVF_NPROBE", 8),
+                encoder_id=self.embedding_store.model_name,
+            ).load_or_build(ann_index_path(self.knowledge_base_path))
+        # Dense-only retrieval never reads the keyword index, so it is not built
+        lexical = BM25Index(index if self.retrieval_mode != "dense" or not self.model else VectorIndex({}, {}))
+        row_sources = None
+        if sources:
+            row_sources = []
+            for category in index.categories:
+                row_sources.extend(sources.get(category) or [None] * len(documents_list[category]))
+        return document_embeddings, documents_list, _Snapshot(index, ann_index, row_sources, lexical)
     
     def _create_embeddings(self):
-        """Create embeddings for all documents"""
-        if not self.model or not self.knowledge_base:
+        """Load document embeddings from the on-disk index, encoding only new or changed documents"""
+        if not self.knowledge_base:
             return
         
         try:
-            print("🔄 Creating embeddings...")
-            for category, documents in self.knowledge_base.items():
-                if documents:
-                    embeddings = self.model.encode(documents)
-                    self.document_embeddings[category] = embeddings
-                    self.documents_list[category] = documents
-                    print(f"✅ {category}: {len(documents)} documents")
+            logger.info("🔄 Loading embeddings...")
+            self.document_embeddings, self.documents_list, self._indexes = self._build_indexes(self.knowledge_base, self.sources)
+            logger.info("✅ Embedding index ready (%s documents re-encoded)", self.embedding_store.last_encoded)
         except Exception as e:
-            print(f"❌ Error creating embeddings: {e}")
+            logger.error("❌ Error creating embeddings: %s", e)
     
-    def retrieve_documents(self, query: str, category: str, top_k: int = 3) -> List[Dict]:
-        """Retrieve relevant documents"""
-        if not self.model:
-            return []
+    def reload(self, force: bool = False) -> Optional[Dict]:
+        """
+        Re-read the knowledge base and swap in a new index if its content changed.
+
+        Only added or edited documents are encoded. The new index is built
+        while searches keep using the old one, then swapped in with a single
+        assignment, so a search sees either the old or the new index, never a
+        mix. Returns a report of the reload, or None if nothing changed.
+        """
+        with self._reload_lock:
+            started = time.perf_counter()
+            # A file that fails to parse is retried once it changes again
+            self._source = self._source_signature()
+            loaded = self._read_knowledge_base()
+            if loaded is None:
+                return None
+            knowledge_base, sources = loaded
+            version = knowledge_base_version(knowledge_base, sources)
+            if version == self.kb_version and not force:
+                return None
+            
+            try:
+                document_embeddings, documents_list, indexes = self._build_indexes(knowledge_base, sources)
+            except Exception as e:
+                logger.error("❌ Knowledge base reload failed, keeping the previous index: %s", e)
+                return None
+            delta = diff_knowledge_base(self.knowledge_base, knowledge_base)
+            self._indexes = indexes
+            self.knowledge_base, self.sources, self.kb_version = knowledge_base, sources, version
+            self.document_embeddings, self.documents_list = document_embeddings, documents_list
+            
+            seconds = time.perf_counter() - started
+            report = {**delta, "encoded": self.embedding_store.last_encoded if self.model else 0,
+                      "documents": len(indexes.index),
+                      "seconds": round(seconds, 4), "kb_version": version}
+            self.last_reload = report
+        
+        metrics.inc("rag_reloads_total")
+        metrics.observe("rag_reload_seconds", seconds)
+        logger.info("♻️ Knowledge base reloaded in %.2fs: +%s -%s documents, %s encoded, %s total",
+                    seconds, report["added"], report["removed"], report["encoded"], report["documents"])
+        return report
+    
+    def watch(self, interval: Optional[float] = None) -> Optional[threading.Thread]:
+        """
+        Reload whenever the knowledge base file changes, checking its mtime and
+        size every ``interval`` seconds (RAG_RELOAD_SECONDS; 0 = off).
+        """
+        interval = env_float("RAG_RELOAD_SECONDS", 0.0) if interval is None else interval
+        if interval <= 0 or self._watcher is not None:
+            return self._watcher
         
-        # Convert category to lowercase for matching
-        category_lower = category.lower()
+        def poll():
+            while not self._stop_watching.wait(interval):
+                if self._source_signature() != self._source:
+                    try:
+                        self.reload()
+                    except Exception as e:
+                        logger.error("❌ Knowledge base reload failed: %s", e)
         
-        # Try exact match first, then partial match
-        matched_category = None
-        for cat in self.document_embeddings.keys():
-            if cat.lower() == category_lower:
-                matched_category = cat
-                break
-            elif category_lower in cat.lower() or cat.lower() in category_lower:
-                matched_category = cat
-                break
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=poll, name="kb-watcher", daemon=True)
+        self._watcher.start()
+        logger.info("👀 Watching %s for changes every %ss", self.knowledge_base_path, interval)
+        return self._watcher
+    
+    def stop_watching(self):
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+    
+    def retrieve_documents(self, query: str, category: CategoryQuery, top_k: int = 3) -> List[Dict]:
+        """
+        Retrieve relevant documents.
+
+        ``category`` may be a single category name, a list of names, or None to
+        search across every category.
+        """
+        if not self.available:
+            return []
         
-        if not matched_category:
-            print(f"❌ Category '{category}' not found")
+        # One read, so a concurrent reload cannot pair the old index with the new ANN or keyword index
+        snapshot = self._indexes
+        index = snapshot.index
+        category_ids = index.resolve_categories(category)
+        if category_ids is not None and not category_ids:
+            logger.error("❌ Category '%s' not found", category)
             return []
         
+        mode = self.retrieval_mode if self.model is not None else "lexical"
         try:
-            query_embedding = self.model.encode([query])
-            doc_embeddings = self.document_embeddings[matched_category]
-            documents = self.documents_list[matched_category]
-            
-            similarities = cosine_similarity(query_embedding, doc_embeddings)[0]
-            top_indices = np.argsort(similarities)[::-1][:top_k]
+            with span("rag.retrieve_documents", "rag", category=category, top_k=top_k, mode=mode) as trace_span:
+                if mode == "lexical":
+                    matches = self._lexical_search(snapshot.lexical, query, category_ids, top_k, normalize=True)
+                else:
+                    query_embedding = self.embed_query(query)
+                    if mode == "dense":
+                        matches = self._dense_search(snapshot, query_embedding, category_ids, top_k)
+                    else:
+                        matches = self._hybrid_search(snapshot, query, query_embedding, category_ids, top_k)
+                trace_span.set(scores=[round(score, 4) for _, score in matches])
             
-            results = []
-            for idx in top_indices:
-                if similarities[idx] > 0.1:  # Minimum threshold
-                    results.append({
-                        'content': documents[idx],
-                        'similarity': float(similarities[idx]),
-                        'category': matched_category
-                    })
+            # Full-precision rows, so format_context can spot near-duplicate passages
+            vectors = index.vectors([row for row, _ in matches]) if index.dim and matches else None
+            results = [{
+                'content': index.documents[row],
+                'similarity': score,
+                'category': index.category_of(row),
+                **({'embedding': vectors[i]} if vectors is not None else {}),
+                **((snapshot.sources[row] or {}) if snapshot.sources else {})
+            } for i, (row, score) in enumerate(matches)]
             
-            print(f"🔍 Found {len(results)} documents for '{query}' in {matched_category}")
+            searched = "all categories" if category_ids is None else ", ".join(index.categories[c] for c in category_ids)
+            logger.debug("🔍 Found %s documents for '%s' in %s (%s)", len(results), query, searched, mode)
             return results
             
         except Exception as e:
-            print(f"❌ Retrieval error: {e}")
+            logger.error("❌ Retrieval error: %s", e)
             return []
     
-    def format_context(self, retrieved_docs: List[Dict], query: str) -> str:
-        """Format retrieved documents as context"""
+    def _dense_search(self, snapshot: _Snapshot, query_embedding: np.ndarray, category_ids, top_k: int):
+        searcher = snapshot.ann_index or snapshot.index
+        started = time.perf_counter()
+        with span("rag.search", "rag", backend=type(searcher).__name__):
+            matches = searcher.search(query_embedding, category_ids, top_k=top_k)
+        metrics.observe("rag_search_seconds", time.perf_counter() - started)
+        return matches
+    
+    def _lexical_search(self, lexical: BM25Index, query: str, category_ids, top_k: int, normalize: bool = False):
+        started = time.perf_counter()
+        with span("rag.lexical_search", "rag"):
+            matches = lexical.search(query, category_ids, top_k=top_k, normalize=normalize)
+        metrics.observe("rag_lexical_search_seconds", time.perf_counter() - started)
+        return matches
+    
+    def _hybrid_search(self, snapshot: _Snapshot, query: str, query_embedding: np.ndarray, category_ids, top_k: int):
+        """
+        Fuse dense and BM25 candidates by reciprocal rank (RAG_HYBRID_CANDIDATES
+        from each, RAG_RRF_K). Results keep their cosine similarity as the
+        score, so "% relevant" in the context means the same in every mode.
+        Keyword-only hits below RAG_HYBRID_MIN_SCORE similarity are dropped,
+        as dense search drops its own weak matches.
+        """
+        candidates = max(top_k, env_int("RAG_HYBRID_CANDIDATES", 20))
+        dense = self._dense_search(snapshot, query_embedding, category_ids, candidates)
+        lexical = self._lexical_search(snapshot.lexical, query, category_ids, candidates)
+        fused = reciprocal_rank_fusion([[row for row, _ in dense], [row for row, _ in lexical]],
+                                       k=env_int("RAG_RRF_K", 60))
+        
+        similarity = dict(dense)
+        missing = [row for row, _ in fused if row not in similarity]
+        if missing:
+            # Keyword-only hits were never scored by the dense search
+            scores = snapshot.index.vectors(missing) @ normalize_rows(query_embedding)[0]
+            similarity.update(zip(missing, scores.tolist()))
+        min_score = env_float("RAG_HYBRID_MIN_SCORE", HYBRID_MIN_SCORE)
+        return [(row, float(similarity[row])) for row, _ in fused if similarity[row] >= min_score][:top_k]
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Encode a query, reusing primed or recently encoded embeddings.
+
+        The classifier and the retrieve node embed the same ticket text, so
+        the second lookup is served from a small LRU instead of the model.
+        """
+        embedding = self.primed_queries.get(query)
+        if embedding is not None:
+            metrics.inc("rag_query_cache_hits_total", source="primed")
+            return embedding
+        with self.recent_queries_lock:
+            embedding = self.recent_queries.get(query)
+            if embedding is not None:
+                self.recent_queries.move_to_end(query)
+                metrics.inc("rag_query_cache_hits_total", source="recent")
+                return embedding
+        
+        started = time.perf_counter()
+        with span("rag.encode_query", "rag", chars=len(query)):
+            embedding = self.model.encode([query])[0]
+        metrics.observe("rag_encode_seconds", time.perf_counter() - started)
+        with self.recent_queries_lock:
+            self.recent_queries[query] = embedding
+            while len(self.recent_queries) > 256:
+                self.recent_queries.popitem(last=False)
+        return embedding
+    
+    def prime_queries(self, queries: List[str]) -> int:
+        """
+        Encode a batch of queries in a single model call ahead of retrieval.
+
+        retrieve_documents uses the primed embedding instead of encoding the
+        query again; call release_queries when the batch is done.
+        """
+        if not self.model:
+            return 0
+        pending = list(dict.fromkeys(q for q in queries if q not in self.primed_queries))
+        if pending:
+            embeddings = self.model.encode(pending)
+            for query, embedding in zip(pending, embeddings):
+                self.primed_queries[query] = embedding
+        return len(pending)
+    
+    def release_queries(self, queries: List[str]):
+        """Drop primed query embeddings once their batch has finished"""
+        for query in queries:
+            self.primed_queries.pop(query, None)
+    
+    def format_context(self, retrieved_docs: List[Dict], query: str, max_tokens: int = 0,
+                       max_passages: Optional[int] = None) -> str:
+        """
+        Format retrieved documents as context.
+
+        With ``max_tokens`` or ``max_passages`` the passages are packed:
+        near-duplicates are skipped (see context_packer.mmr_order), at most
+        ``max_passages`` are kept, and they fill at most ``max_tokens`` tokens,
+        the last one cut at a sentence. The tokens saved against the plain
+        context are counted in rag_context_tokens_saved_total.
+        """
+        with span("rag.format_context", "rag", documents=len(retrieved_docs)) as trace_span:
+            context = self._format_context(retrieved_docs, query, max_tokens, max_passages)
+            tokens = estimate_tokens(context)
+            saved = max(0, estimate_tokens(self._format_context(retrieved_docs, query)) - tokens)
+            trace_span.set(tokens=tokens, tokens_saved=saved)
+        metrics.observe("rag_context_tokens", tokens, metrics.TOKEN_BUCKETS)
+        if saved:
+            metrics.inc("rag_context_tokens_saved_total", saved, stage="format")
+            logger.debug("✂️ Context packed into %s tokens, %s saved", tokens, saved)
+        return context
+    
+    def _format_context(self, retrieved_docs: List[Dict], query: str, max_tokens: int = 0,
+                        max_passages: Optional[int] = None) -> str:
         if not retrieved_docs:
             return f"No relevant documentation found for: '{query}'"
         
@@ -115,23 +480,46 @@ class SimpleRAG:
             f"Query: {query}",
             ""
         ]
+        footer = "=== END KNOWLEDGE BASE ==="
+        
+        order = range(len(retrieved_docs))
+        if max_tokens > 0 or max_passages is not None:
+            embeddings = [doc.get('embedding') for doc in retrieved_docs]
+            vectors = np.stack(embeddings) if all(e is not None for e in embeddings) else None
+            order = mmr_order([doc['similarity'] for doc in retrieved_docs], vectors)[:max_passages]
+        # Pieces are estimated separately, which only overestimates the total
+        remaining = max_tokens - estimate_tokens("\n".join(context_parts + [footer])) if max_tokens > 0 else None
         
-        for doc in retrieved_docs:
+        for i in order:
+            doc = retrieved_docs[i]
             similarity_pct = doc['similarity'] * 100
+            citation = f" - source: {doc['source']}#{doc.get('offset') or 0}" if doc.get('source') else ""
+            banner = f"[{doc['category'].upper()} - {similarity_pct:.1f}% relevant{citation}]"
+            content = doc['content']
+            if remaining is not None:
+                content = truncate_sentences(content, remaining - estimate_tokens(banner + "\n\n\n"))
+                if not content:
+                    break
+                remaining -= estimate_tokens(banner + "\n\n\n") + estimate_tokens(content)
             context_parts.extend([
-                f"[{doc['category'].upper()} - {similarity_pct:.1f}% relevant]",
-                doc['content'],
+                banner,
+                content,
                 ""
             ])
         
-        context_parts.append("=== END KNOWLEDGE BASE ===")
+        context_parts.append(footer)
         return "\n".join(context_parts)
 
-# Global instance
+# Global instance, created once even when the first tickets arrive concurrently
+_rag_lock = threading.Lock()
 _rag_instance = None
 
 def get_rag_system():
     global _rag_instance
     if _rag_instance is None:
-        _rag_instance = SimpleRAG()
-    return _rag_instance
\ No newline at end of file
+        with _rag_lock:
+            if _rag_instance is None:
+                _rag_instance = SimpleRAG(env_str("RAG_KNOWLEDGE_BASE", "data/mock_docs.json"))
+                _rag_instance.watch()
+                warmup.rag_loaded(_rag_instance)
+    return _rag_instance
@@ -4,6 +4,7 @@ class AgentState(TypedDict):
     subject: str
     description: str
     category: Optional[str]
+    category_confidence: Optional[float]
     context: Optional[str]
     draft: Optional[str]
     review_result: Optional[str]
@@ -12,3 +13,4 @@ class AgentState(TypedDict):
     needs_review: Optional[bool]
     attempts: Optional[int]
     failed_drafts: Optional[List[str]]
+    answer_cache_id: Optional[int]
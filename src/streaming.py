@@ -0,0 +1,70 @@
+"""
+Stream a ticket through the async support agent.
+
+    python src/streaming.py "Payment issue" "My card was declined"
+
+stream_ticket() yields events as they happen:
+- {"event": "node", "node": ...} when a graph node finishes
+- {"event": "draft_token", "attempt": ..., "text": ...} for every drafted token
+- {"event": "draft", "attempt": ..., "draft": ...} when a draft is complete (provisional)
+- {"event": "final", "status": "APPROVED" | "ESCALATED", ...} once, at the end
+"""
+import asyncio
+import sys
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+
+async def stream_ticket(ticket: Dict[str, Any], agent=None) -> AsyncIterator[Dict[str, Any]]:
+    """Run one ticket and yield progress, token and terminal events"""
+    if agent is None:
+        from main import async_support_agent
+        agent = async_support_agent
+
+    started = time.perf_counter()
+    first_token_ms: Optional[float] = None
+    final_state: Dict[str, Any] = {}
+
+    async for mode, chunk in agent.astream(ticket, stream_mode=["updates", "custom", "values"]):
+        if mode == "custom":
+            if chunk.get("event") == "draft_token" and first_token_ms is None:
+                first_token_ms = (time.perf_counter() - started) * 1000
+            yield chunk
+        elif mode == "updates":
+            for node, update in chunk.items():
+                yield {"event": "node", "node": node}
+                if node == "draft" and update and update.get("draft"):
+                    yield {"event": "draft", "attempt": final_state.get("attempts", 0) + 1, "draft": update["draft"]}
+        elif mode == "values":
+            final_state = chunk
+
+    yield {
+        "event": "final",
+        "status": "APPROVED" if final_state.get("review_result") == "APPROVED" else "ESCALATED",
+        "category": final_state.get("category"),
+        "draft": final_state.get("draft"),
+        "attempts": final_state.get("attempts", 0),
+        "reviewer_feedback": final_state.get("reviewer_feedback"),
+        "time_to_first_token_ms": first_token_ms,
+        "total_ms": (time.perf_counter() - started) * 1000,
+    }
+
+
+async def _main(subject: str, description: str):
+    async for event in stream_ticket({"subject": subject, "description": description}):
+        if event["event"] == "draft_token":
+            print(event["text"], end="", flush=True)
+        elif event["event"] == "draft":
+            print()
+        elif event["event"] == "final":
+            print(f"\n📊 {event['status']} after {event['attempts']} rejected attempts "
+                  f"(first token {event['time_to_first_token_ms'] or 0:.0f} ms, total {event['total_ms']:.0f} ms)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print('Usage: python src/streaming.py "<subject>" "<description>"')
+        sys.exit(1)
+    from main import startup
+    startup()
+    asyncio.run(_main(sys.argv[1], sys.argv[2]))
@@ -0,0 +1,251 @@
+"""
+Per-ticket span tracing in Chrome trace format.
+
+A sampled ticket (TRACE_SAMPLE_RATE) records a span for every graph node,
+LLM request (with prompt size and token counts), retrieval (with top-k
+scores) and an instant event for every retry. When the ticket finishes its
+timeline is written to TRACE_DIR (default .cache/traces) as a Chrome-trace
+JSON file that opens in chrome://tracing or https://ui.perfetto.dev.
+
+Unsampled tickets pay for a single context variable lookup per span.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from config import env_float, env_str
+
+logger = logging.getLogger(__name__)
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """Events of one ticket; spans from any thread or asyncio task may add to it"""
+
+    def __init__(self, name: str, args: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.args = args or {}
+        self.pid = os.getpid()
+        self.started = time.perf_counter_ns()
+        self.lock = threading.Lock()
+        self.events = []
+        self.tracks: Dict[tuple, int] = {}
+
+    def now_us(self) -> float:
+        return (time.perf_counter_ns() - self.started) / 1000
+
+    def track(self) -> int:
+        """
+        Chrome-trace thread id for the caller.
+
+        Concurrent asyncio tasks share a thread but overlap in time, so each
+        task gets its own track; otherwise spans would not nest.
+        """
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = (threading.get_ident(), id(task) if task else None)
+        with self.lock:
+            tid = self.tracks.get(key)
+            if tid is None:
+                tid = self.tracks[key] = len(self.tracks) + 1
+                label = task.get_name() if task else threading.current_thread().name
+                self.events.append({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": label}})
+        return tid
+
+    def add(self, event: Dict[str, Any]):
+        with self.lock:
+            self.events.append(event)
+
+    def to_json(self) -> Dict[str, Any]:
+        with self.lock:
+            events = list(self.events)
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"trace_id": self.id, "name": self.name, **self.args},
+        }
+
+    def write(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"trace-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{self.id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, default=str)
+        return path
+
+
+class Span:
+    """A complete ("X") event; extra args can be attached while it is open"""
+
+    __slots__ = ("trace", "name", "category", "args", "begin", "tid")
+
+    def __init__(self, trace: Trace, name: str, category: str, args: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self) -> "Span":
+        self.tid = self.trace.track()
+        self.begin = self.trace.now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        self.trace.add({
+            "name": self.name,
+            "cat": self.category,
+            "ph": "X",
+            "ts": self.begin,
+            "dur": self.trace.now_us() - self.begin,
+            "pid": self.trace.pid,
+            "tid": self.tid,
+            "args": self.args,
+        })
+        return False
+
+    def set(self, **args: Any):
+        self.args.update(args)
+
+
+class _NoSpan:
+    """Stand-in returned when the current ticket is not traced"""
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set(self, **args: Any):
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+# Next to the LLM response cache; "logs" is a file in this repository, so nothing can live under it
+DEFAULT_TRACE_DIR = ".cache/traces"
+
+
+def tracing_active() -> bool:
+    return _current_trace.get() is not None
+
+
+def span(name: str, cat: str = "app", **args: Any):
+    """Context manager timing a block in the current ticket's trace, if any"""
+    trace = _current_trace.get()
+    if trace is None:
+        return NO_SPAN
+    return Span(trace, name, cat, args)
+
+
+def instant(name: str, cat: str = "app", **args: Any):
+    """Record a point-in-time event such as a retry"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add({"name": name, "cat": cat, "ph": "i", "s": "t", "ts": trace.now_us(),
+                   "pid": trace.pid, "tid": trace.track(), "args": args})
+
+
+def start_trace(name: str, **args: Any) -> Optional[Trace]:
+    """A new trace if this ticket is sampled (TRACE_SAMPLE_RATE between 0 and 1), else None"""
+    rate = env_float("TRACE_SAMPLE_RATE", 0.0)
+    if rate <= 0 or random.random() >= rate:
+        return None
+    return Trace(name, args)
+
+
+def finish_trace(trace: Trace):
+    try:
+        path = trace.write(env_str("TRACE_DIR", DEFAULT_TRACE_DIR))
+        logger.info("🧵 Trace written to %s", path)
+    except OSError as e:
+        logger.warning("⚠️ Could not write trace: %s", e)
+
+
+def _reset(token):
+    try:
+        _current_trace.reset(token)
+    except ValueError:
+        # The generator was finished from a different context; nothing to restore there
+        pass
+
+
+def traced_node(name: str, node: Callable) -> Callable:
+    """Wrap a sync or async graph node in a span named after it"""
+    if asyncio.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def async_wrapper(state, *args, **kwargs):
+            with span(name, "node", attempts=state.get("attempts", 0)):
+                return await node(state, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(node)
+    def wrapper(state, *args, **kwargs):
+        with span(name, "node", attempts=state.get("attempts", 0)):
+            return node(state, *args, **kwargs)
+    return wrapper
+
+
+def _ticket_args(graph_input: Any) -> Dict[str, Any]:
+    if isinstance(graph_input, dict):
+        return {"subject": str(graph_input.get("subject", ""))[:200]}
+    return {}
+
+
+def trace_graph(graph):
+    """
+    Trace every run of a compiled graph.
+
+    invoke/ainvoke/batch all go through stream/astream, so wrapping those two
+    on the instance starts one trace per sampled ticket; LangGraph copies the
+    context into each node, so node, LLM and RAG spans land in that trace.
+    """
+    stream, astream = graph.stream, graph.astream
+
+    @functools.wraps(stream)
+    def traced_stream(graph_input, *args, **kwargs):
+        trace = start_trace("ticket", **_ticket_args(graph_input))
+        if trace is None:
+            yield from stream(graph_input, *args, **kwargs)
+            return
+        token = _current_trace.set(trace)
+        try:
+            with Span(trace, "ticket", "graph", _ticket_args(graph_input)):
+                yield from stream(graph_input, *args, **kwargs)
+        finally:
+            _reset(token)
+            finish_trace(trace)
+
+    @functools.wraps(astream)
+    async def traced_astream(graph_input, *args, **kwargs):
+        trace = start_trace("ticket", **_ticket_args(graph_input))
+        if trace is None:
+            async for chunk in astream(graph_input, *args, **kwargs):
+                yield chunk
+            return
+        token = _current_trace.set(trace)
+        try:
+            with Span(trace, "ticket", "graph", _ticket_args(graph_input)):
+                async for chunk in astream(graph_input, *args, **kwargs):
+                    yield chunk
+        finally:
+            _reset(token)
+            await asyncio.to_thread(finish_trace, trace)
+
+    graph.stream = traced_stream
+    graph.astream = traced_astream
+    return graph
@@ -0,0 +1,278 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+CategoryQuery = Union[None, str, Sequence[str]]
+
+PRECISIONS = ("float32", "float16", "int8")
+
+# Quantized rows are widened to float32 this many at a time while scanning; small
+# enough for the widened chunk to stay in cache
+SCAN_CHUNK_ROWS = 256
+# Rows normalized and quantized at a time while building, so no full float32 copy is made
+BUILD_CHUNK_ROWS = 1024
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Return a contiguous float32 copy of ``vectors`` scaled to unit length"""
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def _contiguous_rows(blocks: List[np.ndarray]) -> Optional[np.ndarray]:
+    """
+    One view over ``blocks`` if they are back-to-back row slices of the same
+    float32 array (such as category slices of a memory-mapped matrix), else None.
+    """
+    if not blocks or any(block.dtype != np.float32 or not block.flags.c_contiguous for block in blocks):
+        return None
+    root = blocks[0]
+    while isinstance(root.base, np.ndarray):
+        root = root.base
+    if root.ndim != 2 or root.dtype != np.float32 or not root.flags.c_contiguous or not root.strides[0]:
+        return None
+    row_bytes = root.strides[0]
+    offset = blocks[0].ctypes.data - root.ctypes.data
+    end = offset
+    for block in blocks:
+        if block.ctypes.data != root.ctypes.data + end:
+            return None
+        end += block.nbytes
+    if offset % row_bytes or end > root.nbytes:
+        return None
+    return root[offset // row_bytes:end // row_bytes]
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` highest scores, best first, without a full sort"""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.size:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.size)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class VectorIndex:
+    """
+    Exact dot-product search over one pre-normalized document matrix.
+
+    All categories live in a single matrix. Rows are grouped by category and
+    ``category_ids`` holds the category of every row, so single-category,
+    multi-category and cross-category queries share one code path.
+
+    With ``precision`` "float16" or "int8" (per-dimension scalar quantization)
+    only the quantized matrix is kept in memory, at a half or a quarter of
+    the float32 size. A search scans it for ``rescore_factor * top_k``
+    candidates and rescores those against the full-precision embeddings it
+    was given; when those are slices of the memory-mapped EmbeddingStore
+    file, only the candidate rows are ever read from disk.
+
+    ``normalized`` promises that the embeddings already have unit length, as
+    EmbeddingStore writes them. Float32 search then runs directly on the
+    memory-mapped file instead of a copy of it; otherwise rows are normalized
+    BUILD_CHUNK_ROWS at a time into the target precision.
+    """
+
+    def __init__(self, embeddings: Dict[str, np.ndarray], documents: Dict[str, List[str]],
+                 precision: str = "float32", rescore_factor: int = 4, normalized: bool = False):
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {PRECISIONS}, got {precision!r}")
+        self.precision = precision
+        self.rescore_factor = max(1, rescore_factor)
+        self.categories: List[str] = [c for c in embeddings if len(documents.get(c, []))]
+        self.documents: List[str] = []
+        self.ranges: List[Tuple[int, int]] = []
+
+        blocks = []
+        for category in self.categories:
+            start = len(self.documents)
+            self.documents.extend(documents[category])
+            self.ranges.append((start, len(self.documents)))
+            blocks.append(embeddings[category])
+
+        self.dim = blocks[0].shape[1] if blocks else 0
+        self.blocks: List[np.ndarray] = []
+        self.norms: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+        self._matrix: Optional[np.ndarray] = None
+        # Rows already of unit length, back to back in one array (the EmbeddingStore file) are used in place
+        view = _contiguous_rows(blocks) if normalized and precision == "float32" else None
+        self.mapped = view is not None
+        if view is not None:
+            self._matrix = view
+        elif precision == "float32":
+            self._matrix = np.empty((len(self.documents), self.dim), dtype=np.float32)
+            for start, chunk in self._normalized_chunks(blocks, normalized):
+                self._matrix[start:start + len(chunk)] = chunk
+        else:
+            # Keep the (usually memory-mapped) originals for rescoring and only the codes in memory
+            self.blocks = [np.asarray(block, dtype=np.float32) for block in blocks]
+            if not normalized:
+                self.norms = np.concatenate([np.linalg.norm(block, axis=1) for block in self.blocks]) if blocks else np.empty(0)
+                self.norms[self.norms == 0] = 1.0
+            if precision == "float16":
+                self.codes = np.empty((len(self.documents), self.dim), dtype=np.float16)
+                for start, chunk in self._normalized_chunks(self.blocks, normalized):
+                    self.codes[start:start + len(chunk)] = chunk
+            else:
+                # Per-dimension scale from a first pass, then quantize a chunk at a time
+                max_abs = np.full(self.dim, 1e-12 * 127, dtype=np.float32)
+                for _, chunk in self._normalized_chunks(self.blocks, normalized):
+                    np.maximum(max_abs, chunk.max(axis=0), out=max_abs)
+                    np.maximum(max_abs, -chunk.min(axis=0), out=max_abs)
+                self.scale = max_abs / 127
+                self.codes = np.empty((len(self.documents), self.dim), dtype=np.int8)
+                for start, chunk in self._normalized_chunks(self.blocks, normalized):
+                    scaled = np.divide(chunk, self.scale)
+                    np.rint(scaled, out=scaled)
+                    self.codes[start:start + len(chunk)] = np.clip(scaled, -127, 127, out=scaled)
+        self.category_ids = np.concatenate([
+            np.full(end - start, cid, dtype=np.int32) for cid, (start, end) in enumerate(self.ranges)
+        ]) if self.ranges else np.empty(0, dtype=np.int32)
+
+        self.aliases: Dict[str, Optional[int]] = {}
+        for cid, category in enumerate(self.categories):
+            name = category.lower().strip()
+            for alias in (name, name.rstrip("s"), name.replace("_", " "), name.replace(" ", "_")):
+                self.aliases.setdefault(alias, cid)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def _normalized_chunks(self, blocks: List[np.ndarray], normalized: bool) -> Iterable[Tuple[int, np.ndarray]]:
+        """``(first row, float32 unit rows)`` over ``blocks``, BUILD_CHUNK_ROWS at a time"""
+        for block, (start, end) in zip(blocks, self.ranges):
+            for offset in range(0, end - start, BUILD_CHUNK_ROWS):
+                chunk = np.asarray(block[offset:offset + BUILD_CHUNK_ROWS], dtype=np.float32)
+                yield start + offset, chunk if normalized else normalize_rows(chunk)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """The normalized float32 matrix; rebuilt from the full-precision rows when quantized"""
+        if self._matrix is not None:
+            return self._matrix
+        return self.vectors(np.arange(len(self)))
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of vector data held in memory; a matrix searched in place in the store's file counts as 0"""
+        if self.mapped:
+            return 0
+        if self._matrix is not None:
+            return self._matrix.nbytes
+        return (self.codes.nbytes + (self.norms.nbytes if self.norms is not None else 0)
+                + (self.scale.nbytes if self.scale is not None else 0))
+
+    def vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Normalized full-precision rows, read from the original embeddings when quantized"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if self._matrix is not None:
+            return self._matrix[rows]
+        out = np.empty((rows.size, self.dim), dtype=np.float32)
+        row_categories = self.category_ids[rows]
+        for cid in np.unique(row_categories):
+            selected = np.flatnonzero(row_categories == cid)
+            out[selected] = self.blocks[cid][rows[selected] - self.ranges[cid][0]]
+        return out / self.norms[rows, None] if self.norms is not None else out
+
+    def _approximate_scores(self, rows: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+        """Scores of the quantized rows, widened to float32 a chunk at a time"""
+        weights = query * self.scale if self.scale is not None else query
+        if rows is None:
+            codes = self.codes
+        elif rows.size and rows[-1] - rows[0] + 1 == rows.size:
+            codes = self.codes[rows[0]:rows[-1] + 1]
+        else:
+            codes = self.codes[rows]
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCAN_CHUNK_ROWS):
+            scores[start:start + SCAN_CHUNK_ROWS] = codes[start:start + SCAN_CHUNK_ROWS].astype(np.float32) @ weights
+        return scores
+
+    def resolve_category(self, category: str) -> Optional[int]:
+        """
+        Map a requested category name to a category id.
+
+        Known names and aliases are a dict lookup. Anything else falls back to
+        the old substring rule once and the answer is memoized in the alias table.
+        """
+        key = category.lower().strip()
+        if key in self.aliases:
+            return self.aliases[key]
+
+        resolved = None
+        for cid, name in enumerate(self.categories):
+            name = name.lower()
+            if key and (key in name or name in key):
+                resolved = cid
+                break
+        if len(self.aliases) < 1024:
+            self.aliases[key] = resolved
+        return resolved
+
+    def resolve_categories(self, categories: CategoryQuery) -> Optional[List[int]]:
+        """Category ids to search, or None to search every category"""
+        if categories is None:
+            return None
+        if isinstance(categories, str):
+            categories = [categories]
+        ids = {self.resolve_category(c) for c in categories}
+        ids.discard(None)
+        return sorted(ids)
+
+    def _rows_for(self, category_ids: Optional[Iterable[int]]) -> Optional[np.ndarray]:
+        """Row indices for the requested categories, or None for all rows"""
+        if category_ids is None:
+            return None
+        category_ids = list(category_ids)
+        if len(category_ids) == 1:
+            start, end = self.ranges[category_ids[0]]
+            return np.arange(start, end)
+        return np.flatnonzero(np.isin(self.category_ids, category_ids))
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        category_ids: Optional[Iterable[int]] = None,
+        top_k: int = 3,
+        min_score: float = 0.1,
+    ) -> List[Tuple[int, float]]:
+        """Return ``(row, score)`` pairs for the best matches, best first"""
+        if not len(self):
+            return []
+        query = normalize_rows(query_vector)[0]
+
+        rows = self._rows_for(category_ids)
+        if self._matrix is None:
+            return self._search_quantized(query, rows, top_k, min_score)
+        if rows is None:
+            scores = self.matrix @ query
+        elif rows.size and rows[-1] - rows[0] + 1 == rows.size:
+            # A single category is a contiguous block, so score a view instead of gathering rows
+            scores = self.matrix[rows[0]:rows[-1] + 1] @ query
+        else:
+            scores = self.matrix[rows] @ query
+
+        best = top_k_indices(scores, top_k)
+        best = best[scores[best] > min_score]
+        if rows is not None:
+            return [(int(rows[i]), float(scores[i])) for i in best]
+        return [(int(i), float(scores[i])) for i in best]
+
+    def _search_quantized(self, query: np.ndarray, rows: Optional[np.ndarray], top_k: int,
+                          min_score: float) -> List[Tuple[int, float]]:
+        approximate = self._approximate_scores(rows, query)
+        shortlist = top_k_indices(approximate, top_k * self.rescore_factor)
+        candidates = rows[shortlist] if rows is not None else shortlist
+        scores = self.vectors(candidates) @ query
+        best = top_k_indices(scores, top_k)
+        best = best[scores[best] > min_score]
+        return [(int(candidates[i]), float(scores[i])) for i in best]
+
+    def category_of(self, row: int) -> str:
+        return self.categories[self.category_ids[row]]
@@ -0,0 +1,164 @@
+"""
+Background warm-up and readiness.
+
+Without warm-up the first ticket pays for importing torch, loading the
+sentence transformer, loading the embedding index and Ollama loading the
+model into memory. warmup() does all of that on a daemon thread at startup
+(main.py starts it when WARMUP_ON_START is true) and records how long each
+stage took. is_ready() turns true once retrieval works, even if only
+keyword search is available because the encoder failed; an unreachable
+Ollama is reported but does not block readiness, since the model will still
+load on the first call. Without warm-up, the process becomes ready when
+get_rag_system() first loads a working knowledge base. METRICS_PORT also
+serves the status on /ready.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import env_bool, env_str
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Roles in the order their models are loaded; roles sharing a model load it once
+WARMUP_ROLES = ("draft", "review", "classify")
+
+_lock = threading.Lock()
+_ready = threading.Event()
+_thread: Optional[threading.Thread] = None
+_status: Dict[str, Any] = {"ready": False, "started": False, "seconds": None, "stages": {}}
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def wait_until_ready(timeout: Optional[float] = None) -> bool:
+    return _ready.wait(timeout)
+
+
+def readiness() -> Dict[str, Any]:
+    """Snapshot of the warm-up status: ready flag, total seconds and per-stage results"""
+    with _lock:
+        return {**_status, "stages": {name: dict(stage) for name, stage in _status["stages"].items()}}
+
+
+def _record(stage: str, started: float, error: Optional[str] = None, **details: Any):
+    seconds = time.perf_counter() - started
+    metrics.observe("warmup_seconds", seconds, stage=stage)
+    with _lock:
+        _status["stages"][stage] = {"ok": error is None, "seconds": round(seconds, 3), **details,
+                                    **({"error": error} if error else {})}
+    if error:
+        logger.warning("⚠️ Warm-up of %s failed after %.1fs: %s", stage, seconds, error)
+    else:
+        logger.info("🔥 Warmed up %s in %.1fs", stage, seconds)
+
+
+def _retrieval_works(rag_system) -> bool:
+    return bool(rag_system.available and len(rag_system.index.documents))
+
+
+def rag_loaded(rag_system):
+    """
+    Mark the process ready once the RAG system has loaded, if warm-up is not running.
+
+    Called by get_rag_system(); a started warm-up reports readiness itself
+    when it finishes.
+    """
+    if not _retrieval_works(rag_system):
+        return
+    with _lock:
+        if _status["started"]:
+            return
+        _status["ready"] = True
+    _ready.set()
+
+
+def _warm_rag() -> bool:
+    from simple_rag import get_rag_system
+
+    started = time.perf_counter()
+    try:
+        rag_system = get_rag_system()
+        if not _retrieval_works(rag_system):
+            _record("rag", started, error="knowledge base failed to load")
+            return False
+        if rag_system.model is not None:
+            # The first encode call initialises the model's kernels
+            rag_system.embed_query("warm-up")
+        _record("rag", started, documents=len(rag_system.index.documents), mode=rag_system.retrieval_mode,
+                encoder=rag_system.model is not None)
+        return True
+    except Exception as e:
+        _record("rag", started, error=f"{type(e).__name__}: {e}")
+        return False
+
+
+def _warm_llms(roles: List[str]):
+    from llm import llm_config, warm_llm
+
+    warmed = set()
+    for role in roles:
+        model = llm_config(role)["model"]
+        if model in warmed:
+            continue
+        warmed.add(model)
+        started = time.perf_counter()
+        try:
+            warm_llm(role)
+            _record(f"llm.{model}", started, role=role)
+        except Exception as e:
+            _record(f"llm.{model}", started, error=f"{type(e).__name__}: {e}", role=role)
+
+
+def _run(roles: List[str]):
+    started = time.perf_counter()
+    rag_ok = _warm_rag()
+    if roles:
+        _warm_llms(roles)
+    seconds = time.perf_counter() - started
+    with _lock:
+        _status["seconds"] = round(seconds, 3)
+        _status["ready"] = rag_ok
+    if rag_ok:
+        _ready.set()
+        logger.info("✅ Ready after %.1fs of warm-up", seconds)
+    else:
+        logger.error("❌ Warm-up finished in %.1fs but retrieval is unavailable", seconds)
+
+
+def warmup(background: bool = True, llm: Optional[bool] = None) -> Optional[threading.Thread]:
+    """
+    Pre-load the encoder, the embedding index and the Ollama models, once per process.
+
+    ``llm`` defaults to WARMUP_LLM. With ``background=False`` the call blocks
+    until warm-up is finished. Returns the warm-up thread, if one was started.
+    """
+    global _thread
+    if llm is None:
+        llm = env_bool("WARMUP_LLM", True)
+    roles = [r.strip() for r in env_str("WARMUP_ROLES", ",".join(WARMUP_ROLES)).split(",") if r.strip()] if llm else []
+
+    with _lock:
+        if _status["started"]:
+            return _thread
+        _status["started"] = True
+        if background:
+            _thread = threading.Thread(target=_run, args=(roles,), name="warmup", daemon=True)
+    if not background:
+        _run(roles)
+        return None
+    _thread.start()
+    return _thread
+
+
+def _reset():
+    """Forget warm-up state (tests only)"""
+    global _thread
+    with _lock:
+        _thread = None
+        _status.update({"ready": False, "started": False, "seconds": None, "stages": {}})
+    _ready.clear()
@@ -1,5 +1,14 @@
+import os
+import sys
+
 import pytest
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The application modules import each other as top-level modules (``from state import ...``);
+# the repository root makes the ``benchmarks`` package importable
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
 
 @pytest.fixture(scope="session")
 def anyio_backend():
@@ -0,0 +1,49 @@
+import numpy as np
+
+from ann_index import IVFIndex, recall_report
+from vector_index import VectorIndex
+
+
+def make_base(n: int = 2000, dim: int = 16) -> VectorIndex:
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(20, dim))
+    vectors = centers[rng.integers(0, 20, n)] + rng.normal(0, 0.3, (n, dim))
+    half = n // 2
+    return VectorIndex(
+        {"billing": vectors[:half], "technical": vectors[half:]},
+        {"billing": [f"b{i}" for i in range(half)], "technical": [f"t{i}" for i in range(n - half)]},
+    )
+
+
+def test_full_probe_matches_exact_search() -> None:
+    base = make_base()
+    ann = IVFIndex(base, n_lists=16).build()
+    query = base.matrix[5]
+    exact = base.search(query, [0], top_k=5)
+    approx = ann.search(query, [0], top_k=5, n_probe=16)
+    assert [row for row, _ in approx] == [row for row, _ in exact]
+    assert all(base.category_ids[row] == 0 for row, _ in approx)
+
+
+def test_recall_improves_with_probes() -> None:
+    base = make_base()
+    ann = IVFIndex(base, n_lists=32).build()
+    queries = base.matrix[::50]
+    report = recall_report(base, ann, queries, top_k=10, n_probes=(1, 32))
+    assert report[0]["recall@10"] <= report[1]["recall@10"]
+    assert report[1]["recall@10"] == 1.0
+
+
+def test_save_and_load_round_trip(tmp_path) -> None:
+    base = make_base(400)
+    path = str(tmp_path / "docs.ivf.npz")
+    built = IVFIndex(base, n_lists=8, encoder_id="all-MiniLM-L6-v2").build()
+    built.save(path)
+
+    loaded = IVFIndex(base, n_lists=8, encoder_id="all-MiniLM-L6-v2")
+    assert loaded.load(path)
+    np.testing.assert_array_equal(loaded.list_rows, built.list_rows)
+    assert not IVFIndex(base, n_lists=4, encoder_id="all-MiniLM-L6-v2").load(path)
+    # Same documents embedded by another encoder (or at another dimension) need a new index
+    assert not IVFIndex(base, n_lists=8, encoder_id="all-MiniLM-L6-v2@onnx-int8").load(path)
+    assert not IVFIndex(make_base(400, dim=32), n_lists=8, encoder_id="all-MiniLM-L6-v2").load(path)
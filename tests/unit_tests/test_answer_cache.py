@@ -0,0 +1,79 @@
+import numpy as np
+
+from answer_cache import AnswerCache
+from nodes.cache_lookup import route_cache
+
+
+def test_near_duplicates_reuse_answer(tmp_path) -> None:
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"), kb_version="v1")
+    cache.store(np.array([1.0, 0.0, 0.0]), "billing", "ctx", "Refund approved")
+
+    hit = cache.lookup(np.array([0.99, 0.05, 0.0]), threshold=0.95)
+    assert hit["draft"] == "Refund approved" and hit["category"] == "billing"
+    assert cache.lookup(np.array([0.0, 1.0, 0.0]), threshold=0.95) is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_entries_survive_restart_but_not_kb_change(tmp_path) -> None:
+    path = str(tmp_path / "answers.sqlite")
+    AnswerCache(path, kb_version="v1").store(np.array([1.0, 0.0]), "general", None, "Hours are 9-5")
+
+    assert AnswerCache(path, kb_version="v1").lookup(np.array([1.0, 0.0]), 0.9) is not None
+
+    cache = AnswerCache(path, kb_version="v1")
+    cache.set_kb_version("v2")
+    assert cache.lookup(np.array([1.0, 0.0]), 0.9) is None
+
+
+def test_eviction_and_invalidation(tmp_path) -> None:
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"), kb_version="v1", max_entries=2)
+    for i, vector in enumerate(np.eye(3)):
+        cache.store(vector, "general", None, f"answer {i}")
+
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup(np.eye(3)[0], 0.9) is None
+
+    hit = cache.lookup(np.eye(3)[2], 0.9)
+    cache.invalidate(hit["id"])
+    assert cache.lookup(np.eye(3)[2], 0.9) is None
+
+
+def test_route_cache() -> None:
+    assert route_cache({"answer_cache_id": None}) == "classify"
+    assert route_cache({"answer_cache_id": 3, "review_result": "APPROVED"}) == "end"
+    assert route_cache({"answer_cache_id": 3, "review_result": None}) == "review"
+
+
+def test_async_review_updates_the_cache_off_the_event_loop(monkeypatch) -> None:
+    import asyncio
+    import threading
+
+    from langchain_core.messages import AIMessage
+
+    import nodes.review as review_node
+
+    class Reviewer:
+        def __init__(self, verdict):
+            self.verdict = verdict
+
+        async def ainvoke(self, messages):
+            return AIMessage(content=f"RESULT: {self.verdict}\nFEEDBACK: ok")
+
+    monkeypatch.setenv("REVIEW_RULES_ENABLED", "false")
+    calls = []
+    monkeypatch.setattr(review_node, "remember_answer", lambda state: calls.append(("remember", threading.get_ident())))
+    monkeypatch.setattr(review_node, "forget_answer", lambda entry: calls.append(("forget", threading.get_ident())))
+    state = {"subject": "Refund", "description": "Charged twice", "category": "billing", "context": "",
+             "draft": "We have refunded the duplicate charge; it will reach your card within five business days.",
+             "attempts": 0, "failed_drafts": [], "answer_cache_id": 7}
+
+    async def review(verdict):
+        monkeypatch.setattr(review_node, "get_llm", lambda role: Reviewer(verdict))
+        result = await review_node.areview(dict(state))
+        return result, threading.get_ident()
+
+    for verdict, expected in (("APPROVED", "remember"), ("REJECTED", "forget")):
+        calls.clear()
+        result, loop_thread = asyncio.run(review(verdict))
+        assert result["review_result"] == verdict
+        assert [name for name, _ in calls] == [expected] and calls[0][1] != loop_thread
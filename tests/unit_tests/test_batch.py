@@ -0,0 +1,45 @@
+import batch
+
+
+class FakeRAG:
+    def __init__(self):
+        self.primed = []
+        self.released = []
+
+    def prime_queries(self, queries):
+        self.primed.append(list(queries))
+        return len(set(queries))
+
+    def release_queries(self, queries):
+        self.released.append(list(queries))
+
+
+class FakeAgent:
+    def invoke(self, ticket):
+        if ticket["subject"] == "boom":
+            raise RuntimeError("model unavailable")
+        return {"category": "billing", "review_result": "APPROVED", "attempts": 0, "draft": ticket["subject"]}
+
+
+def test_results_come_back_in_order_with_failures(monkeypatch) -> None:
+    rag = FakeRAG()
+    monkeypatch.setattr(batch, "get_rag_system", lambda: rag)
+    tickets = [{"subject": f"t{i}", "description": "help"} for i in range(20)]
+    tickets[7] = {"subject": "boom", "description": ""}
+
+    outcome = batch.run_batch(tickets, max_concurrency=4, agent=FakeAgent())
+
+    results = outcome["results"]
+    assert [r["index"] for r in results] == list(range(20))
+    assert results[3]["result"]["draft"] == "t3"
+    assert not results[7]["ok"] and "model unavailable" in results[7]["error"]
+    assert outcome["stats"]["succeeded"] == 19
+    assert outcome["stats"]["failed"] == 1
+    assert len(rag.primed) == 1 and rag.primed[0][0] == "t0 help"
+    assert rag.released == rag.primed
+
+
+def test_load_tickets_jsonl(tmp_path) -> None:
+    path = tmp_path / "tickets.jsonl"
+    path.write_text('{"subject": "a", "description": "b"}\n\n{"subject": "c", "description": "d"}\n')
+    assert [t["subject"] for t in batch.load_tickets(str(path))] == ["a", "c"]
@@ -0,0 +1,44 @@
+from benchmarks.bench_graph import offline_agent
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.harness import compare, results_document
+from benchmarks.synthetic import HashingEncoder, write_knowledge_base
+from langchain_core.messages import HumanMessage
+
+
+def test_fake_model_is_deterministic() -> None:
+    reviewer = FakeChatModel(role="review", rejections=1)
+    first = reviewer.invoke([HumanMessage(content="Draft Response to Review: ... (draft attempt 1)")])
+    second = reviewer.invoke([HumanMessage(content="Draft Response to Review: ... (draft attempt 2)")])
+    assert first.content.startswith("RESULT: REJECTED") and second.content.startswith("RESULT: APPROVED")
+    assert second.response_metadata["eval_count"] > 0
+    assert FakeChatModel(role="classify").invoke([HumanMessage(content="I need a refund")]).content == "billing"
+
+
+def test_offline_agent_runs_every_scenario() -> None:
+    ticket = {"subject": "Refund request", "description": "I was charged twice"}
+    with offline_agent(rejections=0, documents=40) as agents:
+        result = agents["sync"].invoke(dict(ticket))
+        assert result["review_result"] == "APPROVED" and result["category"] == "billing"
+        assert "RELEVANT KNOWLEDGE BASE" in result["context"]
+    with offline_agent(rejections=1, documents=40) as agents:
+        result = agents["sync"].invoke(dict(ticket))
+        assert result["review_result"] == "APPROVED" and len(result["failed_drafts"]) == 1
+    with offline_agent(rejections=99, documents=40) as agents:
+        result = agents["sync"].invoke(dict(ticket))
+        assert result["review_result"] == "REJECTED"
+
+
+def test_compare_flags_only_real_regressions() -> None:
+    baseline = results_document({"a": {"p50_ms": 10.0, "p95_ms": 12.0}, "b": {"p50_ms": 0.01, "p95_ms": 0.01}})
+    current = results_document({"a": {"p50_ms": 13.0, "p95_ms": 12.5}, "b": {"p50_ms": 0.03, "p95_ms": 0.03}})
+    regressions = compare(baseline, current, threshold=0.2)
+    assert [(r["benchmark"], r["stat"]) for r in regressions] == [("a", "p50_ms")]
+
+
+def test_hashing_encoder_matches_identical_text(tmp_path) -> None:
+    from simple_rag import SimpleRAG
+
+    rag = SimpleRAG(write_knowledge_base(str(tmp_path), 40), model_name="hashing-384", encoder=HashingEncoder())
+    query = rag.knowledge_base["security"][3]
+    top = rag.retrieve_documents(query, None, top_k=1)[0]
+    assert top["content"] == query and top["category"] == "security"
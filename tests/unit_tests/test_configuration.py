@@ -1,9 +1,49 @@
 from langgraph.pregel import Pregel
 
-from agent.graph import graph
+from main import async_support_agent, support_agent
 
 
-def test_placeholder() -> None:
-    # TODO: You can add actual unit tests
-    # for your graph and other logic here.
-    assert isinstance(graph, Pregel)
+def test_support_agents_compile() -> None:
+    assert isinstance(support_agent, Pregel)
+    assert isinstance(async_support_agent, Pregel)
+    assert {"input", "classify", "retrieve", "draft", "review", "retry", "escalate"} <= set(support_agent.nodes)
+
+
+def test_importing_main_has_no_side_effects(tmp_path) -> None:
+    import os
+    import subprocess
+    import sys
+
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "src")
+    script = (
+        "import logging, threading, main\n"
+        "assert not logging.getLogger().handlers, logging.getLogger().handlers\n"
+        "assert [t.name for t in threading.enumerate()] == ['MainThread'], threading.enumerate()\n"
+    )
+    env = {**os.environ, "PYTHONPATH": src, "WARMUP_ON_START": "true", "METRICS_PORT": "0",
+           "METRICS_JSON_PATH": str(tmp_path / "metrics.json")}
+    result = subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+
+
+def test_cli_answers_tickets_until_exit(monkeypatch, capsys) -> None:
+    import main
+
+    class FakeAgent:
+        def __init__(self):
+            self.tickets = []
+
+        def invoke(self, ticket):
+            self.tickets.append(ticket)
+            return {"review_result": "APPROVED", "category": "billing", "draft": "Refund issued.", "attempts": 0}
+
+    agent = FakeAgent()
+    prompts = iter(["Refund", "Charged twice", "exit"])
+    monkeypatch.setattr(main, "startup", lambda: None)
+    monkeypatch.setattr(main, "create_support_agent", lambda: agent)
+    monkeypatch.setattr("builtins.input", lambda _prompt="": next(prompts))
+
+    main.main()
+
+    assert agent.tickets == [{"subject": "Refund", "description": "Charged twice"}]
+    assert "Refund issued." in capsys.readouterr().out
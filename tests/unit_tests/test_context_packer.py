@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+
+from context_packer import context_budget, estimate_tokens, fit_context, mmr_order, truncate_sentences
+from encoders import HashingEncoder
+from simple_rag import SimpleRAG
+
+LONG_POLICY = " ".join(
+    f"Refund step {i}: managers approve refunds over {i * 100} dollars within five business days." for i in range(40)
+)
+
+
+def test_truncation_keeps_whole_sentences() -> None:
+    text = "Refunds take five business days. Managers approve large refunds. Contact billing for help."
+    assert truncate_sentences(text, 100) == text
+    assert truncate_sentences(text, 12) == "Refunds take five business days. ..."
+    # A first sentence longer than the budget is cut at a word
+    assert truncate_sentences("one two three four five six seven eight", 4) == "one two three ..."
+    assert truncate_sentences(text, 0) == ""
+
+
+def test_mmr_drops_near_duplicates_and_keeps_relevance_order() -> None:
+    vectors = np.array([[1.0, 0.0], [0.999, 0.01], [0.0, 1.0]], dtype=np.float32)
+    assert mmr_order([0.9, 0.85, 0.5], vectors) == [0, 2]
+    assert mmr_order([0.5, 0.9, 0.7], None) == [1, 2, 0]
+
+
+def test_review_grades_against_the_draft_context(monkeypatch) -> None:
+    from nodes.review import _review_messages
+
+    monkeypatch.delenv("RAG_CONTEXT_TOKENS_REVIEW", raising=False)
+    monkeypatch.setenv("RAG_CONTEXT_TOKENS_DRAFT", "2048")
+    assert context_budget("review") == context_budget("draft") == 2048
+    context = "=== RELEVANT KNOWLEDGE BASE ===\n" + LONG_POLICY[:1500 * 4] + "\n=== END KNOWLEDGE BASE ==="
+    assert estimate_tokens(context) <= 2048
+    messages = _review_messages({"subject": "Refund", "description": "Charged twice", "context": context, "draft": "Hi"})
+    assert context in messages[-1].content
+
+    monkeypatch.setenv("RAG_CONTEXT_TOKENS_REVIEW", "256")
+    assert context_budget("review") == 256
+
+
+def test_fit_context_keeps_footer_and_reports_savings() -> None:
+    context = "=== RELEVANT KNOWLEDGE BASE ===\n[BILLING - 90.0% relevant]\n" + LONG_POLICY + "\n\n=== END KNOWLEDGE BASE ==="
+    trimmed, saved = fit_context(context, 100)
+    assert estimate_tokens(trimmed) <= 100 and saved == estimate_tokens(context) - estimate_tokens(trimmed)
+    assert trimmed.endswith(". ...\n=== END KNOWLEDGE BASE ===")
+    assert fit_context(context, 0) == (context, 0)
+
+
+def test_format_context_packs_passages_into_budget(tmp_path) -> None:
+    kb = tmp_path / "kb.json"
+    kb.write_text(json.dumps({"billing": [
+        "Refunds take five business days after approval.",
+        "Refunds take five business days after approval!",
+        LONG_POLICY,
+        "Invoices are emailed on the first of every month.",
+    ]}))
+    rag = SimpleRAG(str(kb), model_name="hashing-384", encoder=HashingEncoder(), retrieval_mode="dense")
+    docs = rag.retrieve_documents("how long do refunds take after approval", None, top_k=4)
+    assert all("embedding" in doc for doc in docs)
+
+    plain = rag.format_context(docs, "refunds")
+    packed = rag.format_context(docs, "refunds", max_tokens=120, max_passages=3)
+    assert estimate_tokens(packed) <= 120 < estimate_tokens(plain)
+    assert packed.count("Refunds take five business days after approval") == 1
+    assert packed.endswith("=== END KNOWLEDGE BASE ===")
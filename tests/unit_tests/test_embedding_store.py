@@ -0,0 +1,69 @@
+import numpy as np
+
+from embedding_store import EmbeddingStore
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(t), t.count("a"), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_second_load_reuses_index(tmp_path) -> None:
+    kb_path = str(tmp_path / "docs.json")
+    kb = {"billing": ["refund a charge", "invoice"], "general": ["hours"]}
+
+    encoder = CountingEncoder()
+    first = EmbeddingStore(kb_path, "test-model").load(kb, encoder)
+    second = EmbeddingStore(kb_path, "test-model").load(kb, encoder)
+
+    assert len(encoder.calls) == 1
+    assert isinstance(second["billing"], np.memmap) or isinstance(second["billing"].base, np.memmap)
+    np.testing.assert_array_equal(first["billing"], second["billing"])
+    assert second["general"].shape == (1, 3)
+
+
+def test_only_changed_documents_are_encoded(tmp_path) -> None:
+    kb_path = str(tmp_path / "docs.json")
+    encoder = CountingEncoder()
+    EmbeddingStore(kb_path, "test-model").load({"billing": ["a", "b"]}, encoder)
+
+    store = EmbeddingStore(kb_path, "test-model")
+    result = store.load({"billing": ["a", "bb"], "security": ["aaa"]}, encoder)
+
+    assert encoder.calls[-1] == ["bb", "aaa"]
+    assert store.last_encoded == 2
+    np.testing.assert_allclose(result["billing"][1], np.array([2, 0, 1]) / np.sqrt(5), rtol=1e-6)
+    np.testing.assert_allclose(result["security"][0], np.array([3, 3, 1]) / np.sqrt(19), rtol=1e-6)
+
+
+def test_unnormalized_version_1_index_is_normalized_without_reencoding(tmp_path) -> None:
+    import json
+
+    kb_path = str(tmp_path / "docs.json")
+    store = EmbeddingStore(kb_path, "test-model")
+    store.load({"billing": ["aa"]}, CountingEncoder())
+    np.save(store.matrix_path, np.array([[2.0, 2.0, 1.0]], dtype=np.float32))
+    with open(store.manifest_path) as f:
+        manifest = json.load(f)
+    with open(store.manifest_path, "w") as f:
+        json.dump({**manifest, "version": 1}, f)
+
+    encoder = CountingEncoder()
+    result = EmbeddingStore(kb_path, "test-model").load({"billing": ["aa"]}, encoder)
+    assert encoder.calls == []
+    np.testing.assert_allclose(result["billing"][0], [2 / 3, 2 / 3, 1 / 3], rtol=1e-6)
+    with open(store.manifest_path) as f:
+        assert json.load(f)["version"] == 2
+
+
+def test_model_change_forces_rebuild(tmp_path) -> None:
+    kb_path = str(tmp_path / "docs.json")
+    encoder = CountingEncoder()
+    EmbeddingStore(kb_path, "model-a").load({"general": ["x"]}, encoder)
+    EmbeddingStore(kb_path, "model-b").load({"general": ["x"]}, encoder)
+
+    assert len(encoder.calls) == 2
@@ -0,0 +1,73 @@
+import json
+
+import numpy as np
+import pytest
+
+import encoders
+from encoders import HashingEncoder, create_encoder, encoder_id, parity_check
+from simple_rag import SimpleRAG
+
+TEXTS = [
+    "Refunds take 5-7 business days",
+    "Reset your password from the login page",
+    "Enable 2FA from the security settings page",
+    "The app crashes on Android 9 devices",
+]
+
+
+class PerturbedEncoder:
+    """The hashing encoder plus noise, standing in for a badly exported model"""
+
+    def __init__(self, scale: float):
+        self.scale = scale
+
+    def encode(self, texts, batch_size: int = 32, **kwargs):
+        vectors = HashingEncoder().encode(texts)
+        return vectors + np.random.default_rng(0).normal(0, self.scale, vectors.shape).astype(np.float32)
+
+
+def test_create_encoder_picks_backend_from_env(monkeypatch) -> None:
+    monkeypatch.setenv("RAG_ENCODER_BACKEND", "hashing")
+    assert isinstance(create_encoder("all-MiniLM-L6-v2"), HashingEncoder)
+    with pytest.raises(ValueError):
+        create_encoder("all-MiniLM-L6-v2", "tensorflow")
+
+
+def test_cached_vectors_are_keyed_by_backend(monkeypatch) -> None:
+    monkeypatch.setenv("RAG_ONNX_QUANTIZED", "true")
+    assert encoder_id("all-MiniLM-L6-v2", "sentence-transformers") == "all-MiniLM-L6-v2"
+    assert encoder_id("all-MiniLM-L6-v2", "onnx") == "all-MiniLM-L6-v2@onnx-int8"
+    assert encoder_id("all-MiniLM-L6-v2", "hashing") == "all-MiniLM-L6-v2@hashing"
+
+
+def test_parity_check_passes_identical_and_fails_drifting_encoders() -> None:
+    same = parity_check(HashingEncoder(), HashingEncoder(), TEXTS)
+    assert same["passed"] and same["min_cosine"] == pytest.approx(1.0)
+    assert same["nearest_neighbour_agreement"] == 1.0
+
+    assert parity_check(HashingEncoder(), PerturbedEncoder(0.001), TEXTS)["passed"]
+    drifted = parity_check(HashingEncoder(), PerturbedEncoder(0.2), TEXTS)
+    assert not drifted["passed"] and drifted["min_cosine"] < 0.98
+
+
+def test_simple_rag_uses_configured_backend(tmp_path, monkeypatch) -> None:
+    kb = tmp_path / "kb.json"
+    kb.write_text(json.dumps({"billing": TEXTS[:1], "security": TEXTS[1:3]}))
+    monkeypatch.setenv("RAG_ENCODER_BACKEND", "hashing")
+
+    rag = SimpleRAG(str(kb), retrieval_mode="dense")
+    assert isinstance(rag.model, HashingEncoder)
+    assert rag.embedding_store.model_name == "all-MiniLM-L6-v2@hashing"
+    assert rag.retrieve_documents("how do I reset my password", None, top_k=1)[0]["content"] == TEXTS[1]
+
+
+def test_onnx_encoder_pools_and_normalizes(tmp_path) -> None:
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("sentence_transformers")
+    try:
+        encoders.export_onnx("all-MiniLM-L6-v2", str(tmp_path))
+    except OSError:
+        pytest.skip("model not available offline")
+    report = parity_check(create_encoder("all-MiniLM-L6-v2", "sentence-transformers"),
+                          encoders.OnnxEncoder(str(tmp_path)), TEXTS)
+    assert report["passed"]
@@ -0,0 +1,94 @@
+import csv
+import gzip
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from escalation_sink import CSV_HEADER, EscalationSink, draft_id
+
+
+def _record(i: int, drafts=("Same failed draft",)) -> dict:
+    return {"subject": f"Ticket {i}", "description": "Cannot log in", "attempts": 3,
+            "feedback": "Too vague", "failed_drafts": list(drafts)}
+
+
+def test_concurrent_submits_are_written_once_with_deduplicated_drafts(tmp_path) -> None:
+    path = str(tmp_path / "escalations.csv")
+    sink = EscalationSink(path, flush_seconds=0.05)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: sink.submit(_record(i)), range(200)))
+    sink.close()
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == CSV_HEADER
+    assert len(rows) == 201
+    assert {row[5] for row in rows[1:]} == {draft_id("Same failed draft")}
+
+    with open(sink.drafts_path, encoding="utf-8") as f:
+        drafts = [json.loads(line) for line in f]
+    assert drafts == [{"id": draft_id("Same failed draft"), "draft": "Same failed draft"}]
+
+
+def test_size_rotation_and_legacy_csv(tmp_path) -> None:
+    path = tmp_path / "escalations.csv"
+    path.write_text("timestamp,subject,description,attempts,feedback,failed_drafts\n", encoding="utf-8")
+    sink = EscalationSink(str(path), max_bytes=300, flush_seconds=0.01)
+    for i in range(10):
+        sink.submit(_record(i))
+        sink.flush()
+    sink.close()
+
+    files = sorted(os.listdir(tmp_path))
+    rotated = [name for name in files if name.startswith("escalations.") and name.endswith(".csv") and name != "escalations.csv"]
+    assert len(rotated) >= 2  # the legacy file plus at least one size rotation
+    total = 0
+    for name in rotated + ["escalations.csv"]:
+        with open(tmp_path / name, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        if rows[0] == CSV_HEADER:
+            total += len(rows) - 1
+    assert total == 10
+
+
+def test_drafts_file_rotates_with_the_log(tmp_path) -> None:
+    path = tmp_path / "escalations.csv"
+    sink = EscalationSink(str(path), max_bytes=300, flush_seconds=0.01)
+    for i in range(10):
+        sink.submit(_record(i, drafts=("Same failed draft", f"Draft {i}")))
+        sink.flush()
+    sink.close()
+
+    logs = sorted(name for name in os.listdir(tmp_path) if name.endswith(".csv"))
+    assert len(logs) >= 3
+    for name in logs:
+        stamp = name[len("escalations"):-len(".csv")]
+        with open(tmp_path / name, newline="", encoding="utf-8") as f:
+            referenced = {digest for row in list(csv.reader(f))[1:] for digest in row[5].split(";")}
+        # Every rotated log has a drafts file with the same stamp holding each draft it references
+        with open(tmp_path / f"escalations.drafts{stamp}.jsonl", encoding="utf-8") as f:
+            stored = {json.loads(line)["id"] for line in f}
+        assert referenced and referenced <= stored
+
+
+def test_jsonl_and_sqlite_backends(tmp_path) -> None:
+    sink = EscalationSink(str(tmp_path / "escalations.jsonl.gz"), backend="jsonl", flush_seconds=0.01)
+    sink.submit(_record(1, drafts=("a", "b")))
+    sink.flush()
+    sink.submit(_record(2, drafts=("b",)))
+    sink.close()
+    with gzip.open(tmp_path / "escalations.jsonl.gz", "rt", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert [row["failed_draft_ids"] for row in rows] == [[draft_id("a"), draft_id("b")], [draft_id("b")]]
+    with gzip.open(sink.drafts_path, "rt", encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+
+    path = str(tmp_path / "escalations.sqlite")
+    sink = EscalationSink(path, backend="sqlite", flush_seconds=0.01)
+    for i in range(5):
+        sink.submit(_record(i))
+    sink.close()
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM escalations").fetchone()[0] == 5
+    assert conn.execute("SELECT COUNT(*) FROM drafts").fetchone()[0] == 1
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from langchain_core.messages import AIMessage
+
+import nodes.classify as classify_node
+from fast_classifier import CentroidClassifier
+
+
+def test_centroid_classifier_confidence() -> None:
+    embeddings = np.array([[1.0, 0.1], [0.9, 0.0], [0.0, 1.0], [0.1, 0.8]])
+    classifier = CentroidClassifier.fit(embeddings, ["billing", "billing", "security", "security"],
+                                        ["billing", "technical", "security"])
+
+    assert classifier.categories == ["billing", "security"]
+    category, confidence = classifier.predict(np.array([1.0, 0.0]))
+    assert category == "billing" and confidence > 0.99
+    _, unsure = classifier.predict(np.array([1.0, 1.0]))
+    assert unsure < 0.7
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return AIMessage(content="Technical")
+
+
+def test_classify_only_calls_llm_when_unsure(monkeypatch) -> None:
+    llm = FakeLLM()
+    monkeypatch.setattr(classify_node, "get_llm", lambda role: llm)
+    ticket = {"subject": "Refund", "description": "Charged twice"}
+
+    monkeypatch.setattr(classify_node, "classify_by_embedding", lambda *args: ("billing", 0.95))
+    result = classify_node.classify(ticket)
+    assert result["category"] == "billing" and result["category_confidence"] == 0.95
+    assert llm.calls == 0
+
+    monkeypatch.setattr(classify_node, "classify_by_embedding", lambda *args: ("billing", 0.4))
+    assert classify_node.classify(ticket)["category"] == "technical"
+    assert llm.calls == 1
+
+
+def test_classifier_is_rebuilt_when_the_knowledge_base_reloads(tmp_path, monkeypatch) -> None:
+    import json
+
+    import fast_classifier
+    import simple_rag
+    from benchmarks.synthetic import HashingEncoder, make_knowledge_base
+
+    path = tmp_path / "kb.json"
+    knowledge_base = make_knowledge_base(40)
+    path.write_text(json.dumps(knowledge_base))
+    rag = simple_rag.SimpleRAG(str(path), model_name="hashing-384", encoder=HashingEncoder())
+    monkeypatch.setattr(simple_rag, "get_rag_system", lambda: rag)
+    monkeypatch.setattr(fast_classifier, "_classifier", None)
+    monkeypatch.setattr(fast_classifier, "_classifier_version", None)
+    categories = list(knowledge_base)
+
+    first = fast_classifier.get_fast_classifier(categories)
+    assert first is not None and fast_classifier.get_fast_classifier(categories) is first
+
+    knowledge_base["shipping"] = ["Orders ship within two business days from our warehouse"]
+    path.write_text(json.dumps(knowledge_base))
+    assert rag.reload(force=True) is not None
+    rebuilt = fast_classifier.get_fast_classifier(categories + ["shipping"])
+    assert rebuilt is not first and "shipping" in rebuilt.categories
+
+
+def test_quantized_index_trains_without_rebuilding_its_matrix(tmp_path, monkeypatch) -> None:
+    from types import SimpleNamespace
+
+    import fast_classifier
+    from vector_index import VectorIndex
+
+    rng = np.random.default_rng(0)
+    embeddings = {"billing": rng.normal(size=(30, 16)).astype(np.float32) + 2,
+                  "security": rng.normal(size=(20, 16)).astype(np.float32) - 2}
+    documents = {category: ["doc"] * len(rows) for category, rows in embeddings.items()}
+    expected = CentroidClassifier.fit(np.concatenate(list(embeddings.values())),
+                                      ["billing"] * 30 + ["security"] * 20, ["billing", "security"])
+    index = VectorIndex(embeddings, documents, precision="int8")
+    monkeypatch.setenv("CLASSIFIER_TRAINING_PATH", str(tmp_path / "none.jsonl"))
+    monkeypatch.setattr(VectorIndex, "matrix", property(lambda self: pytest.fail("full matrix rebuilt")))
+
+    classifier = fast_classifier.build_classifier(SimpleNamespace(model=object(), index=index), ["billing", "security"])
+    assert classifier.categories == ["billing", "security"]
+    np.testing.assert_allclose(classifier.centroids, expected.centroids, atol=1e-5)
@@ -0,0 +1,58 @@
+import io
+import json
+
+import numpy as np
+
+from benchmarks.synthetic import HashingEncoder
+from ingest import chunk_stream, ingest
+from simple_rag import SimpleRAG
+
+
+class CountingEncoder(HashingEncoder):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def encode(self, texts, *args, **kwargs):
+        self.batches.append(len(texts))
+        return super().encode(texts, *args, **kwargs)
+
+
+def test_chunks_overlap_on_word_boundaries_and_offsets_point_into_the_source() -> None:
+    text = " ".join(f"word{i}" for i in range(2000))
+    chunks = list(chunk_stream(io.StringIO(text), chunk_chars=200, overlap=40))
+
+    assert all(len(chunk) <= 200 for _, chunk in chunks)
+    assert all(text[offset:offset + len(chunk)] == chunk for offset, chunk in chunks)
+    assert all(chunk.split()[0].startswith("word") for _, chunk in chunks)
+    for (offset, chunk), (next_offset, _) in zip(chunks, chunks[1:]):
+        assert offset < next_offset < offset + len(chunk)  # consecutive chunks share text
+    assert chunks[-1][1].endswith("word1999")
+
+
+def test_ingested_corpus_is_served_without_re_encoding_and_cited_in_context(tmp_path) -> None:
+    docs = tmp_path / "docs"
+    (docs / "billing").mkdir(parents=True)
+    (docs / "billing" / "refunds.md").write_text(
+        "# Refunds\n\n" + "Refunds are issued to the original payment method within five business days. " * 30)
+    (docs / "notes.txt").write_text("Support hours are nine to five on weekdays.")
+    (docs / "tickets.jsonl").write_text(
+        json.dumps({"text": "Two factor codes expire after thirty seconds.", "category": "security", "source": "kb-17"})
+        + "\n\nnot json\n")
+
+    encoder = CountingEncoder()
+    output = str(tmp_path / "corpus.jsonl")
+    stats = ingest([str(docs)], output, model_name="hashing-384", encoder=encoder, chunk_chars=300, overlap=50, batch_size=4)
+
+    assert set(stats["categories"]) == {"billing", "general", "security"}
+    assert max(encoder.batches) <= 4 and sum(encoder.batches) == stats["chunks"]
+    assert np.load(str(tmp_path / "corpus.embeddings.npy")).shape == (stats["chunks"], 384)
+
+    rag = SimpleRAG(output, model_name="hashing-384", encoder=encoder)
+    assert rag.embedding_store.last_encoded == 0
+    top = rag.retrieve_documents("two factor codes expire", None, top_k=1)[0]
+    assert top["category"] == "security" and top["source"] == "kb-17" and top["offset"] == 0
+
+    refunds = rag.retrieve_documents("refunds original payment method", "billing", top_k=1)
+    assert refunds[0]["source"].endswith("refunds.md")
+    assert "source: billing/refunds.md#" in rag.format_context(refunds, "refunds")
@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+import time
+
+from benchmarks.synthetic import HashingEncoder, make_knowledge_base
+from simple_rag import SimpleRAG, diff_knowledge_base
+
+
+def _write(path, knowledge_base) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(knowledge_base, f)
+    # Replace atomically and make sure the mtime changes even on coarse clocks
+    os.replace(tmp, path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def _rag(path) -> SimpleRAG:
+    return SimpleRAG(str(path), model_name="hashing-384", encoder=HashingEncoder())
+
+
+def test_reload_encodes_only_the_delta_and_serves_the_new_documents(tmp_path) -> None:
+    path = tmp_path / "kb.json"
+    knowledge_base = make_knowledge_base(40)
+    _write(path, knowledge_base)
+    rag = _rag(path)
+    assert rag.reload() is None  # nothing changed
+
+    updated = {category: list(documents) for category, documents in knowledge_base.items()}
+    updated["billing"].append("Gift cards can be redeemed at checkout for store credit")
+    updated["security"][0] = "Passkeys replace passwords for customers who enable them"
+    removed = updated["technical"].pop()
+    _write(path, updated)
+
+    report = rag.reload()
+    assert report["added"] == 2 and report["removed"] == 2 and report["encoded"] == 2
+    assert report["documents"] == 40 and rag.kb_version == report["kb_version"]
+    top = rag.retrieve_documents("redeem a gift card at checkout for store credit", None, top_k=1)[0]
+    assert top["category"] == "billing" and "Gift cards" in top["content"]
+    assert removed not in rag.index.documents
+
+
+def test_diff_counts_edits_as_one_removal_and_one_addition() -> None:
+    assert diff_knowledge_base({"a": ["x", "y"]}, {"a": ["x", "z"], "b": ["w"]}) == {"added": 2, "removed": 1, "unchanged": 1}
+
+
+def test_watcher_reloads_on_change_and_ignores_a_broken_file(tmp_path) -> None:
+    path = tmp_path / "kb.json"
+    _write(path, {"billing": ["Refunds take five business days"]})
+    rag = _rag(path)
+    rag.watch(interval=0.02)
+    try:
+        path.write_text('{"billing": ["Refunds take')  # half-written
+        time.sleep(0.1)
+        assert rag.retrieve_documents("refunds take", "billing")[0]["content"] == "Refunds take five business days"
+
+        _write(path, {"billing": ["Refunds take five business days", "Invoices are emailed monthly"]})
+        deadline = time.time() + 5
+        while len(rag.index) != 2 and time.time() < deadline:
+            time.sleep(0.02)
+        assert len(rag.index) == 2 and rag.last_reload["added"] == 1
+    finally:
+        rag.stop_watching()
+
+
+def test_searches_during_reloads_see_one_complete_version(tmp_path) -> None:
+    path = tmp_path / "kb.json"
+    versions = [make_knowledge_base(40, seed=0), make_knowledge_base(60, seed=1)]
+    documents = [set(sum(v.values(), [])) for v in versions]
+    _write(path, versions[0])
+    rag = _rag(path)
+
+    stop = threading.Event()
+    failures = []
+
+    def search():
+        while not stop.is_set():
+            results = rag.retrieve_documents("refund for a duplicate charge", None, top_k=3)
+            contents = {r["content"] for r in results}
+            if len(results) != 3 or not any(contents <= version for version in documents):
+                failures.append(results)
+
+    searcher = threading.Thread(target=search)
+    searcher.start()
+    for i in range(6):
+        _write(path, versions[(i + 1) % 2])
+        assert rag.reload() is not None
+    stop.set()
+    searcher.join()
+    assert not failures
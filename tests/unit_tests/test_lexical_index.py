@@ -0,0 +1,114 @@
+import json
+import pathlib
+import subprocess
+import sys
+
+import numpy as np
+
+from lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+from simple_rag import SimpleRAG
+from vector_index import VectorIndex
+
+KB = {
+    "technical": [
+        "The app crashes on Android 9 devices after the latest update",
+        "Clear the browser cache and cookies if pages fail to load",
+        "Error E1042 means the sync server rejected the device token",
+    ],
+    "security": [
+        "Enable 2FA from the security settings page",
+        "Reset your password from the login page",
+    ],
+}
+
+
+class NoiseEncoder:
+    """Embeddings unrelated to meaning, so only keyword search can find anything"""
+
+    def encode(self, texts, *args, **kwargs):
+        return np.stack([np.random.default_rng(sum(map(ord, t))).normal(size=16) for t in texts]).astype(np.float32)
+
+
+def _index() -> VectorIndex:
+    return VectorIndex({c: np.zeros((len(d), 0)) for c, d in KB.items()}, KB)
+
+
+def test_tokens_keep_codes_and_drop_stopwords() -> None:
+    assert tokenize("Is 2FA on for E-1042 in Android 9?") == ["2fa", "e", "1042", "android", "9"]
+
+
+def test_bm25_ranks_rare_keywords_and_filters_categories() -> None:
+    bm25 = BM25Index(_index())
+    assert [row for row, _ in bm25.search("E1042 error", top_k=1)] == [2]
+    assert [row for row, _ in bm25.search("android 9 crash", top_k=2)][0] == 0
+    assert sorted(row for row, _ in bm25.search("page", [1], top_k=5)) == [3, 4]  # security only
+    assert all(0 < score <= 1 for _, score in bm25.search("reset password login", normalize=True))
+    assert bm25.search("unrelated words") == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement() -> None:
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)
+    assert [row for row, _ in fused] == [1, 3, 2]
+
+
+def test_hybrid_finds_keyword_matches_the_encoder_misses(tmp_path, monkeypatch) -> None:
+    # Noise embeddings give every document a random similarity, so keep keyword hits at any score
+    monkeypatch.setenv("RAG_HYBRID_MIN_SCORE", "-1")
+    path = tmp_path / "kb.json"
+    path.write_text(json.dumps(KB))
+    rag = SimpleRAG(str(path), model_name="noise", encoder=NoiseEncoder(), retrieval_mode="hybrid")
+    top = rag.retrieve_documents("getting error E1042 when syncing", None, top_k=1)[0]
+    assert "E1042" in top["content"] and -1 <= top["similarity"] <= 1
+
+
+class AxisEncoder:
+    """Embeds a text on the axis of the first keyword it contains"""
+
+    KEYWORDS = ("android", "cache", "e1042", "2fa", "password")
+
+    def encode(self, texts, *args, **kwargs):
+        vectors = np.zeros((len(texts), len(self.KEYWORDS)), dtype=np.float32)
+        for i, text in enumerate(texts):
+            lowered = text.lower()
+            hits = [k for k, keyword in enumerate(self.KEYWORDS) if keyword in lowered]
+            vectors[i, hits[0] if hits else 0] = 1.0
+        return vectors
+
+
+def test_hybrid_drops_keyword_only_hits_below_the_similarity_floor(tmp_path, monkeypatch) -> None:
+    path = tmp_path / "kb.json"
+    path.write_text(json.dumps(KB))
+    rag = SimpleRAG(str(path), model_name="axis", encoder=AxisEncoder(), retrieval_mode="hybrid")
+    # "page" matches two documents by keyword, but the query is about passwords; one of them is orthogonal
+    query = "password page"
+
+    found = [doc["content"] for doc in rag.retrieve_documents(query, None, top_k=5)]
+    assert found == ["Reset your password from the login page"]
+
+    monkeypatch.setenv("RAG_HYBRID_MIN_SCORE", "-1")
+    found = [doc["content"] for doc in rag.retrieve_documents(query, None, top_k=5)]
+    assert "Enable 2FA from the security settings page" in found
+
+
+def test_missing_encoder_degrades_to_keyword_search(tmp_path, monkeypatch) -> None:
+    path = tmp_path / "kb.json"
+    path.write_text(json.dumps(KB))
+    monkeypatch.setitem(sys.modules, "sentence_transformers", None)  # import fails
+
+    rag = SimpleRAG(str(path), model_name="missing")
+    assert rag.model is None and rag.available
+    results = rag.retrieve_documents("how do I turn on 2FA", "security", top_k=1)
+    assert "2FA" in results[0]["content"] and results[0]["category"] == "security"
+
+
+def test_lexical_mode_never_imports_torch(tmp_path) -> None:
+    path = tmp_path / "kb.json"
+    path.write_text(json.dumps(KB))
+    script = (
+        "import sys; from simple_rag import SimpleRAG; "
+        f"rag = SimpleRAG({str(path)!r}, retrieval_mode='lexical'); "
+        "assert rag.retrieve_documents('android 9 crash', None)[0]['content'].startswith('The app crashes'); "
+        "assert 'torch' not in sys.modules and 'sentence_transformers' not in sys.modules"
+    )
+    src = pathlib.Path(__file__).resolve().parents[2] / "src"
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=src, timeout=60)
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import llm
+
+pytestmark = pytest.mark.anyio
+
+
+class TrackingModel:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def ainvoke(self, messages):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return messages
+
+
+async def test_async_llm_calls_respect_global_limit(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "3")
+    model = TrackingModel()
+    results = await asyncio.gather(*(llm.ainvoke_llm(model, [i]) for i in range(20)))
+    assert results == [[i] for i in range(20)]
+    assert model.peak == 3
+
+
+class SharedTrackingModel:
+    """Counts outstanding calls across threads and event loops"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    def _enter(self):
+        with self.lock:
+            self.active += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.active)
+
+    def _exit(self):
+        with self.lock:
+            self.active -= 1
+
+    def invoke(self, messages):
+        self._enter()
+        time.sleep(0.005)
+        self._exit()
+        return messages
+
+    async def ainvoke(self, messages):
+        self._enter()
+        await asyncio.sleep(0.005)
+        self._exit()
+        return messages
+
+
+def test_sync_and_async_callers_share_one_limit(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "3")
+    model = SharedTrackingModel()
+
+    def sync_worker():
+        for i in range(10):
+            llm.invoke_llm(model, [i])
+
+    async def async_batch():
+        await asyncio.gather(*(llm.ainvoke_llm(model, [i]) for i in range(20)))
+
+    threads = [threading.Thread(target=sync_worker) for _ in range(4)]
+    threads += [threading.Thread(target=asyncio.run, args=(async_batch(),)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert model.calls == 80 and model.peak == 3
+    assert llm.llm_queue_depth() == 0 and llm._slots.active == 0
+
+
+async def test_cancelled_waiters_give_their_slot_back(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "1")
+    model = TrackingModel()
+    tasks = [asyncio.create_task(llm.ainvoke_llm(model, [i])) for i in range(5)]
+    await asyncio.sleep(0)
+    tasks[2].cancel()
+    tasks[3].cancel()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert [r for r in results if not isinstance(r, BaseException)] == [[0], [1], [4]]
+    assert llm._slots.active == 0 and llm.llm_queue_depth() == 0
+
+
+def test_clients_are_shared_per_role(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_CLASSIFY_NUM_PREDICT", "4")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    llm.reset_llm_clients()
+    try:
+        classify_llm = llm.get_llm("classify")
+        assert llm.get_llm("classify") is classify_llm
+        assert llm.get_llm("draft") is not classify_llm
+        assert classify_llm.num_predict == 4
+        assert llm.llm_config("review")["num_predict"] == llm.ROLE_DEFAULTS["review"]["num_predict"]
+    finally:
+        llm.reset_llm_clients()
@@ -0,0 +1,94 @@
+import multiprocessing
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from llm_cache import CachedChatModel, ResponseCache, cache_key
+
+pytestmark = pytest.mark.anyio
+
+
+class CountingModel:
+    model = "mistral"
+    temperature = 0.0
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return AIMessage(content=f"answer {self.calls}")
+
+    async def ainvoke(self, messages):
+        return self.invoke(messages)
+
+
+def prompt(text: str = "Refund please"):
+    return [SystemMessage(content="  You are an agent.\n    Be helpful.  "), HumanMessage(content=text)]
+
+
+def test_identical_prompts_hit_cache(tmp_path) -> None:
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    model = CountingModel()
+    cached = CachedChatModel(model, cache, "draft", ttl=60)
+
+    first = cached.invoke(prompt())
+    second = cached.invoke(prompt())
+    other = cached.invoke(prompt("Login broken"))
+
+    assert first.content == second.content == "answer 1"
+    assert second.response_metadata["cache_hit"]
+    assert other.content == "answer 2"
+    assert cache.stats()["hits"] == {"draft": 1}
+    assert cache.stats()["misses"] == {"draft": 2}
+
+
+def test_key_ignores_indentation_but_not_parameters() -> None:
+    model = CountingModel()
+    indented = [SystemMessage(content="You are an agent.\nBe helpful.")] + prompt()[1:]
+    assert cache_key(model, prompt()) == cache_key(model, indented)
+
+    hotter = CountingModel()
+    hotter.temperature = 0.7
+    assert cache_key(model, prompt()) != cache_key(hotter, prompt())
+
+
+def test_expired_and_lru_entries_are_evicted(tmp_path) -> None:
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.put("old", "draft", "x", ttl=-1)
+    for key in ("a", "b", "c"):
+        cache.put(key, "draft", key, ttl=60)
+    cache.get("a", "draft")
+
+    cache.evict()
+
+    assert cache.get("old", "draft") is None
+    assert cache.get("b", "draft") is None
+    assert cache.get("a", "draft") == "a"
+    assert cache.get("c", "draft") == "c"
+
+
+async def test_async_path_uses_cache(tmp_path) -> None:
+    model = CountingModel()
+    cached = CachedChatModel(model, ResponseCache(str(tmp_path / "cache.sqlite")), "review", ttl=60)
+    await cached.ainvoke(prompt())
+    await cached.ainvoke(prompt())
+    assert model.calls == 1
+
+
+def _write_entries(path: str, worker: int) -> None:
+    cache = ResponseCache(path)
+    for i in range(50):
+        cache.put(f"{worker}-{i}", "draft", "x", ttl=60)
+
+
+def test_processes_can_share_cache_file(tmp_path) -> None:
+    path = str(tmp_path / "cache.sqlite")
+    ResponseCache(path)
+    workers = [multiprocessing.Process(target=_write_entries, args=(path, w)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert ResponseCache(path).stats()["entries"] == 200
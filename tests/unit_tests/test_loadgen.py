@@ -0,0 +1,35 @@
+import asyncio
+
+from benchmarks.bench_graph import offline_agent
+from benchmarks.loadgen import load_source, run_step, sustainable_rate
+
+
+def test_escalation_log_subjects_are_replayed(tmp_path) -> None:
+    log = tmp_path / "escalation_log.csv"
+    log.write_text('timestamp,subject,description,attempts,feedback,failed_drafts\n'
+                   '2025-07-30T21:00:39,Refund,"Charged, twice",2,REJECTED,"Dear Customer,\nHi"\n', encoding="utf-8")
+    assert load_source(str(log)) == [{"subject": "Refund", "description": "Charged, twice"}]
+
+
+def test_open_loop_step_reports_latency_nodes_and_queue_depth(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "2")
+    with offline_agent(llm_latency=0.02) as agents:
+        step = asyncio.run(run_step(agents["async"], load_source(None), rate=40, duration=0.5))
+
+    assert step["tickets"] == 20 and step["completed"] == 20 and step["errors"] == 0
+    latency = step["latency_seconds"]
+    assert 0.06 <= latency["p50"] <= latency["p95"] <= latency["p99"]
+    assert step["nodes"]["draft"]["count"] == 20
+    # Two slots for 40 tickets/s x 3 calls of 20 ms: arrivals outpace the LLM, so calls queue up
+    assert step["llm_waiting"]["max"] > 0 and step["in_flight"]["max"] > 1
+
+
+def test_sustainable_rate_is_highest_step_within_slo() -> None:
+    steps = [
+        {"rate": 1, "errors": 0, "latency_seconds": {"p95": 2.0}},
+        {"rate": 2, "errors": 0, "latency_seconds": {"p95": 4.0}},
+        {"rate": 4, "errors": 0, "latency_seconds": {"p95": 40.0}},
+        {"rate": 8, "errors": 3, "latency_seconds": {"p95": 1.0}},
+    ]
+    assert sustainable_rate(steps, slo=5.0) == 2
+    assert sustainable_rate(steps, slo=0.5) is None
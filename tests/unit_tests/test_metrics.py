@@ -0,0 +1,77 @@
+import json
+import logging
+
+import pytest
+from langchain_core.messages import AIMessage
+
+import metrics
+from logging_config import JsonFormatter
+from metrics import MetricsRegistry, record_llm_response, timed_node
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    metrics.registry.reset()
+    yield
+    metrics.registry.reset()
+
+
+def test_prometheus_rendering_has_cumulative_buckets() -> None:
+    registry = MetricsRegistry()
+    for value in (0.003, 0.2, 0.2, 7.0):
+        registry.observe("node_seconds", value, node="draft")
+    registry.inc("retries_total")
+
+    text = registry.render_prometheus()
+    assert "# TYPE node_seconds histogram" in text
+    assert 'node_seconds_bucket{node="draft",le="0.005"} 1' in text
+    assert 'node_seconds_bucket{node="draft",le="0.25"} 3' in text
+    assert 'node_seconds_bucket{node="draft",le="+Inf"} 4' in text
+    assert 'node_seconds_count{node="draft"} 4' in text
+    assert "retries_total 1" in text
+
+    histogram = registry.snapshot()["histograms"]["node_seconds"][0]
+    assert histogram["count"] == 4
+    assert histogram["p50"] == pytest.approx(0.175)  # halfway through the (0.1, 0.25] bucket
+    assert 5.0 < histogram["p99"] <= 10.0
+
+
+def test_llm_tokens_and_cache_hits_are_recorded() -> None:
+    response = AIMessage(content="billing", response_metadata={
+        "prompt_eval_count": 300, "eval_count": 2, "prompt_eval_duration": 250_000_000})
+    record_llm_response("classify", response, 0.4)
+    record_llm_response("classify", AIMessage(content="billing", response_metadata={"cache_hit": True}), 0.001)
+
+    snapshot = metrics.registry.snapshot()
+    assert snapshot["counters"]["llm_calls_total"] == [{"labels": {"role": "classify"}, "value": 2}]
+    assert snapshot["counters"]["llm_cache_hits_total"][0]["value"] == 1
+    assert snapshot["histograms"]["llm_prompt_tokens"][0]["sum"] == 300
+    assert snapshot["histograms"]["llm_completion_tokens"][0]["sum"] == 2
+    assert snapshot["histograms"]["llm_prefill_seconds"][0]["sum"] == pytest.approx(0.25)
+
+
+@pytest.mark.anyio
+async def test_timed_node_wraps_sync_and_async_nodes(monkeypatch) -> None:
+    def failing(state):
+        raise ValueError("boom")
+
+    async def async_node(state):
+        return {"draft": "ok"}
+
+    with pytest.raises(ValueError):
+        timed_node("classify", failing)({})
+    assert await timed_node("draft", async_node)({}) == {"draft": "ok"}
+
+    monkeypatch.setenv("METRICS_ENABLED", "false")
+    timed_node("draft", lambda state: state)({})
+
+    snapshot = metrics.registry.snapshot()
+    assert {h["labels"]["node"]: h["count"] for h in snapshot["histograms"]["node_seconds"]} == {"classify": 1, "draft": 1}
+    assert snapshot["counters"]["node_errors_total"] == [{"labels": {"node": "classify"}, "value": 1}]
+
+
+def test_json_log_lines_include_extra_fields() -> None:
+    record = logging.LogRecord("nodes.draft", logging.INFO, __file__, 1, "drafted %s", ("ticket",), None)
+    record.attempt = 2
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "drafted ticket" and entry["level"] == "info" and entry["attempt"] == 2
@@ -0,0 +1,50 @@
+import os
+
+from benchmarks.bench_prompts import _reused_tokens, bench_prompts, prompt_text
+from nodes.classify import _classification_messages
+from nodes.draft import _draft_messages
+from nodes.review import _review_messages
+
+TICKETS = [
+    {"subject": "Refund request", "description": "I was charged twice", "category": "billing",
+     "context": "Refunds take five business days.", "draft": "We will refund you.", "attempts": 0},
+    {"subject": "Webhook {payload}", "description": 'Our handler got {"event": "invoice.paid"} twice',
+     "category": "technical", "context": "Retries use {exponential} backoff.", "draft": "Use {id} to dedupe.",
+     "attempts": 1, "reviewer_feedback": "Explain the {retry} policy"},
+]
+
+
+def test_customer_text_with_braces_is_passed_through() -> None:
+    ticket = TICKETS[1]
+    draft = prompt_text(_draft_messages(ticket))
+    assert 'Our handler got {"event": "invoice.paid"} twice' in draft
+    assert "REVIEWER FEEDBACK: Explain the {retry} policy" in draft and "retry attempt #2" in draft
+    assert "Use {id} to dedupe." in prompt_text(_review_messages(ticket))
+    assert "Webhook {payload}" in prompt_text(_classification_messages(ticket))
+
+
+def test_system_prompts_are_identical_across_tickets_and_attempts() -> None:
+    for build in (_classification_messages, _draft_messages, _review_messages):
+        first, second = (build(ticket) for ticket in TICKETS)
+        assert first[0].type == "system" and first[0].content == second[0].content
+        assert "{" not in first[0].content
+
+    # A retry only appends to the first attempt's prompt up to the closing instructions
+    retry = {**TICKETS[0], "attempts": 1, "reviewer_feedback": "Add a timeline"}
+    shared = os.path.commonprefix([prompt_text(_draft_messages(TICKETS[0])), prompt_text(_draft_messages(retry))])
+    assert shared.endswith("Available Context:\nRefunds take five business days.\n\n")
+
+
+def test_prefix_cache_simulation() -> None:
+    assert _reused_tokens(["abcdefgh", "abcdxxxx", "abcdefghij"], slots=2) == [0, 1, 2]
+    assert _reused_tokens(["abcdefgh", "abcdxxxx", "abcdefghij"], slots=1) == [0, 1, 1]
+
+    results = bench_prompts(slots=(4,), prefill_rate=100, repeat=5)
+    assert set(results) == {f"prompt_render.{role}{layout}" for role in ("classify", "draft", "review")
+                            for layout in ("", ".legacy")} | {"prompt_prefix.slots4"}
+    prefix = results["prompt_prefix.slots4"]
+    assert 0 < prefix["reuse"] < 1
+    # Saved prefill is measured against the previous layout replaying the same calls, not a cold cache
+    assert prefix["prefill_tokens"] < prefix["legacy_prefill_tokens"]
+    saved = (prefix["legacy_prefill_tokens"] - prefix["prefill_tokens"]) * 10
+    assert abs(prefix["prefill_ms_saved"] - saved) <= 1
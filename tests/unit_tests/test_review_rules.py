@@ -0,0 +1,95 @@
+from langchain_core.messages import AIMessage
+
+import nodes.review as review_node
+from review_rules import check_draft
+
+GOOD_DRAFT = "Thanks for reaching out. Please clear your cache and cookies, then try logging in again."
+
+
+def test_clean_draft_passes() -> None:
+    assert check_draft(GOOD_DRAFT, "technical")["violations"] == []
+
+
+def test_safe_placeholders_are_filled_and_others_rejected(monkeypatch) -> None:
+    monkeypatch.delenv("SUPPORT_COMPANY_NAME", raising=False)
+    draft = f"Dear [Customer Name],\n\n{GOOD_DRAFT}\n\nBest,\n[Your Name], [Company Name]"
+
+    result = check_draft(draft, "technical")
+
+    assert result["draft"].startswith("Dear Customer,")
+    assert "[Your Name]" in result["filled"]
+    assert result["violations"] == [
+        "The draft contains unfilled placeholders: [Company Name]. Remove them or write the actual text."
+    ]
+
+    monkeypatch.setenv("SUPPORT_COMPANY_NAME", "Acme")
+    assert check_draft(draft, "technical")["violations"] == []
+
+
+def test_bare_name_sign_off_is_not_filled_with_the_customer_salutation() -> None:
+    result = check_draft(f"{GOOD_DRAFT}\n\nBest regards,\n[Name]", "technical")
+    assert "Customer" not in result["draft"] and result["filled"] == []
+    assert result["violations"] == [
+        "The draft contains unfilled placeholders: [Name]. Remove them or write the actual text."
+    ]
+
+
+def test_policy_rules_respect_negation() -> None:
+    violating = "Hi there. We will email you a password reset link right away. Thanks for your patience."
+    compliant = "For your safety we never send password reset links via email. Please reset it in the app."
+    assert check_draft(violating, "security")["violations"]
+    assert check_draft(compliant, "security")["violations"] == []
+    assert check_draft(violating, "general")["violations"] == []
+
+
+def test_negation_elsewhere_in_the_sentence_does_not_hide_a_violation() -> None:
+    reset = "Hi there. We will email you a password reset link so you do not have to wait. Please check your inbox."
+    refund = "Thanks for writing in. We have already processed your refund, so do not worry. Please reply with questions."
+    assert check_draft(reset, "security")["violations"]
+    assert check_draft(refund, "billing")["violations"]
+
+    assert check_draft("Password reset links are never sent by email. Please use the app instead.", "security")["violations"] == []
+    assert check_draft("We cannot say we have processed your refund yet. Please allow a manager to review it.",
+                       "billing")["violations"] == []
+
+
+def test_format_length_and_next_steps() -> None:
+    assert check_draft("OK", "general")["violations"]
+    assert check_draft("RESULT: APPROVED\n" + GOOD_DRAFT, "general")["violations"]
+    assert check_draft("Thank you for your message about your account today.", "general")["violations"] == [
+        "The draft gives the customer no clear next step."
+    ]
+
+
+class FailingLLM:
+    def invoke(self, messages):
+        raise AssertionError("rule failures must not reach the LLM reviewer")
+
+
+def test_rule_rejection_skips_llm(monkeypatch) -> None:
+    monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+    monkeypatch.setattr(review_node, "get_llm", lambda role: FailingLLM())
+    state = {"draft": "Dear [Customer Name], [Insert resolution]", "category": "general", "attempts": 0, "failed_drafts": []}
+
+    result = review_node.review(state)
+
+    assert result["review_result"] == "REJECTED"
+    assert "[Insert resolution]" in result["reviewer_feedback"]
+    assert result["attempts"] == 1
+
+
+def test_filled_draft_goes_to_llm(monkeypatch) -> None:
+    monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+    calls = []
+
+    class ApprovingLLM:
+        def invoke(self, messages):
+            calls.append(messages)
+            return AIMessage(content="RESULT: APPROVED\nFEEDBACK: good")
+
+    monkeypatch.setattr(review_node, "get_llm", lambda role: ApprovingLLM())
+    result = review_node.review({"draft": f"{GOOD_DRAFT}\n[Your Name]", "category": "technical", "attempts": 0})
+
+    assert result["review_result"] == "APPROVED"
+    assert result["draft"].endswith("The Support Team")
+    assert len(calls) == 1
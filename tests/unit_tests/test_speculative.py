@@ -0,0 +1,160 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+
+import nodes.review as review_node
+import nodes.speculative as speculative
+
+pytestmark = pytest.mark.anyio
+
+
+class VariationDrafter:
+    """Slow on the plain prompt, fast on the numbered-steps variation"""
+
+    def __init__(self, slow: float = 1.0):
+        self.slow = slow
+        self.cancelled = 0
+
+    async def ainvoke(self, messages):
+        instruction = messages[-1].content if "Additional instruction" in messages[-1].content else ""
+        try:
+            await asyncio.sleep(0.01 if "numbered" in instruction else self.slow)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return AIMessage(content="1. Reset your password in the app settings, then please sign in again." if "numbered" in instruction else "Try again later")
+
+
+class StepsReviewer:
+    async def ainvoke(self, messages):
+        approved = "1. Reset" in messages[-1].content
+        return AIMessage(content=f"RESULT: {'APPROVED' if approved else 'REJECTED'}\nFEEDBACK: needs steps")
+
+
+@pytest.fixture
+def models(monkeypatch):
+    monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+    drafter = VariationDrafter()
+    monkeypatch.setattr(speculative, "get_llm", lambda role: drafter)
+    monkeypatch.setattr(review_node, "get_llm", lambda role: StepsReviewer())
+    return drafter
+
+
+async def test_first_approved_candidate_wins_and_others_are_cancelled(models, monkeypatch) -> None:
+    monkeypatch.setenv("DRAFT_CANDIDATES", "3")
+    started = time.perf_counter()
+    result = await speculative.speculative_draft({"subject": "Login", "description": "Locked out", "attempts": 0, "failed_drafts": []})
+
+    assert result["review_result"] == "APPROVED"
+    assert result["draft"].startswith("1. Reset your password")
+    assert time.perf_counter() - started < 0.5
+    await asyncio.sleep(0)
+    assert models.cancelled == 2
+
+
+async def test_all_rejected_falls_through_to_retry(models, monkeypatch) -> None:
+    monkeypatch.setenv("DRAFT_CANDIDATES", "2")
+    monkeypatch.setattr(speculative, "DRAFT_VARIATIONS", [None, "Be brief."])
+    models.slow = 0.0
+    state = {"subject": "Login", "description": "Locked out", "attempts": 0, "failed_drafts": []}
+
+    result = await speculative.speculative_draft(state)
+
+    assert result["review_result"] == "REJECTED"
+    assert result["attempts"] == 1
+    assert result["failed_drafts"] == ["Try again later"]
+    assert state["failed_drafts"] == []
+
+
+
+def test_sync_entry_point_reuses_one_loop_and_its_clients(models, monkeypatch) -> None:
+    import llm
+
+    monkeypatch.setenv("DRAFT_CANDIDATES", "3")
+    monkeypatch.setattr(llm, "_create_llm", lambda role: object())
+    loops, clients = set(), set()
+    drafter = models
+
+    def loop_llm(role):
+        loops.add(asyncio.get_running_loop())
+        clients.add(id(llm.get_llm(role)))
+        return drafter
+
+    monkeypatch.setattr(speculative, "get_llm", loop_llm)
+    ticket = {"subject": "Login", "description": "Locked out", "attempts": 0, "failed_drafts": []}
+    for tickets in (1, 2):
+        assert speculative.speculative_draft_sync(ticket)["review_result"] == "APPROVED"
+        # Losing candidates were cancelled and awaited before the ticket returned
+        assert models.cancelled == 2 * tickets
+    assert len(loops) == 1 and len(clients) == 1
+    llm.reset_llm_clients()
+
+
+class PeakCountingModel:
+    """Classifies, drafts and reviews for the whole graph, counting calls in flight across threads and loops"""
+
+    def __init__(self):
+        import threading
+
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def _answer(self, messages):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        system = messages[0].content
+        if "ticket classifier" in system:
+            return AIMessage(content="technical")
+        if "quality assurance" in system:
+            return AIMessage(content="RESULT: APPROVED\nFEEDBACK: Clear steps.")
+        return AIMessage(content="1. Reset your password in the app settings, then please sign in again.")
+
+    def _done(self):
+        with self.lock:
+            self.active -= 1
+
+    def invoke(self, messages):
+        try:
+            response = self._answer(messages)
+            time.sleep(0.01)
+            return response
+        finally:
+            self._done()
+
+    async def ainvoke(self, messages):
+        try:
+            response = self._answer(messages)
+            await asyncio.sleep(0.01)
+            return response
+        finally:
+            self._done()
+
+
+def test_sync_batch_with_candidates_stays_within_the_llm_limit(monkeypatch) -> None:
+    import batch
+    import main
+    import nodes.classify as classify_node
+
+    monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+    monkeypatch.setenv("DRAFT_CANDIDATES", "3")
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "2")
+    model = PeakCountingModel()
+    for module in (classify_node, speculative, review_node):
+        monkeypatch.setattr(module, "get_llm", lambda role: model)
+    monkeypatch.setattr(classify_node, "classify_by_embedding", lambda *args: None)
+    monkeypatch.setattr(batch, "get_rag_system", lambda: type("RAG", (), {
+        "prime_queries": lambda self, queries: 0, "release_queries": lambda self, queries: None})())
+
+    agent = main._build_graph(lambda state: {"answer_cache_id": None}, classify_node.classify,
+                              lambda state: {"context": "Passwords are reset in the app settings."},
+                              speculative.speculative_draft_sync, review_node.review, speculative=True)
+    tickets = [{"subject": f"Login {i}", "description": "Locked out"} for i in range(12)]
+    outcome = batch.run_batch(tickets, max_concurrency=6, agent=agent)
+
+    assert all(r["ok"] and r["result"]["review_result"] == "APPROVED" for r in outcome["results"])
+    # Sync classify calls and the candidates on the background loop share the same two slots
+    assert model.peak == 2
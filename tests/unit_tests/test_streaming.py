@@ -0,0 +1,42 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel, GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+import main
+import nodes.draft as draft_node
+import nodes.review as review_node
+from streaming import stream_ticket
+
+pytestmark = pytest.mark.anyio
+
+
+async def skip_cache(state):
+    return {"answer_cache_id": None}
+
+
+async def fixed_category(state):
+    return {"category": "billing"}
+
+
+async def fixed_context(state):
+    return {"context": "Refunds require approval by a human manager."}
+
+
+async def test_draft_tokens_stream_before_final_event(monkeypatch) -> None:
+    monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+    monkeypatch.setattr(draft_node, "get_llm", lambda role: GenericFakeChatModel(
+        messages=iter([AIMessage(content="We have escalated your refund request to a manager. Please allow two business days.")])))
+    monkeypatch.setattr(review_node, "get_llm", lambda role: FakeListChatModel(
+        responses=["RESULT: APPROVED\nFEEDBACK: Clear next steps."]))
+    agent = main._build_graph(skip_cache, fixed_category, fixed_context, draft_node.adraft, review_node.areview)
+
+    events = [event async for event in stream_ticket({"subject": "Refund", "description": "Please"}, agent)]
+
+    kinds = [event["event"] for event in events]
+    tokens = [event["text"] for event in events if event["event"] == "draft_token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "We have escalated your refund request to a manager. Please allow two business days."
+    assert kinds.index("draft_token") < kinds.index("draft") < kinds.index("final")
+    assert kinds[-1] == "final" and kinds.count("final") == 1
+    assert events[-1]["status"] == "APPROVED"
+    assert events[-1]["time_to_first_token_ms"] is not None
@@ -0,0 +1,101 @@
+import json
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+import main
+import nodes.draft as draft_node
+import nodes.review as review_node
+from tracing import span
+
+
+def skip_cache(state):
+    return {"answer_cache_id": None}
+
+
+def fixed_category(state):
+    return {"category": "billing"}
+
+
+def fixed_context(state):
+    with span("rag.retrieve_documents", "rag", scores=[0.9, 0.8]):
+        return {"context": "Refunds require approval by a human manager."}
+
+
+def test_sampled_ticket_writes_chrome_trace(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+    monkeypatch.setenv("TRACE_SAMPLE_RATE", "1")
+    monkeypatch.setenv("TRACE_DIR", str(tmp_path))
+    drafter = FakeListChatModel(responses=[
+        "Too short",
+        "We have passed your refund request to a manager. Please allow two business days for a reply.",
+    ])
+    monkeypatch.setattr(draft_node, "get_llm", lambda role: drafter)
+    monkeypatch.setattr(review_node, "get_llm", lambda role: FakeListChatModel(
+        responses=["RESULT: APPROVED\nFEEDBACK: Clear next steps."]))
+    agent = main._build_graph(skip_cache, fixed_category, fixed_context, draft_node.draft, review_node.review)
+
+    result = agent.invoke({"subject": "Refund", "description": "Please refund my order"})
+    assert result["review_result"] == "APPROVED"
+
+    [trace_file] = list(tmp_path.iterdir())
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    names = [e["name"] for e in spans]
+    assert names.count("draft") == 2 and names.count("review") == 2 and "ticket" in names
+    assert names.count("llm.draft") == 2 and names.count("llm.review") == 1  # the short draft never reaches the LLM reviewer
+    assert next(e for e in spans if e["name"] == "llm.draft")["args"]["prompt_chars"] > 0
+    assert next(e for e in spans if e["name"] == "rag.retrieve_documents")["args"]["scores"] == [0.9, 0.8]
+    assert len([e for e in events if e["ph"] == "i" and e["name"] == "retry"]) == 1
+
+    ticket = next(e for e in spans if e["name"] == "ticket")
+    assert all(ticket["ts"] <= e["ts"] and e["ts"] + e["dur"] <= ticket["ts"] + ticket["dur"] + 1 for e in spans)
+
+
+def test_unsampled_tickets_write_nothing(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("TRACE_SAMPLE_RATE", "0")
+    monkeypatch.setenv("TRACE_DIR", str(tmp_path))
+    with span("rag.search") as trace_span:
+        trace_span.set(scores=[1.0])
+    agent = main._build_graph(lambda s: {"answer_cache_id": 1, "review_result": "APPROVED"},
+                              fixed_category, fixed_context, draft_node.draft, review_node.review)
+    agent.invoke({"subject": "Hi", "description": "Hello"})
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_real_retrieval_is_traced(tmp_path, monkeypatch) -> None:
+    import nodes.retrieve as retrieve_node
+    from encoders import HashingEncoder
+    from simple_rag import SimpleRAG
+
+    kb = tmp_path / "kb.json"
+    kb.write_text(json.dumps({"billing": ["Refunds require approval by a human manager."],
+                              "security": ["Reset your password from the login page."]}))
+    rag = SimpleRAG(str(kb), model_name="hashing-384", encoder=HashingEncoder())
+    monkeypatch.setattr(retrieve_node, "get_rag_system", lambda: rag)
+    monkeypatch.setenv("TRACE_SAMPLE_RATE", "1")
+    monkeypatch.setenv("TRACE_DIR", str(tmp_path / "traces"))
+    approve = lambda state: {"review_result": "APPROVED", "approved": True}
+    agent = main._build_graph(skip_cache, fixed_category, retrieve_node.retrieve,
+                              lambda state: {"draft": "ok"}, approve)
+
+    result = agent.invoke({"subject": "Refunds", "description": "Do refunds require approval by a manager?"})
+    assert "Refunds require approval by a human manager." in result["context"]
+
+    [trace_file] = list((tmp_path / "traces").iterdir())
+    spans = [e for e in json.loads(trace_file.read_text())["traceEvents"] if e["ph"] == "X"]
+    retrieval = next(e for e in spans if e["name"] == "rag.retrieve_documents")
+    assert retrieval["cat"] == "rag" and retrieval["args"]["category"] == "billing"
+    assert retrieval["args"]["scores"]
+
+
+def test_default_trace_dir_works_in_the_repo_layout(tmp_path, monkeypatch) -> None:
+    from tracing import Trace, finish_trace
+
+    # The repository tracks "logs" as a file, so the default must not live under it
+    (tmp_path / "logs").write_text("")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("TRACE_DIR", raising=False)
+    finish_trace(Trace("ticket", {}))
+
+    [trace_file] = list((tmp_path / ".cache" / "traces").iterdir())
+    assert json.loads(trace_file.read_text())["otherData"]["name"] == "ticket"
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from vector_index import VectorIndex, top_k_indices
+
+
+def make_index() -> VectorIndex:
+    embeddings = {
+        "billing": np.array([[1.0, 0.0, 0.0], [0.7, 0.7, 0.0]]),
+        "technical": np.array([[0.0, 2.0, 0.0]]),
+        "security": np.array([[0.0, 0.0, 5.0], [0.6, 0.0, 0.8]]),
+    }
+    documents = {
+        "billing": ["refunds", "double charges"],
+        "technical": ["login"],
+        "security": ["2fa", "breach"],
+    }
+    return VectorIndex(embeddings, documents)
+
+
+def test_top_k_matches_full_sort() -> None:
+    scores = np.random.default_rng(0).random(1000)
+    np.testing.assert_array_equal(top_k_indices(scores, 5), np.argsort(-scores)[:5])
+
+
+def test_single_category_search_uses_cosine_scores() -> None:
+    index = make_index()
+    matches = index.search(np.array([[2.0, 0.0, 0.0]]), index.resolve_categories("Billing"), top_k=3)
+    assert [index.documents[row] for row, _ in matches] == ["refunds", "double charges"]
+    assert abs(matches[0][1] - 1.0) < 1e-6
+
+
+def test_cross_and_multi_category_search() -> None:
+    index = make_index()
+    query = np.array([[0.0, 0.0, 1.0]])
+
+    cross = index.search(query, None, top_k=2)
+    assert [index.category_of(row) for row, _ in cross] == ["security", "security"]
+
+    multi = index.search(query, index.resolve_categories(["billing", "technical"]), top_k=2)
+    assert multi == []
+
+
+def test_category_aliases() -> None:
+    index = make_index()
+    assert index.resolve_category("BILLING") == 0
+    assert index.resolve_category("technical support") == 1
+    assert index.resolve_category("shipping") is None
+    assert index.resolve_categories("shipping") == []
+
+
+def test_quantized_search_rescores_to_exact_scores(tmp_path) -> None:
+    rng = np.random.default_rng(1)
+    np.save(tmp_path / "rows.npy", rng.normal(size=(600, 32)).astype(np.float32))
+    stored = np.load(tmp_path / "rows.npy", mmap_mode="r")
+    embeddings = {"billing": stored[:400], "security": stored[400:]}
+    documents = {"billing": [f"b{i}" for i in range(400)], "security": [f"s{i}" for i in range(200)]}
+    exact = VectorIndex(embeddings, documents)
+
+    for precision, max_fraction in (("float16", 0.55), ("int8", 0.3)):
+        index = VectorIndex(embeddings, documents, precision=precision)
+        assert index.nbytes <= exact.nbytes * max_fraction
+        np.testing.assert_allclose(index.vectors([3, 450]), exact.matrix[[3, 450]], atol=1e-6)
+        for query in stored[::37] + rng.normal(0, 0.1, (17, 32)).astype(np.float32):
+            for categories in (None, [1]):
+                expected = exact.search(query, categories, top_k=5, min_score=-1.0)
+                found = index.search(query, categories, top_k=5, min_score=-1.0)
+                assert [row for row, _ in found] == [row for row, _ in expected]
+                np.testing.assert_allclose([s for _, s in found], [s for _, s in expected], atol=1e-5)
+
+
+def test_unknown_precision_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        VectorIndex({}, {}, precision="int4")
+
+
+def test_normalized_store_rows_are_searched_in_place(tmp_path) -> None:
+    import tracemalloc
+
+    rows = np.random.default_rng(2).normal(size=(20000, 64)).astype(np.float32)
+    rows /= np.linalg.norm(rows, axis=1, keepdims=True)
+    np.save(tmp_path / "rows.npy", rows)
+    stored = np.load(tmp_path / "rows.npy", mmap_mode="r")
+    embeddings = {"billing": stored[:12000], "security": stored[12000:]}
+    documents = {"billing": ["b"] * 12000, "security": ["s"] * 8000}
+
+    index = VectorIndex(embeddings, documents, normalized=True)
+    assert index.mapped and index.nbytes == 0 and np.shares_memory(index.matrix, stored)
+    assert index.search(rows[12345], None, top_k=1)[0][0] == 12345
+
+    # Quantizing works through chunks; it never holds a float32 copy of the whole matrix
+    tracemalloc.start()
+    int8 = VectorIndex(embeddings, documents, precision="int8", normalized=True)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < rows.nbytes
+    assert int8.search(rows[12345], None, top_k=1)[0][0] == 12345
@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+import llm
+import simple_rag
+import warmup
+from benchmarks.synthetic import HashingEncoder, write_knowledge_base
+from metrics import _MetricsHandler
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    warmup._reset()
+    monkeypatch.setattr(simple_rag, "_rag_instance", None)
+    yield
+    warmup._reset()
+
+
+def _ready_status(port: int):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready") as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_warmup_loads_rag_and_each_model_once_then_reports_ready(tmp_path, monkeypatch) -> None:
+    kb_path = write_knowledge_base(str(tmp_path), 20)
+    monkeypatch.setattr(simple_rag, "SimpleRAG", lambda path: _real_rag(kb_path))
+    warmed = []
+    monkeypatch.setattr(llm, "warm_llm", lambda role: warmed.append(role))
+    monkeypatch.setenv("LLM_MODEL", "mistral")
+    monkeypatch.setenv("LLM_CLASSIFY_MODEL", "phi3")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        assert _ready_status(server.server_address[1])[0] == 503
+        thread = warmup.warmup()
+        assert warmup.warmup() is thread  # started once per process
+        assert warmup.wait_until_ready(timeout=30)
+
+        code, status = _ready_status(server.server_address[1])
+    finally:
+        server.shutdown()
+
+    assert code == 200 and status["ready"]
+    assert warmed == ["draft", "classify"]  # review shares the draft model
+    assert set(status["stages"]) == {"rag", "llm.mistral", "llm.phi3"}
+    assert status["stages"]["rag"]["documents"] > 0
+    assert simple_rag.get_rag_system().model is not None
+
+
+def test_unreachable_ollama_does_not_block_readiness_but_broken_retrieval_does(monkeypatch) -> None:
+    def unreachable(role):
+        raise ConnectionError("connection refused")
+
+    monkeypatch.setattr(llm, "warm_llm", unreachable)
+    monkeypatch.setenv("WARMUP_ROLES", "draft")
+    monkeypatch.setenv("LLM_MODEL", "mistral")
+    monkeypatch.setattr(simple_rag, "SimpleRAG", lambda path: _real_rag("missing.json"))
+    warmup.warmup(background=False)
+    status = warmup.readiness()
+    assert not status["ready"] and not warmup.is_ready()
+    assert status["stages"]["rag"]["ok"] is False
+    assert "connection refused" in status["stages"]["llm.mistral"]["error"]
+
+
+def test_without_warmup_the_first_rag_load_marks_the_process_ready(tmp_path, monkeypatch) -> None:
+    kb_path = write_knowledge_base(str(tmp_path), 20)
+    monkeypatch.setattr(simple_rag, "SimpleRAG", lambda path: _real_rag(kb_path))
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        assert _ready_status(server.server_address[1])[0] == 503
+        simple_rag.get_rag_system()
+        code, status = _ready_status(server.server_address[1])
+    finally:
+        server.shutdown()
+    assert code == 200 and status["ready"] and not status["started"]
+
+
+def test_a_broken_knowledge_base_does_not_mark_the_process_ready(monkeypatch) -> None:
+    monkeypatch.setattr(simple_rag, "SimpleRAG", lambda path: _real_rag("missing.json"))
+    simple_rag.get_rag_system()
+    assert not warmup.is_ready()
+
+
+def test_concurrent_first_requests_load_the_rag_system_once(monkeypatch) -> None:
+    created = []
+
+    def slow_rag(path):
+        time.sleep(0.05)
+        created.append(SimpleNamespace(watch=lambda: None, available=False))
+        return created[-1]
+
+    monkeypatch.setattr(simple_rag, "SimpleRAG", slow_rag)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(simple_rag.get_rag_system())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1 and all(r is created[0] for r in results)
+
+
+_RealSimpleRAG = simple_rag.SimpleRAG
+
+
+def _real_rag(path):
+    return _RealSimpleRAG(path, model_name="hashing-384", encoder=HashingEncoder())